@@ -1,14 +1,36 @@
 import os
-from flask import Flask, render_template, request, jsonify, session, make_response
+from flask import Flask, render_template, request, jsonify, session, make_response, Response, stream_with_context
 from datetime import datetime, time, timedelta
-from chatbot import generate_response
+from chatbot import generate_response, generate_response_stream, stream_stats
+from conversation_store import conversation_store
+from prompt_builder import prompt_stats
+from response_cache import response_cache
+from intent_classifier import intent_stats
+from llm_client import llm_client
 from functools import wraps
 from flask_mail import Mail
-from email_utils import mail, send_appointment_confirmation, schedule_reminder_email, send_contact_form_notification
-from models import db, Appointment, ContactSubmission
-from sqlalchemy import func
+from email_utils import mail
+from reminders import init_scheduler, start_scheduler, schedule_reminder_email, cancel_reminder_email, scheduler_stats
+import contact_search
+import email_outbox
+import static_assets
+import compression
+import json_provider
+import metrics
+import profiler
+from email_outbox import enqueue_email, get_outbox_stats
+from models import db, Appointment, ContactSubmission, ensure_schema, escape_like
+from contact_search import search_contact_submissions, ensure_search_index, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE
+from exports import stream_export, EXPORT_FORMATS, APPOINTMENT_EXPORT_COLUMNS, CONTACT_SUBMISSION_EXPORT_COLUMNS
+from delta_sync import changes_since, sync_horizon, table_etag, not_modified, tag_response
+from availability import availability_cache
+from appointment_stats import get_appointment_stats, appointment_stats_cache
+from sqlalchemy import func, or_, and_
+from sqlalchemy.exc import IntegrityError
 import logging
 import re
+import base64
+import json
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -23,10 +45,16 @@ logger = logging.getLogger(__name__)
 
 # Initialize rate limiting
 from datetime import datetime, timedelta
-from collections import defaultdict
-request_counts = defaultdict(list)
+from rate_limiter import create_rate_limiter
+rate_limiter = create_rate_limiter()
 RATE_LIMIT = 30  # requests per minute
 RATE_WINDOW = 60  # seconds
+CONTACT_RATE_LIMIT = 5  # contact form submissions per minute
+PIN_RATE_LIMIT = 10  # PIN attempts per minute
+
+# Admin appointment listing
+APPOINTMENTS_PAGE_SIZE = 10
+APPOINTMENTS_MAX_PAGE_SIZE = 100
 
 app = Flask(__name__)
 
@@ -56,15 +84,45 @@ app.config.update(
 )
 
 # Initialize extensions
+# First, so its hooks wrap the other extensions' work
+profiler.init_app(app)
 db.init_app(app)
+contact_search.init_app(app)
 mail.init_app(app)
+email_outbox.init_app(app)
+static_assets.init_app(app)
+json_provider.init_app(app)
+compression.init_app(app)
+metrics.init_app(app)
+init_scheduler(app)
+metrics.stats_collector('rate_limiter', rate_limiter.stats)
+metrics.stats_collector('email_outbox', get_outbox_stats)
+metrics.stats_collector('scheduler', scheduler_stats)
+
+def check_rate_limit(ip, scope='default', limit=RATE_LIMIT, window=RATE_WINDOW):
+    """Check if the request should be rate limited; returns (allowed, retry_after)"""
+    allowed, retry_after = rate_limiter.hit(f'{scope}:{ip}', limit, window)
+    if not allowed:
+        metrics.rate_limit_rejections.inc(scope)
+    return allowed, retry_after
 
-def check_rate_limit(ip):
-    """Check if the request should be rate limited"""
-    now = datetime.now()
-    request_counts[ip] = [t for t in request_counts[ip] if now - t < timedelta(seconds=RATE_WINDOW)]
-    request_counts[ip].append(now)
-    return len(request_counts[ip]) <= RATE_LIMIT
+def rate_limited(scope, limit=RATE_LIMIT, window=RATE_WINDOW):
+    """Reject requests over the per-IP limit for this scope with a 429"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            allowed, retry_after = check_rate_limit(request.remote_addr, scope, limit, window)
+            if not allowed:
+                logger.warning(f"Rate limit exceeded for {request.remote_addr} on {scope}")
+                response = jsonify({
+                    "error": "Rate limit exceeded",
+                    "retry_after": retry_after
+                })
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
 
 # Enhanced PIN protection decorator
 def require_pin(f):
@@ -83,6 +141,7 @@ def check_session():
 
 # Enhanced PIN verification endpoint
 @app.route('/api/verify-pin', methods=['POST'])
+@rate_limited('verify_pin', limit=PIN_RATE_LIMIT)
 def verify_pin():
     try:
         data = request.get_json()
@@ -133,67 +192,349 @@ def appointment_management():
 @require_pin
 def get_contact_submissions():
     try:
+        etag = table_etag(ContactSubmission)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+
+        since = request.args.get('since')
+        if since:
+            try:
+                changed, deleted, next_since, has_more = changes_since(ContactSubmission, since)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return tag_response(jsonify({
+                "submissions": [serialize_contact_submission(submission) for submission in changed],
+                "deleted": deleted,
+                "since": next_since,
+                "has_more": has_more
+            }), etag)
+
         logger.info("Fetching contact submissions from database")
-        submissions = ContactSubmission.query.order_by(ContactSubmission.created_at.desc()).all()
+        submissions = ContactSubmission.query.filter(
+            ContactSubmission.deleted_at.is_(None)
+        ).order_by(ContactSubmission.created_at.desc()).all()
         logger.info(f"Found {len(submissions)} contact submissions")
-        
-        submissions_list = []
-        for submission in submissions:
-            submission_data = {
-                'id': submission.id,
-                'nombre': submission.nombre,
-                'email': submission.email,
-                'telefono': submission.telefono,
-                'dudas': submission.dudas,
-                'created_at': submission.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            submissions_list.append(submission_data)
-            logger.debug(f"Processed submission: {submission_data}")
-        
-        return jsonify({"submissions": submissions_list})
+
+        return tag_response(jsonify({
+            "submissions": [serialize_contact_submission(submission) for submission in submissions],
+            "since": sync_horizon()
+        }), etag)
     except Exception as e:
         logger.error(f"Error fetching contact submissions: {str(e)}", exc_info=True)
         return jsonify({"error": "Error fetching contact submissions", "details": str(e)}), 500
 
+@app.route('/api/contact-submissions/search', methods=['GET'])
+@require_pin
+def search_contact_submissions_endpoint():
+    """Ranked full-text search over contact name, email and message"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Missing search query"}), 400
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    try:
+        submissions, total = search_contact_submissions(query, page, per_page)
+        return jsonify({
+            "submissions": [serialize_contact_submission(submission) for submission in submissions],
+            "query": query,
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "has_more": page * per_page < total
+        })
+    except Exception as e:
+        logger.error(f"Error searching contact submissions: {str(e)}", exc_info=True)
+        return jsonify({"error": "Error searching contact submissions"}), 500
+
+def serialize_contact_submission(submission):
+    """Serialize a contact submission for the admin API"""
+    return {
+        'id': submission.id,
+        'nombre': submission.nombre,
+        'email': submission.email,
+        'telefono': submission.telefono,
+        'dudas': submission.dudas,
+        'created_at': submission.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def serialize_appointment(appointment):
+    """Serialize an appointment for the admin API"""
+    return {
+        'id': appointment.id,
+        'name': appointment.name,
+        'email': appointment.email,
+        'phone': getattr(appointment, 'phone', None),
+        'date': appointment.date.strftime('%Y-%m-%d'),
+        'time': appointment.time,
+        'service': appointment.service,
+        'status': getattr(appointment, 'status', 'Pendiente'),
+        'created_at': appointment.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def encode_appointment_cursor(appointment):
+    """Encode the (date, time, id) keyset position of an appointment as an opaque cursor"""
+    payload = json.dumps([appointment.date.strftime('%Y-%m-%d'), appointment.time, appointment.id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_appointment_cursor(cursor):
+    """Decode a cursor produced by encode_appointment_cursor"""
+    try:
+        date_str, time_str, appointment_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), str(time_str), int(appointment_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_date_param(name):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date for '{name}', expected YYYY-MM-DD")
+
+def filter_appointments_query(query):
+    """Apply the status, service, date range and free-text filters from the request args"""
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Appointment.status == status)
+
+    service = request.args.get('service')
+    if service:
+        query = query.filter(Appointment.service.ilike(f"{escape_like(service)}%", escape='\\'))
+
+    date_from = parse_date_param('date_from')
+    if date_from:
+        query = query.filter(Appointment.date >= date_from)
+
+    date_to = parse_date_param('date_to')
+    if date_to:
+        query = query.filter(Appointment.date <= date_to)
+
+    search = request.args.get('q', '').strip()
+    if search:
+        pattern = f"%{escape_like(search)}%"
+        query = query.filter(or_(
+            Appointment.name.ilike(pattern, escape='\\'),
+            Appointment.email.ilike(pattern, escape='\\')
+        ))
+
+    return query
+
 @app.route('/api/appointments', methods=['GET'])
 @require_pin
 def get_appointments():
     try:
-        logger.info("Fetching appointments from database")
-        appointments = Appointment.query.order_by(Appointment.date.desc(), Appointment.time.desc()).all()
-        logger.info(f"Found {len(appointments)} appointments")
-        
-        appointments_list = []
-        for appointment in appointments:
-            appointment_data = {
-                'id': appointment.id,
-                'name': appointment.name,
-                'email': appointment.email,
-                'phone': getattr(appointment, 'phone', None),
-                'date': appointment.date.strftime('%Y-%m-%d'),
-                'time': appointment.time,
-                'service': appointment.service,
-                'status': getattr(appointment, 'status', 'Pendiente'),
-                'created_at': appointment.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            appointments_list.append(appointment_data)
-            logger.debug(f"Processed appointment: {appointment_data}")
-        
-        return jsonify({"appointments": appointments_list})
+        etag = table_etag(Appointment)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+
+        # Delta sync: only rows changed since the cursor, including delete tombstones
+        since = request.args.get('since')
+        if since:
+            try:
+                changed, deleted, next_since, has_more = changes_since(Appointment, since)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return tag_response(jsonify({
+                "appointments": [serialize_appointment(appointment) for appointment in changed],
+                "deleted": deleted,
+                "since": next_since,
+                "has_more": has_more
+            }), etag)
+
+        try:
+            limit = min(max(int(request.args.get('limit', APPOINTMENTS_PAGE_SIZE)), 1), APPOINTMENTS_MAX_PAGE_SIZE)
+            ascending = request.args.get('order', 'desc').lower() == 'asc'
+            query = filter_appointments_query(Appointment.query.filter(Appointment.deleted_at.is_(None)))
+            filtered_query = query
+
+            cursor = request.args.get('cursor')
+            if cursor:
+                cursor_date, cursor_time, cursor_id = decode_appointment_cursor(cursor)
+                if ascending:
+                    query = query.filter(or_(
+                        Appointment.date > cursor_date,
+                        and_(Appointment.date == cursor_date, Appointment.time > cursor_time),
+                        and_(Appointment.date == cursor_date, Appointment.time == cursor_time, Appointment.id > cursor_id)
+                    ))
+                else:
+                    query = query.filter(or_(
+                        Appointment.date < cursor_date,
+                        and_(Appointment.date == cursor_date, Appointment.time < cursor_time),
+                        and_(Appointment.date == cursor_date, Appointment.time == cursor_time, Appointment.id < cursor_id)
+                    ))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if ascending:
+            query = query.order_by(Appointment.date.asc(), Appointment.time.asc(), Appointment.id.asc())
+        else:
+            query = query.order_by(Appointment.date.desc(), Appointment.time.desc(), Appointment.id.desc())
+
+        # Fetch one extra row to know whether there is a next page
+        appointments = query.limit(limit + 1).all()
+        has_more = len(appointments) > limit
+        appointments = appointments[:limit]
+        logger.info(f"Fetched page of {len(appointments)} appointments (has_more={has_more})")
+
+        response = {
+            "appointments": [serialize_appointment(appointment) for appointment in appointments],
+            "next_cursor": encode_appointment_cursor(appointments[-1]) if has_more else None,
+            "has_more": has_more,
+            "since": sync_horizon()
+        }
+        if request.args.get('include_total', '').lower() in ('1', 'true'):
+            response["total"] = filtered_query.order_by(None).count()
+
+        return tag_response(jsonify(response), etag)
     except Exception as e:
         logger.error(f"Error fetching appointments: {str(e)}", exc_info=True)
         return jsonify({"error": "Error fetching appointments", "details": str(e)}), 500
 
+def parse_export_format():
+    """The requested export format, csv by default"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}', expected one of: {', '.join(EXPORT_FORMATS)}")
+    return export_format
+
+@app.route('/api/appointments/export', methods=['GET'])
+@require_pin
+def export_appointments():
+    """Stream live appointments matching the listing filters as CSV or NDJSON"""
+    try:
+        export_format = parse_export_format()
+        query = filter_appointments_query(Appointment.query.filter(Appointment.deleted_at.is_(None)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = query.order_by(Appointment.date.asc(), Appointment.time.asc(), Appointment.id.asc())
+    filename = f"citas-{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    return stream_export(query, APPOINTMENT_EXPORT_COLUMNS, export_format, filename)
+
+@app.route('/api/contact-submissions/export', methods=['GET'])
+@require_pin
+def export_contact_submissions():
+    """Stream live contact submissions, optionally by creation date range, as CSV or NDJSON"""
+    try:
+        export_format = parse_export_format()
+        date_from = parse_date_param('date_from')
+        date_to = parse_date_param('date_to')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = ContactSubmission.query.filter(ContactSubmission.deleted_at.is_(None))
+    if date_from:
+        query = query.filter(ContactSubmission.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.filter(ContactSubmission.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    query = query.order_by(ContactSubmission.created_at.asc(), ContactSubmission.id.asc())
+    filename = f"consultas-{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    return stream_export(query, CONTACT_SUBMISSION_EXPORT_COLUMNS, export_format, filename)
+
+@app.route('/api/appointments/stats', methods=['GET'])
+@require_pin
+def get_appointments_stats():
+    """Dashboard summary and chart data computed with SQL aggregates"""
+    try:
+        date_from = parse_date_param('date_from')
+        date_to = parse_date_param('date_to')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        return jsonify(get_appointment_stats(date_from, date_to))
+    except Exception as e:
+        logger.error(f"Error computing appointment stats: {str(e)}", exc_info=True)
+        return jsonify({"error": "Error computing appointment stats"}), 500
+
+@app.route('/api/availability/cache-stats', methods=['GET'])
+@require_pin
+def get_availability_cache_stats():
+    return jsonify(availability_cache.stats())
+
+@app.route('/api/email-outbox/stats', methods=['GET'])
+@require_pin
+def get_email_outbox_stats():
+    return jsonify(get_outbox_stats())
+
+@app.route('/api/rate-limit/stats', methods=['GET'])
+@require_pin
+def get_rate_limit_stats():
+    return jsonify(rate_limiter.stats())
+
+@app.route('/api/chatbot/stats', methods=['GET'])
+@require_pin
+def get_chatbot_stats():
+    return jsonify({
+        'conversations': conversation_store.stats(),
+        'prompts': prompt_stats.snapshot(),
+        'streaming': stream_stats.snapshot(),
+        'response_cache': response_cache.stats(),
+        'intents': intent_stats.snapshot(),
+        'llm': llm_client.stats()
+    })
+
+@app.route('/api/profiles', methods=['GET'])
+@require_pin
+def list_request_profiles():
+    return jsonify({
+        'profiler': profiler.profile_store.stats(),
+        'profiles': [profiler.public_entry(entry) for entry in profiler.profile_store.list()]
+    })
+
+@app.route('/api/profiles', methods=['DELETE'])
+@require_pin
+def clear_request_profiles():
+    profiler.profile_store.clear()
+    return jsonify({"message": "Profiles cleared"})
+
+@app.route('/api/profiles/<int:profile_id>', methods=['GET'])
+@require_pin
+def get_request_profile(profile_id):
+    entry = profiler.profile_store.get(profile_id)
+    if not entry:
+        return jsonify({"error": "Profile not found"}), 404
+    return jsonify(profiler.public_entry(entry, detail=True))
+
+@app.route('/api/profiles/<int:profile_id>/download', methods=['GET'])
+@require_pin
+def download_request_profile(profile_id):
+    entry = profiler.profile_store.get(profile_id)
+    if not entry:
+        return jsonify({"error": "Profile not found"}), 404
+    if '_stats' not in entry:
+        return jsonify({"error": "Request was captured for being slow and has SQL timings only"}), 404
+    response = Response(profiler.profile_file(entry), content_type='application/octet-stream')
+    response.headers['Content-Disposition'] = f'attachment; filename="request-{profile_id}.prof"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @app.route('/api/appointments/<int:appointment_id>', methods=['DELETE'])
 @require_pin
 def delete_appointment(appointment_id):
     try:
         appointment = Appointment.query.get(appointment_id)
-        if not appointment:
+        if not appointment or appointment.deleted_at:
             return jsonify({"error": "Appointment not found"}), 404
         
-        db.session.delete(appointment)
+        appointment_date = appointment.date
+        # Soft delete: the tombstone lets syncing clients drop the row too
+        appointment.mark_deleted()
         db.session.commit()
+        availability_cache.invalidate(appointment_date)
+        appointment_stats_cache.invalidate()
+        try:
+            cancel_reminder_email(appointment_id)
+        except Exception as e:
+            # The reminder job skips deleted appointments when it runs
+            logger.error(f"Appointment {appointment_id} deleted but its reminder was not cancelled: {str(e)}")
         logger.info(f"Appointment {appointment_id} deleted successfully")
         
         return jsonify({"message": "Appointment deleted successfully"})
@@ -206,10 +547,11 @@ def delete_appointment(appointment_id):
 def update_appointment(appointment_id):
     try:
         appointment = Appointment.query.get(appointment_id)
-        if not appointment:
+        if not appointment or appointment.deleted_at:
             return jsonify({"error": "Appointment not found"}), 404
         
         data = request.get_json()
+        previous_date = appointment.date
         
         # Update appointment fields
         appointment.name = data.get('name', appointment.name)
@@ -220,28 +562,31 @@ def update_appointment(appointment_id):
         appointment.service = data.get('service', appointment.service)
         appointment.status = data.get('status', 'Pendiente')
         
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            logger.warning(f"Appointment {appointment_id} update rejected: slot already booked")
+            return jsonify({"error": "Slot already booked", "code": "SLOT_TAKEN"}), 409
+        availability_cache.invalidate(previous_date, appointment.date)
+        appointment_stats_cache.invalidate()
+        try:
+            schedule_reminder_email(appointment)
+        except Exception as e:
+            # The update is saved; the startup reconciliation reschedules a missing reminder
+            logger.error(f"Appointment {appointment_id} updated but its reminder was not rescheduled: {str(e)}")
         logger.info(f"Appointment {appointment_id} updated successfully")
         
         return jsonify({
             "message": "Appointment updated successfully",
-            "appointment": {
-                'id': appointment.id,
-                'name': appointment.name,
-                'email': appointment.email,
-                'phone': appointment.phone,
-                'date': appointment.date.strftime('%Y-%m-%d'),
-                'time': appointment.time,
-                'service': appointment.service,
-                'status': appointment.status,
-                'created_at': appointment.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            }
+            "appointment": serialize_appointment(appointment)
         })
     except Exception as e:
         logger.error(f"Error updating appointment: {str(e)}")
         return jsonify({"error": "Error updating appointment"}), 500
 
 @app.route('/api/contact', methods=['POST'])
+@rate_limited('contact', limit=CONTACT_RATE_LIMIT)
 def handle_contact_form():
     try:
         data = request.get_json()
@@ -263,11 +608,15 @@ def handle_contact_form():
                 dudas=data['dudas']
             )
             db.session.add(submission)
+            # Email notifications are committed together with the submission
+            enqueue_email('contact_form', {
+                'nombre': data['nombre'],
+                'email': data['email'],
+                'telefono': data['telefono'],
+                'dudas': data['dudas']
+            })
             db.session.commit()
             
-            # Send email notifications
-            send_contact_form_notification(data)
-            
             return jsonify({
                 "message": "Formulario enviado exitosamente",
                 "detail": "Hemos recibido tu consulta y nos pondremos en contacto contigo pronto."
@@ -288,15 +637,16 @@ def handle_contact_form():
             "detail": "Ha ocurrido un error inesperado. Por favor, inténtalo de nuevo más tarde."
         }), 500
 
+def conversation_unknown():
+    """409 for a conversation id that expired or was never issued, so the client starts over visibly"""
+    return jsonify({
+        "error": "Conversation expired or unknown",
+        "code": "CONVERSATION_UNKNOWN"
+    }), 409
+
 @app.route('/api/chatbot', methods=['POST'])
+@rate_limited('chatbot')
 def chatbot_response():
-    client_ip = request.remote_addr
-    if not check_rate_limit(client_ip):
-        return jsonify({
-            "error": "Rate limit exceeded",
-            "retry_after": RATE_WINDOW
-        }), 429
-
     try:
         data = request.get_json()
         if not data:
@@ -306,14 +656,73 @@ def chatbot_response():
         if not message:
             return jsonify({"error": "Empty message"}), 400
 
-        conversation_history = data.get('conversation_history', [])
-        response = generate_response(message, conversation_history)
-        return jsonify({"response": response})
+        # Legacy clients replay the whole history; current ones send a conversation id
+        if 'conversation_history' in data and not data.get('conversation_id'):
+            response = generate_response(message, data.get('conversation_history') or [])
+            return jsonify({"response": response})
+
+        conversation = conversation_store.get_or_create(data.get('conversation_id'))
+        if conversation is None:
+            return conversation_unknown()
+        with conversation.lock:
+            response = generate_response(message, conversation=conversation)
+            conversation_store.save(conversation)
+        return jsonify({"response": response, "conversation_id": conversation.id})
 
     except Exception as e:
         logger.error(f"Error in chatbot response: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+def sse_event(event, data):
+    """Format one Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/chatbot/stream', methods=['POST'])
+@rate_limited('chatbot')
+def chatbot_stream():
+    """Relay the chatbot reply as Server-Sent Events while it is generated"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    message = data.get('message', '').strip()
+    if not message:
+        return jsonify({"error": "Empty message"}), 400
+
+    conversation = conversation_store.get_or_create(data.get('conversation_id'))
+    if conversation is None:
+        return conversation_unknown()
+
+    def events():
+        with conversation.lock:
+            replies = generate_response_stream(message, conversation)
+            try:
+                yield sse_event('meta', {"conversation_id": conversation.id})
+                try:
+                    for delta in replies:
+                        yield sse_event('delta', {"text": delta})
+                except Exception as e:
+                    logger.error(f"Error in chatbot stream: {str(e)}")
+                    yield sse_event('error', {"error": "Internal server error"})
+                    return
+                yield sse_event('done', {})
+            finally:
+                # Also runs when the client disconnects: keep whatever the turn stored so far
+                replies.close()
+                try:
+                    conversation_store.save(conversation)
+                except Exception as e:
+                    logger.error(f"Could not save conversation {conversation.id}: {str(e)}")
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # keep nginx from buffering the stream
+        }
+    )
+
 def validate_contact_form(data):
     """Validate contact form data"""
     errors = {}
@@ -344,8 +753,11 @@ if __name__ == "__main__":
     with app.app_context():
         try:
             db.create_all()
+            ensure_schema(db.engine)
+            ensure_search_index(db.engine)
             logger.info("Database tables created successfully")
         except Exception as e:
             logger.error(f"Error creating database tables: {e}", exc_info=True)
+    start_scheduler()
     
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+import logging
+import os
+import threading
+import time
+from sqlalchemy import func, case
+from models import db, Appointment
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+APPOINTMENT_STATS_TTL = int(os.getenv('APPOINTMENT_STATS_TTL', 300))  # seconds
+TIMELINE_DAYS = 30  # default timeline: this many days either side of today
+DEFAULT_STATUS = 'Pendiente'
+
+class AppointmentStatsCache:
+    """Dashboard aggregates keyed by (today, date range), with TTL and write invalidation"""
+    def __init__(self, ttl=APPOINTMENT_STATS_TTL):
+        self.ttl = ttl
+        self._entries = {}  # key -> (stats, expires_at)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, key):
+        """Return (stats or None, generation)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self.hits += 1
+                return entry[0], self._generation
+            self.misses += 1
+            return None, self._generation
+
+    def store(self, key, stats, generation):
+        """Store computed stats unless an appointment was written meanwhile"""
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (stats, time.monotonic() + self.ttl)
+
+    def invalidate(self):
+        """Drop every cached aggregate; called after appointment writes"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations
+            }
+
+appointment_stats_cache = AppointmentStatsCache()
+
+def compute_appointment_stats(today, date_from, date_to):
+    """Summary counts and chart series using GROUP BY aggregates instead of loading rows"""
+    live = Appointment.deleted_at.is_(None)
+    total, today_count, upcoming_count = db.session.query(
+        func.count(Appointment.id),
+        func.coalesce(func.sum(case((Appointment.date == today, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Appointment.date > today, 1), else_=0)), 0)
+    ).filter(live).one()
+
+    by_status = {}
+    status_counts = db.session.query(Appointment.status, func.count(Appointment.id)).filter(live).group_by(Appointment.status)
+    for status, count in status_counts:
+        label = status or DEFAULT_STATUS
+        by_status[label] = by_status.get(label, 0) + count
+
+    by_service = dict(
+        db.session.query(Appointment.service, func.count(Appointment.id)).filter(live).group_by(Appointment.service).all()
+    )
+
+    timeline = db.session.query(Appointment.date, func.count(Appointment.id)).filter(
+        live,
+        Appointment.date >= date_from,
+        Appointment.date <= date_to
+    ).group_by(Appointment.date).order_by(Appointment.date).all()
+
+    return {
+        'total': total,
+        'today': int(today_count),
+        'upcoming': int(upcoming_count),
+        'by_status': by_status,
+        'by_service': by_service,
+        'by_date': [{'date': day.isoformat(), 'count': count} for day, count in timeline],
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat()
+    }
+
+def get_appointment_stats(date_from=None, date_to=None, today=None):
+    """Cached dashboard aggregates; the timeline defaults to TIMELINE_DAYS around today"""
+    today = today or date.today()
+    date_from = date_from or today - timedelta(days=TIMELINE_DAYS)
+    date_to = date_to or today + timedelta(days=TIMELINE_DAYS)
+    key = (today, date_from, date_to)
+
+    stats, generation = appointment_stats_cache.lookup(key)
+    if stats is None:
+        stats = compute_appointment_stats(today, date_from, date_to)
+        appointment_stats_cache.store(key, stats, generation)
+    return stats
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import time
+from models import Appointment, CANCELLED_STATUS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bookable time grid: every 30 minutes from 10:30 to 14:00, built once at import
+SLOT_START = "10:30"
+SLOT_END = "14:00"
+SLOT_MINUTES = 30
+
+def _build_slot_times():
+    """Build the list of bookable HH:MM slot labels"""
+    times = []
+    current_time = datetime.strptime(SLOT_START, "%H:%M")
+    end_time = datetime.strptime(SLOT_END, "%H:%M")
+    while current_time <= end_time:
+        times.append(current_time.strftime("%H:%M"))
+        current_time += timedelta(minutes=SLOT_MINUTES)
+    return tuple(times)
+
+SLOT_TIMES = _build_slot_times()
+SLOT_BITS = {time_str: 1 << i for i, time_str in enumerate(SLOT_TIMES)}
+FULL_DAY_MASK = (1 << len(SLOT_TIMES)) - 1
+
+LOOKAHEAD_DAYS = 14  # Look ahead 14 days to find 7 available slots
+MAX_SLOT_DAYS = 7
+
+AVAILABILITY_CACHE_TTL = int(os.getenv('AVAILABILITY_CACHE_TTL', 60))  # seconds
+
+class AvailabilityCache:
+    """In-process cache of booked-slot bitmaps keyed by date, with TTL and explicit invalidation"""
+    def __init__(self, ttl=AVAILABILITY_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}  # date -> (bitmap, expires_at)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, dates):
+        """Return ({date: bitmap} for cached dates, [missing dates], generation)"""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for check_date in dates:
+                entry = self._entries.get(check_date)
+                if entry and entry[1] > now:
+                    found[check_date] = entry[0]
+                else:
+                    missing.append(check_date)
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing, self._generation
+
+    def store(self, bitmaps, generation):
+        """Store freshly computed bitmaps unless an invalidation happened meanwhile"""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation != self._generation:
+                return
+            for check_date, bitmap in bitmaps.items():
+                self._entries[check_date] = (bitmap, expires_at)
+
+    def invalidate(self, *dates):
+        """Drop cached availability for the given dates (all dates when none given)"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if not dates:
+                self._entries.clear()
+                return
+            for check_date in dates:
+                if check_date is not None:
+                    self._entries.pop(check_date, None)
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'ttl': self.ttl
+            }
+
+availability_cache = AvailabilityCache()
+
+def format_date_spanish(date_str):
+    """Format date in Spanish"""
+    try:
+        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+        return date_obj.strftime('%-d de %B de %Y').lower()
+    except:
+        return date_str
+
+def query_booked_bitmaps(start_date, end_date):
+    """Return a {date: bitmask} of booked slots between two dates using a single range query"""
+    bitmaps = {}
+    rows = Appointment.query.with_entities(Appointment.date, Appointment.time).filter(
+        Appointment.date >= start_date,
+        Appointment.date <= end_date,
+        (Appointment.status == None) | (Appointment.status != CANCELLED_STATUS),
+        Appointment.deleted_at.is_(None)
+    ).all()
+    for booked_date, booked_time in rows:
+        bit = SLOT_BITS.get(booked_time)
+        if bit:
+            bitmaps[booked_date] = bitmaps.get(booked_date, 0) | bit
+    return bitmaps
+
+def get_booked_bitmaps(start_date, end_date):
+    """Return a {date: bitmask} of booked slots between two dates, served from the cache when fresh"""
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    bitmaps, missing, generation = availability_cache.lookup(dates)
+    if missing:
+        # One range query covering every date that was not cached
+        fetched = query_booked_bitmaps(min(missing), max(missing))
+        fresh = {check_date: fetched.get(check_date, 0) for check_date in missing}
+        availability_cache.store(fresh, generation)
+        bitmaps.update(fresh)
+    return bitmaps
+
+def times_from_bitmap(booked_mask):
+    """List the free slot labels for a day given its booked bitmask"""
+    free_mask = ~booked_mask & FULL_DAY_MASK
+    return [time_str for time_str, bit in SLOT_BITS.items() if free_mask & bit]
+
+def get_available_slots(now=None):
+    """Get available appointment slots for the next weekdays"""
+    current_date = (now or datetime.now()).date()
+    end_date = current_date + timedelta(days=LOOKAHEAD_DAYS - 1)
+    bitmaps = get_booked_bitmaps(current_date, end_date)
+
+    slots = []
+    for i in range(LOOKAHEAD_DAYS):
+        check_date = current_date + timedelta(days=i)
+        if check_date.weekday() >= 5:  # Monday = 0, Friday = 4
+            continue
+
+        booked_mask = bitmaps.get(check_date, 0)
+        if booked_mask == FULL_DAY_MASK:
+            continue
+
+        date_str = check_date.strftime("%Y-%m-%d")
+        slots.append({
+            'date': date_str,
+            'formatted_date': format_date_spanish(date_str),
+            'times': times_from_bitmap(booked_mask)
+        })
+
+        if len(slots) >= MAX_SLOT_DAYS:
+            break
+
+    return slots
+
+def get_available_times(date_str):
+    """Get the free time slots for a single date (YYYY-MM-DD)"""
+    check_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    bitmaps = get_booked_bitmaps(check_date, check_date)
+    return times_from_bitmap(bitmaps.get(check_date, 0))
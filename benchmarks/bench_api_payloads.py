@@ -0,0 +1,99 @@
+"""Appointment listing payloads: serialization time per JSON backend and bytes on the wire per content-coding.
+
+Seeds an in-memory database, then encodes a 100-row API page and the full table.
+Usage: python benchmarks/bench_api_payloads.py [--appointments N] [--iterations N]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from common import create_bench_app, percentile
+from models import db, Appointment
+from availability import SLOT_TIMES
+import compression
+import json_provider
+
+PAGE_SIZE = 100  # the admin API's largest page
+SERVICES = ('Inteligencia Artificial (hasta 6.000€)', 'Ventas Digitales (hasta 6.000€)', 'Estrategia y Rendimiento (hasta 6.000€)')
+STATUSES = ('Pendiente', 'Confirmada', 'Cancelada', 'Completada')
+
+def seed(count):
+    """Insert count appointments, one per slot going back from today"""
+    today = datetime.now().date()
+    rows = [{
+        'name': f'Cliente Bench {i}',
+        'email': f'cliente{i}@empresa-ejemplo.es',
+        'phone': f'6{random.randint(10000000, 99999999)}',
+        'date': today - timedelta(days=i // len(SLOT_TIMES)),
+        'time': SLOT_TIMES[i % len(SLOT_TIMES)],
+        'service': random.choice(SERVICES),
+        'status': random.choice(STATUSES),
+        'created_at': datetime.now(),
+        'updated_at': datetime.now()
+    } for i in range(count)]
+    db.session.execute(Appointment.__table__.insert(), rows)
+    db.session.commit()
+
+def serialize(appointment):
+    """Same shape as the admin API's serialize_appointment"""
+    return {
+        'id': appointment.id,
+        'name': appointment.name,
+        'email': appointment.email,
+        'phone': appointment.phone,
+        'date': appointment.date.strftime('%Y-%m-%d'),
+        'time': appointment.time,
+        'service': appointment.service,
+        'status': appointment.status,
+        'created_at': appointment.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def time_encoding(provider, payload, iterations):
+    """Latency samples in ms for building the JSON response, and its body"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        body = provider.response(payload).get_data()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--appointments', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        seed(args.appointments)
+        appointments = [serialize(appointment) for appointment in Appointment.query.order_by(Appointment.id).all()]
+        payloads = {
+            f'page of {PAGE_SIZE}': {'appointments': appointments[:PAGE_SIZE], 'has_more': True},
+            f'all {len(appointments)}': {'appointments': appointments, 'has_more': False}
+        }
+        providers = {backend: json_provider.create_json_provider(app, backend) for backend in ('default', 'orjson')}
+
+        print(f"{'payload':<14} {'backend':<8} {'p50 ms':>9} {'p95 ms':>9}")
+        bodies = {}
+        for label, payload in payloads.items():
+            iterations = args.iterations if len(payload['appointments']) > PAGE_SIZE else args.iterations * 50
+            for backend, provider in providers.items():
+                samples, body = time_encoding(provider, payload, iterations)
+                bodies.setdefault(label, body)
+                print(f"{label:<14} {backend:<8} {percentile(samples, 50):>9.3f} {percentile(samples, 95):>9.3f}")
+
+        print(f"\n{'payload':<14} {'encoding':<9} {'bytes':>12} {'ratio':>7} {'compress ms':>12}")
+        for label, body in bodies.items():
+            print(f"{label:<14} {'identity':<9} {len(body):>12,} {1:>7.3f} {0:>12.3f}")
+            for encoding in ('gzip', 'br'):
+                if encoding == 'br' and compression.brotli is None:
+                    continue
+                start = time.perf_counter()
+                compressed = compression.compress(body, encoding)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"{label:<14} {encoding:<9} {len(compressed):>12,} {len(compressed) / len(body):>7.3f} {elapsed:>12.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Compare the legacy per-day availability loop with the single-query bitmap engine (cold and cached).
+
+Usage: python benchmarks/bench_availability.py [--appointments N] [--iterations N]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from common import create_bench_app, QueryCounter, percentile
+from models import db, Appointment
+from availability import get_available_slots, availability_cache, format_date_spanish, SLOT_TIMES
+
+def legacy_get_available_slots():
+    """The original implementation: one query per weekday and strptime/strftime per slot
+
+    Cancelled bookings are skipped so the output is comparable with the engine.
+    """
+    slots = []
+    current_date = datetime.now()
+    for i in range(14):
+        check_date = current_date + timedelta(days=i)
+        if check_date.weekday() < 5:
+            booked_times = set(
+                apt.time for apt in Appointment.query.filter_by(
+                    date=check_date.date()
+                ).all()
+                if apt.status != 'Cancelada'
+            )
+            available_times = []
+            start_time = datetime.strptime("10:30", "%H:%M")
+            end_time = datetime.strptime("14:00", "%H:%M")
+            current_time = start_time
+            while current_time <= end_time:
+                time_str = current_time.strftime("%H:%M")
+                if time_str not in booked_times:
+                    available_times.append(time_str)
+                current_time += timedelta(minutes=30)
+            if available_times:
+                slots.append({
+                    'date': check_date.strftime("%Y-%m-%d"),
+                    'formatted_date': format_date_spanish(check_date.strftime("%Y-%m-%d")),
+                    'times': available_times
+                })
+            if len(slots) >= 7:
+                break
+    return slots
+
+def seed(count):
+    """Seed appointments over the past year and the next two weeks, one active booking per slot"""
+    today = datetime.now().date()
+    free_slots = [
+        (today + timedelta(days=offset), time_str)
+        for offset in range(-365, 15)
+        for time_str in SLOT_TIMES
+    ]
+    random.shuffle(free_slots)
+    rows = []
+    for i in range(count):
+        if free_slots:
+            slot_date, slot_time = free_slots.pop()
+            status = 'Pendiente'
+        else:
+            # Every slot is taken; the rest are cancelled bookings
+            slot_date = today + timedelta(days=random.randint(-365, 14))
+            slot_time = random.choice(SLOT_TIMES)
+            status = 'Cancelada'
+        rows.append(Appointment(
+            name=f'Bench {i}',
+            email=f'bench{i}@example.com',
+            date=slot_date,
+            time=slot_time,
+            service='Inteligencia Artificial (hasta 6.000€)',
+            status=status
+        ))
+    db.session.bulk_save_objects(rows)
+    db.session.commit()
+
+def measure(func, iterations):
+    """Return (query count per call, latency samples in ms, last result)"""
+    samples = []
+    with QueryCounter(db.engine) as counter:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            result = func()
+            samples.append((time.perf_counter() - start) * 1000)
+    return counter.count / iterations, samples, result
+
+def cold_get_available_slots():
+    """Engine with the availability cache dropped before every call"""
+    availability_cache.invalidate()
+    return get_available_slots()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--appointments', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        db.create_all()
+        seed(args.appointments)
+
+        legacy_queries, legacy_samples, legacy_result = measure(legacy_get_available_slots, args.iterations)
+        engine_queries, engine_samples, engine_result = measure(cold_get_available_slots, args.iterations)
+        cached_queries, cached_samples, cached_result = measure(get_available_slots, args.iterations)
+
+        assert legacy_result == engine_result == cached_result, "Engine output differs from legacy implementation"
+
+        print(f"{'implementation':<12} {'queries':>8} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, queries, samples in (
+            ('legacy', legacy_queries, legacy_samples),
+            ('engine', engine_queries, engine_samples),
+            ('cached', cached_queries, cached_samples),
+        ):
+            print(f"{name:<12} {queries:>8.1f} {percentile(samples, 50):>9.3f} {percentile(samples, 95):>9.3f}")
+        print(f"cache stats: {availability_cache.stats()}")
+
+if __name__ == '__main__':
+    main()
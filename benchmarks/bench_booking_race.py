@@ -0,0 +1,79 @@
+"""Book the same slot from many threads at once and check that exactly one booking wins.
+
+Usage: python benchmarks/bench_booking_race.py [--threads N]
+"""
+import argparse
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+os.environ.setdefault('OPENAI_API_KEY', 'bench')
+
+from common import create_bench_app
+from models import db, Appointment
+from chatbot import BookingSession, handle_booking_step, SERVICES
+from email_utils import mail
+
+def next_weekday():
+    """Return the next weekday at least two days from now"""
+    day = datetime.now().date() + timedelta(days=2)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    # A file database so every thread gets its own connection
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    app = create_bench_app(f'sqlite:///{db_file.name}')
+    app.config['MAIL_SUPPRESS_SEND'] = True
+    mail.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    slot_date = next_weekday()
+    barrier = threading.Barrier(args.threads)
+    results = []
+    results_lock = threading.Lock()
+
+    def book(worker):
+        with app.app_context():
+            session = BookingSession()
+            session.state = 'REVIEWING_JSON'
+            session.data = {
+                'name': f'Cliente {worker}',
+                'email': f'cliente{worker}@example.com',
+                'service': SERVICES[0],
+                'date': slot_date.strftime('%Y-%m-%d'),
+                'formatted_date': slot_date.strftime('%Y-%m-%d'),
+                'time': '10:30'
+            }
+            barrier.wait()
+            response = handle_booking_step('sí', session)
+            with results_lock:
+                results.append((session.state, 'BOOKING_COMPLETE' in response))
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        booked = Appointment.query.filter_by(date=slot_date, time='10:30').count()
+
+    confirmed = sum(1 for _, completed in results if completed)
+    offered_alternatives = sum(1 for state, _ in results if state in ('SELECTING_TIME', 'SELECTING_DATE'))
+    print(f"threads={args.threads} confirmed={confirmed} rows={booked} offered_alternatives={offered_alternatives}")
+    os.unlink(db_file.name)
+
+    assert booked == 1, f"Expected exactly one appointment for the slot, found {booked}"
+    assert confirmed == 1, f"Expected exactly one confirmation, got {confirmed}"
+    assert offered_alternatives == args.threads - 1
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Time until the user sees text: blocking completion versus streamed deltas.
+
+Runs against the fake OpenAI server in this directory, so no API key or network is needed.
+Usage: python benchmarks/bench_chatbot_stream.py [--requests N] [--first-token-delay S] [--chunk-delay S]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'sk-bench')
+os.environ.setdefault('MODELO_FINETUNED', 'fake-model')
+
+from common import percentile
+from fake_openai import FakeOpenAI
+import openai
+from chatbot import generate_openai_response, stream_openai_response, stream_stats
+from response_cache import response_cache
+
+QUESTION = '¿Qué es el programa KIT CONSULTING?'
+
+def run_blocking(count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        generate_openai_response(QUESTION, [])
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def run_streaming(count):
+    first, total = [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        seen = None
+        for _delta in stream_openai_response(QUESTION, []):
+            if seen is None:
+                seen = time.perf_counter() - start
+        total.append((time.perf_counter() - start) * 1000)
+        first.append(seen * 1000)
+    return first, total
+
+def report(label, samples):
+    print(f"{label:<28} p50 {percentile(samples, 50):7.1f}ms  p95 {percentile(samples, 95):7.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--first-token-delay', type=float, default=0.4)
+    parser.add_argument('--chunk-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = FakeOpenAI(first_token_delay=args.first_token_delay, chunk_delay=args.chunk_delay).start()
+    openai.api_base = server.api_base
+    # Every request should reach the upstream
+    response_cache.max_entries = 0
+
+    blocking = run_blocking(args.requests)
+    first, total = run_streaming(args.requests)
+
+    report('blocking: first text', blocking)
+    report('streaming: first token', first)
+    report('streaming: complete', total)
+    print(f"stream stats: {stream_stats.snapshot()}")
+
+if __name__ == '__main__':
+    main()
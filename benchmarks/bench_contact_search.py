@@ -0,0 +1,95 @@
+"""Contact submission search: whole-table download versus LIKE scans versus the FTS5 index.
+
+Usage: python benchmarks/bench_contact_search.py [--submissions N] [--iterations N]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from common import create_bench_app, percentile
+from models import db, ContactSubmission
+import contact_search
+from contact_search import ensure_search_index, search_contact_submissions
+
+WORDS = (
+    'inteligencia artificial ventas digitales estrategia análisis datos contabilidad facturación '
+    'ciberseguridad comercio electrónico tienda online clientes proceso automatización chatbot '
+    'subvención ayuda kit consulting empresa pyme empleados presupuesto plazo solicitud información '
+    'marketing posicionamiento web redes sociales inventario logística almacén nóminas recursos humanos'
+).split()
+NAMES = ('Ana', 'Luis', 'Marta', 'Jorge', 'Lucía', 'Pablo', 'Elena', 'Sergio', 'Carmen', 'Diego')
+SURNAMES = ('García', 'Martínez', 'López', 'Sánchez', 'Pérez', 'Gómez', 'Ruiz', 'Hernández', 'Díaz', 'Moreno')
+QUERIES = ('contabilidad', 'analisis datos', 'chatbot ventas', 'ciberseg', 'Lucía Moreno', 'logística inventario almacén')
+PAGE_SIZE = 20
+
+def seed(count):
+    """Insert count submissions with random Spanish messages"""
+    now = datetime.now()
+    rows = []
+    for i in range(count):
+        name = f'{random.choice(NAMES)} {random.choice(SURNAMES)}'
+        rows.append({
+            'nombre': name,
+            'email': f'{name.split()[0].lower()}{i}@empresa{i % 500}.es',
+            'telefono': f'6{random.randint(10000000, 99999999)}',
+            'dudas': ' '.join(random.choices(WORDS, k=random.randint(8, 40))).capitalize() + '.',
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now - timedelta(minutes=i)
+        })
+    db.session.execute(ContactSubmission.__table__.insert(), rows)
+    db.session.commit()
+
+def download_and_filter(query):
+    """What the admin page did: fetch every live submission and filter it client side"""
+    terms = contact_search.search_terms(query)
+    submissions = ContactSubmission.query.filter(
+        ContactSubmission.deleted_at.is_(None)
+    ).order_by(ContactSubmission.created_at.desc()).all()
+    return [s for s in submissions if all(
+        term in f'{s.nombre} {s.email} {s.dudas}'.lower() for term in terms
+    )][:PAGE_SIZE]
+
+def measure(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        for query in QUERIES:
+            db.session.expire_all()
+            start = time.perf_counter()
+            func(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        db.create_all()
+        seed(args.submissions)
+
+        like_samples = measure(lambda q: search_contact_submissions(q, 1, PAGE_SIZE), args.iterations)
+        legacy_samples = measure(download_and_filter, 1)
+
+        start = time.perf_counter()
+        ensure_search_index(db.engine)
+        build_seconds = time.perf_counter() - start
+        fts_samples = measure(lambda q: search_contact_submissions(q, 1, PAGE_SIZE), args.iterations)
+
+        print(f"{'implementation':<22} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, samples in (
+            ('download + filter', legacy_samples),
+            ('LIKE scan', like_samples),
+            ('FTS5 index', fts_samples),
+        ):
+            print(f"{name:<22} {percentile(samples, 50):>9.2f} {percentile(samples, 95):>9.2f}")
+        print(f"index build for {args.submissions} rows: {build_seconds:.2f}s")
+        for query in QUERIES:
+            _, total = search_contact_submissions(query, 1, PAGE_SIZE)
+            print(f"  {query!r}: {total} matches")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Messages rendered per second for a bulk reminder run: per-call render_template and
+logo read versus the pre-compiled renderer with the cached logo.
+
+Usage: python benchmarks/bench_email_render.py [--messages N]
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from common import create_bench_app
+from flask import render_template, current_app
+from flask_mail import Message
+from models import Appointment
+from email_utils import mail, appointment_email_context
+from email_rendering import build_email, get_renderer
+
+def legacy_reminder(appointment):
+    """The original message construction path"""
+    msg = Message(
+        f'{os.getenv("APP_NAME", "KIT CONSULTING")} - Recordatorio de Cita',
+        sender=current_app.config['MAIL_USERNAME'],
+        recipients=[appointment.email]
+    )
+    msg.html = render_template('email/appointment_reminder.html', **appointment_email_context(appointment))
+    with current_app.open_resource('static/disenyo/SVG/01-LOGO.svg') as logo:
+        msg.attach('logo.svg', 'image/svg+xml', logo.read(), 'inline',
+                   headers={'Content-ID': '<logo>'})
+    return msg
+
+def rendered_reminder(appointment):
+    return build_email('Recordatorio de Cita', [appointment.email],
+                       'email/appointment_reminder.html', appointment_email_context(appointment))
+
+def run(build, appointments):
+    start = time.perf_counter()
+    size = 0
+    for appointment in appointments:
+        size += len(build(appointment).as_bytes())
+    elapsed = time.perf_counter() - start
+    return len(appointments) / elapsed, size / len(appointments)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    mail.init_app(app)
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    appointments = [
+        Appointment(id=i, name=f'Cliente {i}', email=f'cliente{i}@example.com', date=tomorrow,
+                    time='10:30', service='Inteligencia Artificial (hasta 6.000€)')
+        for i in range(args.messages)
+    ]
+
+    with app.app_context():
+        get_renderer()  # compile templates and load the logo outside the timed section
+        legacy_rate, legacy_size = run(legacy_reminder, appointments)
+        renderer_rate, renderer_size = run(rendered_reminder, appointments)
+
+    print(f"{'path':<10} {'msgs/s':>10} {'bytes/msg':>10}")
+    print(f"{'legacy':<10} {legacy_rate:>10.0f} {legacy_size:>10.0f}")
+    print(f"{'renderer':<10} {renderer_rate:>10.0f} {renderer_size:>10.0f}")
+
+if __name__ == '__main__':
+    main()
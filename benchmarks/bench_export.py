@@ -0,0 +1,85 @@
+"""Peak Python memory of exporting appointments: streamed export versus building the whole listing.
+
+Usage: python benchmarks/bench_export.py [--sizes 25000,50000,100000]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from flask import current_app
+from common import create_bench_app
+from models import db, Appointment
+from availability import SLOT_TIMES
+from exports import stream_export, APPOINTMENT_EXPORT_COLUMNS
+
+def seed(count):
+    """Grow the table to count appointments, one per slot going back from today"""
+    today = datetime.now().date()
+    start = Appointment.query.count()
+    rows = [{
+        'name': f'Cliente Bench {i}',
+        'email': f'cliente{i}@empresa-ejemplo.es',
+        'phone': '600000000',
+        'date': today - timedelta(days=i // len(SLOT_TIMES)),
+        'time': SLOT_TIMES[i % len(SLOT_TIMES)],
+        'service': 'Inteligencia Artificial (hasta 6.000€)',
+        'status': 'Pendiente',
+        'created_at': datetime.now(),
+        'updated_at': datetime.now()
+    } for i in range(start, count)]
+    if rows:
+        db.session.execute(Appointment.__table__.insert(), rows)
+        db.session.commit()
+
+def streamed(export_format):
+    query = Appointment.query.filter(Appointment.deleted_at.is_(None)).order_by(Appointment.id)
+    response = stream_export(query, APPOINTMENT_EXPORT_COLUMNS, export_format, f'bench.{export_format}')
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    return size
+
+def in_memory():
+    """The all-rows JSON listing the admin API used to build"""
+    appointments = Appointment.query.filter(Appointment.deleted_at.is_(None)).order_by(Appointment.id).all()
+    body = current_app.json.dumps([{
+        'id': a.id, 'name': a.name, 'email': a.email, 'phone': a.phone,
+        'date': a.date.strftime('%Y-%m-%d'), 'time': a.time, 'service': a.service,
+        'status': a.status, 'created_at': a.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    } for a in appointments])
+    return len(body)
+
+def measure(func, *args):
+    """(peak MiB, seconds, bytes produced)"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return peak, elapsed, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='25000,50000,100000')
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        print(f"{'rows':>8} {'method':<12} {'peak MiB':>9} {'seconds':>8} {'MiB out':>8}")
+        for count in (int(size) for size in args.sizes.split(',')):
+            seed(count)
+            for label, func, func_args in (
+                ('csv stream', streamed, ('csv',)),
+                ('ndjson', streamed, ('ndjson',)),
+                ('in-memory', in_memory, ()),
+            ):
+                peak, elapsed, size = measure(func, *func_args)
+                print(f"{count:>8} {label:<12} {peak:>9.1f} {elapsed:>8.2f} {size / (1024 * 1024):>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Accuracy and latency of the local intent classifier on labelled chatbot messages.
+
+Accuracy is reported separately for the tuning set the keyword rules were written against and
+for a held-out set that was not used to adjust them.
+
+Compare with the old rule, which only routed messages containing 'cita' to the booking flow.
+Usage: python benchmarks/bench_intent.py [--backend keyword|transformer] [--repeat N]
+"""
+import argparse
+import time
+from collections import Counter
+
+from common import percentile
+from intent_classifier import create_classifier, INTENTS
+
+# Messages the keyword rules were written against
+TUNING = [
+    ('Quiero pedir una cita', 'booking'),
+    ('quiero reservar', 'booking'),
+    ('Me gustaría agendar una reunión', 'booking'),
+    ('¿Puedo reservar una consultoría para la semana que viene?', 'booking'),
+    ('Necesito concertar una reunión con vosotros', 'booking'),
+    ('¿Cómo pido hora?', 'booking'),
+    ('Quiero hablar con un asesor', 'booking'),
+    ('agendar reunión', 'booking'),
+    ('Reserva para el jueves por favor', 'booking'),
+    ('Me interesa programar una llamada', 'booking'),
+    ('¿Cuándo podemos vernos?', 'booking'),
+    ('Quisiera solicitar una consulta', 'booking'),
+    ('Hola', 'greeting'),
+    ('hola!', 'greeting'),
+    ('Buenos días', 'greeting'),
+    ('Buenas tardes', 'greeting'),
+    ('hola, ¿qué tal?', 'greeting'),
+    ('Hey', 'greeting'),
+    ('Saludos', 'greeting'),
+    ('Buenas noches, ¿cómo estás?', 'greeting'),
+    ('¿Qué tiempo hace mañana en Madrid?', 'out_of_scope'),
+    ('Cuéntame un chiste', 'out_of_scope'),
+    ('¿Quién ganó el partido de fútbol ayer?', 'out_of_scope'),
+    ('Dame una receta de paella', 'out_of_scope'),
+    ('Recomiéndame una película', 'out_of_scope'),
+    ('¿Merece la pena invertir en bitcoin?', 'out_of_scope'),
+    ('¿Qué dice mi horóscopo hoy?', 'out_of_scope'),
+    ('¿Qué opinas de las elecciones?', 'out_of_scope'),
+    ('¿Qué es el programa KIT CONSULTING?', 'faq'),
+    ('¿Qué requisitos tiene que cumplir mi empresa?', 'faq'),
+    ('¿Cuánto dinero puedo recibir?', 'faq'),
+    ('Hola, ¿qué ayudas hay para inteligencia artificial?', 'faq'),
+    ('¿Los autónomos pueden solicitarlo?', 'faq'),
+    ('¿Qué servicios incluye la ayuda?', 'faq'),
+    ('¿Cuál es el plazo para presentar la solicitud?', 'faq'),
+    ('¿Tengo que adelantar el dinero?', 'faq'),
+    ('¿Me ayudáis con las ventas digitales de mi negocio?', 'faq'),
+    ('¿Se puede usar la ayuda para ciberseguridad?', 'faq'),
+    ('¿Quién puede ser asesor digitalizador?', 'faq'),
+    ('¿Cuánto tarda en resolverse?', 'faq'),
+    ('Gracias por la información', 'faq'),
+    ('¿El marketing digital entra en el programa?', 'faq'),
+]
+
+# Written separately and never used to adjust the rules; this is the number to trust
+HELD_OUT = [
+    ('Necesito una cita con vosotros', 'booking'),
+    ('Reservar cita', 'booking'),
+    ('¿Me podéis dar cita para el martes?', 'booking'),
+    ('Quisiera agendar una videollamada', 'booking'),
+    ('¿Puedo pedir una reunión esta semana?', 'booking'),
+    ('Quiero concertar una cita con un consultor', 'booking'),
+    ('Me gustaría reservar una sesión', 'booking'),
+    ('¿Podemos fijar una reunión?', 'booking'),
+    ('Solicito una cita, por favor', 'booking'),
+    ('Quiero hablar con una especialista en IA', 'booking'),
+    ('buenas', 'greeting'),
+    ('Hola, buenos días', 'greeting'),
+    ('hola que tal', 'greeting'),
+    ('Buen día', 'greeting'),
+    ('hi', 'greeting'),
+    ('¿Quién ganará la liga este año?', 'out_of_scope'),
+    ('Recomiéndame una serie de Netflix', 'out_of_scope'),
+    ('¿Va a llover el sábado?', 'out_of_scope'),
+    ('Cuéntame una adivinanza', 'out_of_scope'),
+    ('¿Cómo se cocina una tortilla?', 'out_of_scope'),
+    ('¿La reunión de consultoría tiene coste?', 'faq'),
+    ('¿Cuánto dura la reunión con el asesor?', 'faq'),
+    ('¿Las reuniones son presenciales u online?', 'faq'),
+    ('¿Hay que reservar parte del presupuesto para el IVA?', 'faq'),
+    ('¿Qué pasa si no puedo asistir a la cita?', 'faq'),
+    ('¿Dónde se hacen las citas?', 'faq'),
+    ('¿Se puede agendar la implantación en varias fases?', 'faq'),
+    ('¿Qué documentación necesito para la solicitud?', 'faq'),
+    ('¿El bono cubre la formación de los empleados?', 'faq'),
+    ('¿Cuánto cuesta la consultoría si no me conceden la ayuda?', 'faq'),
+    ('¿Pueden participar empresas de 3 trabajadores?', 'faq'),
+    ('¿Qué es un agente digitalizador?', 'faq'),
+    ('¿Cómo justifico los gastos?', 'faq'),
+    ('¿La ayuda es compatible con otras subvenciones?', 'faq'),
+    ('¿Qué incluye el servicio de estrategia de negocio?', 'faq'),
+    ('Perfecto, muchas gracias', 'faq'),
+]
+
+def legacy_intent(text):
+    return 'booking' if 'cita' in text.lower() else 'faq'
+
+def accuracy(predict, labelled):
+    correct = Counter()
+    totals = Counter()
+    for text, expected in labelled:
+        totals[expected] += 1
+        if predict(text) == expected:
+            correct[expected] += 1
+    overall = sum(correct.values()) / len(labelled)
+    return overall, {intent: f"{correct[intent]}/{totals[intent]}" for intent in INTENTS}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backend', default='keyword', choices=['keyword', 'transformer'])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    classifier = create_classifier(args.backend)
+    print(f"backend: {classifier.name}")
+
+    predict = lambda text: classifier.classify(text).intent
+    for label, labelled in (('tuning', TUNING), ('held-out', HELD_OUT)):
+        legacy_overall, legacy_per_intent = accuracy(legacy_intent, labelled)
+        overall, per_intent = accuracy(predict, labelled)
+        print(f"{label} set ({len(labelled)} messages)")
+        print(f"  legacy 'cita' rule accuracy: {legacy_overall:.1%} {legacy_per_intent}")
+        print(f"  classifier accuracy:         {overall:.1%} {per_intent}")
+        for text, expected in labelled:
+            predicted = predict(text)
+            if predicted != expected:
+                print(f"    miss: {text!r} expected {expected}, got {predicted}")
+
+    texts = [text for text, _ in TUNING + HELD_OUT]
+    samples = []
+    for _ in range(args.repeat):
+        for text in texts:
+            start = time.perf_counter()
+            classifier.classify(text)
+            samples.append((time.perf_counter() - start) * 1000)
+    print(f"single message: p50 {percentile(samples, 50):.3f}ms  p95 {percentile(samples, 95):.3f}ms")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        classifier.classify_batch(texts)
+    elapsed = time.perf_counter() - start
+    print(f"batched: {args.repeat * len(texts) / elapsed:,.0f} messages/s in batches of {len(texts)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Chatbot behaviour during an upstream incident: direct OpenAI calls versus the bounded LLM client.
+
+A burst of concurrent questions hits a fake OpenAI server that takes --upstream-delay
+seconds to answer. Direct calls hold one request thread each for the full delay; the
+client caps concurrency, gives up at the deadline and then fails fast with the
+canned reply once the circuit opens.
+Usage: python benchmarks/bench_llm_client.py [--requests N] [--upstream-delay S] [--timeout S]
+"""
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'sk-bench')
+os.environ.setdefault('MODELO_FINETUNED', 'fake-model')
+
+from common import percentile
+from fake_openai import FakeOpenAI
+import openai
+import chatbot
+from llm_client import LLMClient, CircuitBreaker
+
+def direct_call(question):
+    return openai.ChatCompletion.create(
+        model='fake-model',
+        messages=[{'role': 'user', 'content': question}],
+        max_tokens=500
+    ).choices[0].message.content
+
+def burst(call, count):
+    samples = []
+    lock = threading.Lock()
+
+    def worker(i):
+        start = time.perf_counter()
+        try:
+            call(f'Pregunta {i} sobre el programa')
+        except Exception:
+            pass
+        with lock:
+            samples.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+def report(label, samples, elapsed):
+    print(f"{label:<22} p50 {percentile(samples, 50):8.1f}ms  p95 {percentile(samples, 95):8.1f}ms  "
+          f"burst done in {elapsed:5.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--upstream-delay', type=float, default=3.0)
+    parser.add_argument('--timeout', type=int, default=1)
+    args = parser.parse_args()
+
+    server = FakeOpenAI(first_token_delay=args.upstream_delay, chunk_delay=0.0).start()
+    openai.api_base = server.api_base
+
+    samples, elapsed = burst(direct_call, args.requests)
+    report('direct OpenAI calls', samples, elapsed)
+
+    client = LLMClient(max_concurrency=4, max_queue=8, timeout=args.timeout,
+                       breaker=CircuitBreaker(failure_threshold=5, cooldown=30))
+    chatbot.llm_client = client
+    chatbot.response_cache.max_entries = 0
+    samples, elapsed = burst(lambda question: chatbot.generate_openai_response(question, []), args.requests)
+    report('bounded LLM client', samples, elapsed)
+
+    samples, elapsed = burst(lambda question: chatbot.generate_openai_response(question, []), args.requests)
+    report('circuit open', samples, elapsed)
+    print(f"client stats: {client.stats()}")
+
+if __name__ == '__main__':
+    main()
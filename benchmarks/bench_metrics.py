@@ -0,0 +1,68 @@
+"""Cost of recording a latency observation: per-thread sharded histogram versus one shared lock.
+
+Usage: python benchmarks/bench_metrics.py [--threads 8] [--observations 200000]
+"""
+import argparse
+import random
+import threading
+import time
+from bisect import bisect_left
+
+import common  # noqa: F401
+from metrics import Histogram, LATENCY_BUCKETS, render_metrics
+
+class LockedHistogram:
+    """The straightforward design: one dict guarded by one lock"""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        with self.lock:
+            counts = self.values.get(labelvalues)
+            if counts is None:
+                counts = self.values[labelvalues] = [0] * len(self.buckets) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+ROUTES = ['/api/chatbot', '/api/appointments', '/api/contact', '/', '/api/check-session']
+
+def run(histogram, threads, observations):
+    samples = [(random.expovariate(20), random.choice(ROUTES)) for _ in range(1000)]
+    per_thread = observations // threads
+
+    def worker():
+        for i in range(per_thread):
+            value, route = samples[i % 1000]
+            histogram.observe(value, 'GET', route, '200')
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--observations', type=int, default=200000)
+    args = parser.parse_args()
+
+    sharded = Histogram('bench_request_duration_seconds', 'benchmark', ('method', 'route', 'status'))
+    locked = LockedHistogram()
+    print(f"{'implementation':<16} {'ns/observation':>15}")
+    print(f"{'locked':<16} {run(locked, args.threads, args.observations):>15.0f}")
+    print(f"{'sharded':<16} {run(sharded, args.threads, args.observations):>15.0f}")
+
+    start = time.perf_counter()
+    body = render_metrics()
+    print(f"scrape: {(time.perf_counter() - start) * 1000:.2f}ms for {len(body)} bytes")
+    recorded = sum(sum(counts[:-1]) for counts in sharded.totals().values())
+    expected = args.observations // args.threads * args.threads
+    assert recorded == expected, f"sharded histogram lost observations: {recorded} != {expected}"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Per-request cost of the request profiler: off, SQL timing only, and every request under cProfile.
+
+Usage: python benchmarks/bench_profiler.py [--requests 2000] [--rows 200]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from flask import jsonify
+from common import create_bench_app, percentile
+from models import db, Appointment
+from availability import SLOT_TIMES
+import profiler
+
+def build_app(rows, sample_rate=None):
+    """Bench app with an appointments listing; sample_rate None leaves the profiler out"""
+    app = create_bench_app()
+
+    @app.route('/api/appointments')
+    def appointments():
+        return jsonify([{
+            'id': a.id, 'name': a.name, 'email': a.email,
+            'date': a.date.strftime('%Y-%m-%d'), 'time': a.time, 'status': a.status
+        } for a in Appointment.query.order_by(Appointment.date).all()])
+
+    if sample_rate is not None:
+        profiler.PROFILER_ENABLED = True
+        profiler.PROFILER_SAMPLE_RATE = sample_rate
+        profiler.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        today = datetime.now().date()
+        db.session.execute(Appointment.__table__.insert(), [{
+            'name': f'Cliente Bench {i}',
+            'email': f'cliente{i}@empresa-ejemplo.es',
+            'phone': '600000000',
+            'date': today + timedelta(days=i // len(SLOT_TIMES)),
+            'time': SLOT_TIMES[i % len(SLOT_TIMES)],
+            'service': 'Inteligencia Artificial (hasta 6.000€)',
+            'status': 'Pendiente',
+            'created_at': datetime.now(),
+            'updated_at': datetime.now()
+        } for i in range(rows)])
+        db.session.commit()
+    return app
+
+def run(app, requests):
+    client = app.test_client()
+    client.get('/api/appointments')
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get('/api/appointments')
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'mode':<22} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, sample_rate in (('profiler off', None), ('sql timing only', 0.0), ('cProfile every request', 1.0)):
+        latencies = run(build_app(args.rows, sample_rate), args.requests)
+        mean = sum(latencies) / len(latencies)
+        print(f"{label:<22} {mean * 1000:>8.2f} {percentile(latencies, 50) * 1000:>8.2f} {percentile(latencies, 99) * 1000:>8.2f}")
+    stats = profiler.profile_store.stats()
+    assert stats['stored'] <= stats['max_profiles'], "profile store outgrew its bound"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Cost per check and memory held by the rate limiter, compared with the old per-IP timestamp lists.
+
+Usage: python benchmarks/bench_rate_limiter.py [--clients N] [--hits N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import common  # noqa: F401  (puts the repository root on sys.path)
+from rate_limiter import RateLimiter, MemoryBackend, SQLiteBackend
+
+RATE_LIMIT = 30
+RATE_WINDOW = 60
+
+def legacy_limiter():
+    request_counts = defaultdict(list)
+
+    def check(ip):
+        now = datetime.now()
+        request_counts[ip] = [t for t in request_counts[ip] if now - t < timedelta(seconds=RATE_WINDOW)]
+        request_counts[ip].append(now)
+        return len(request_counts[ip]) <= RATE_LIMIT
+    return check
+
+def measure(label, check, keys):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for key in keys:
+        check(key)
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {len(keys) / elapsed:>10,.0f} checks/s  {elapsed / len(keys) * 1e6:7.2f}us/check  "
+          f"{memory / 1024 / 1024:7.2f} MiB held")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=50000)
+    parser.add_argument('--hits', type=int, default=40000)
+    parser.add_argument('--max-keys', type=int, default=10000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    # A few heavy clients hammering the endpoint plus a long tail of one-off visitors
+    heavy = [f'10.0.0.{i}' for i in range(100)]
+    keys = [random.choice(heavy) if random.random() < 0.5 else f'ip-{random.randrange(args.clients)}'
+            for _ in range(args.hits)]
+
+    measure('legacy timestamp lists', legacy_limiter(), keys)
+
+    memory_limiter = RateLimiter(MemoryBackend(max_keys=args.max_keys))
+    measure('sliding window, memory', lambda key: memory_limiter.hit(key, RATE_LIMIT, RATE_WINDOW), keys)
+    print(f"  {memory_limiter.stats()}")
+
+    path = os.path.join(tempfile.mkdtemp(), 'ratelimit.db')
+    sqlite_limiter = RateLimiter(SQLiteBackend(path, max_keys=args.max_keys))
+    sqlite_keys = keys[:args.hits // 10]
+    measure('sliding window, sqlite', lambda key: sqlite_limiter.hit(key, RATE_LIMIT, RATE_WINDOW), sqlite_keys)
+    print(f"  {sqlite_limiter.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Per-message latency of Flask-Mail's connection-per-send versus the pooled SMTP transport.
+
+Runs against the local SMTP sink in this directory.
+Usage: python benchmarks/bench_smtp_pool.py [--messages N] [--connect-delay SECONDS]
+"""
+import argparse
+import time
+
+from common import create_bench_app, percentile
+from smtp_sink import SMTPSink
+from flask_mail import Message
+from email_utils import mail
+from mail_transport import send_messages, get_pool
+
+def build_message(i):
+    msg = Message('Benchmark', sender='bench@example.com', recipients=[f'user{i}@example.com'])
+    msg.html = f'<p>Mensaje {i}</p>'
+    return msg
+
+def run(send, count):
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        send(build_message(i))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--connect-delay', type=float, default=0.02,
+                        help='Simulated handshake cost of the SMTP server in seconds')
+    args = parser.parse_args()
+
+    sink = SMTPSink(connect_delay=args.connect_delay).start()
+    app = create_bench_app()
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=sink.port, MAIL_USE_SSL=False, MAIL_USE_TLS=False)
+    mail.init_app(app)
+
+    with app.app_context():
+        per_send = run(mail.send, args.messages)
+        pooled = run(send_messages, args.messages)
+        batch_start = time.perf_counter()
+        send_messages(*[build_message(i) for i in range(args.messages)])
+        batched_ms = (time.perf_counter() - batch_start) * 1000 / args.messages
+        pool_stats = get_pool().stats()
+        get_pool().close_all()
+
+    print(f"{'transport':<16} {'p50 ms':>9} {'p95 ms':>9}")
+    print(f"{'flask-mail':<16} {percentile(per_send, 50):>9.3f} {percentile(per_send, 95):>9.3f}")
+    print(f"{'pooled':<16} {percentile(pooled, 50):>9.3f} {percentile(pooled, 95):>9.3f}")
+    print(f"{'pooled batch':<16} {batched_ms:>9.3f} {'(mean)':>9}")
+    print(f"sink received {sink.messages} messages; pool {pool_stats}")
+    sink.shutdown()
+
+if __name__ == '__main__':
+    main()
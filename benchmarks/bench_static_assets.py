@@ -0,0 +1,66 @@
+"""First-load bytes of the landing page's static assets: plain /static versus the built pipeline.
+
+Builds into a temporary directory, so static/dist is left alone. Images are counted at the
+resized variant a browser of the given viewport would pick (needs Pillow; without it images
+count at full size) and text assets at their smallest precompressed variant.
+Usage: python benchmarks/bench_static_assets.py [--viewport 412] [--dpr 2]
+"""
+import argparse
+import os
+import re
+import tempfile
+
+from common import ROOT_DIR
+import static_assets
+
+TEMPLATES = ('templates/base.html', 'templates/index.html')
+STATIC_URL_PATTERN = re.compile(r"static_url\('([^']+)'")
+CSS_STATIC_PATTERN = re.compile(r"url\(\s*['\"]?/static/([^'\")?]+)")
+
+def landing_page_assets():
+    """Static files the landing page references directly or through style.css"""
+    names = []
+    for template in TEMPLATES:
+        with open(os.path.join(ROOT_DIR, template), encoding='utf-8') as f:
+            names.extend(STATIC_URL_PATTERN.findall(f.read()))
+    with open(os.path.join(static_assets.STATIC_DIR, 'css', 'style.css'), encoding='utf-8') as f:
+        names.extend(CSS_STATIC_PATTERN.findall(f.read()))
+    return list(dict.fromkeys(names))
+
+def served_bytes(entry, needed_width):
+    """Bytes a client sends for the asset with the built pipeline"""
+    sizes = [entry['size']] + list(entry['encodings'].values())
+    for variant in entry.get('variants', []):
+        if variant['width'] >= needed_width:
+            sizes.append(variant['size'])
+            break
+    return min(sizes)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--viewport', type=int, default=412, help='CSS pixels')
+    parser.add_argument('--dpr', type=float, default=2.0, help='device pixel ratio')
+    args = parser.parse_args()
+    needed_width = int(args.viewport * args.dpr)
+
+    with tempfile.TemporaryDirectory() as dist_dir:
+        assets = static_assets.build_assets(dist_dir=dist_dir)['assets']
+
+    total_before = total_after = 0
+    print(f"{'asset':<42} {'before':>10} {'after':>10}")
+    for name in landing_page_assets():
+        entry = assets.get(name)
+        if entry is None:
+            continue
+        before, after = entry['size'], served_bytes(entry, needed_width)
+        total_before += before
+        total_after += after
+        print(f"{name:<42} {before:>10,} {after:>10,}")
+    saved = 100.0 * (1 - total_after / total_before) if total_before else 0.0
+    print(f"{'total':<42} {total_before:>10,} {total_after:>10,}  ({saved:.1f}% less)")
+    print(f"brotli: {'yes' if static_assets.brotli else 'no'}, Pillow: {'yes' if static_assets.Image else 'no'}, "
+          f"image width needed: {needed_width}px")
+    print("repeat visits: fingerprinted assets are cached as immutable for a year, so no revalidation requests")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Shared helpers for the benchmark scripts in this directory"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Allow running the scripts directly from the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from flask import Flask
+from sqlalchemy import event
+from models import db
+
+def create_bench_app(database_uri='sqlite://'):
+    """Create a minimal Flask app bound to the given database"""
+    app = Flask(__name__, root_path=ROOT_DIR)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        MAIL_USERNAME='bench@example.com',
+        BASE_URL='http://localhost:5000'
+    )
+    db.init_app(app)
+    return app
+
+class QueryCounter:
+    """Count SQL statements executed on an engine"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+@contextmanager
+def timer(results, key):
+    """Store the elapsed wall time in seconds under results[key]"""
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,120 @@
+"""Local stand-in for the OpenAI chat completions API: streams canned chunks with configurable latency.
+
+Point the app at it with OPENAI_API_BASE=http://127.0.0.1:<port>/v1
+Usage: python benchmarks/fake_openai.py [--port 8765] [--first-token-delay 0.4] [--chunk-delay 0.03]
+"""
+import argparse
+import http.server
+import json
+import threading
+import time
+
+CANNED_REPLY = (
+    "El programa KIT CONSULTING ofrece ayudas para que las pymes contraten servicios "
+    "de asesoramiento en inteligencia artificial, ciberseguridad y gestión de procesos. "
+    "Si quieres, puedo ayudarte a reservar una cita de consultoría."
+)
+
+class FakeOpenAIHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        self.server.record()
+        model = body.get('model') or 'fake-model'
+        words = self.server.reply.split(' ')
+
+        # Emulate queueing plus prompt processing before the first token
+        time.sleep(self.server.first_token_delay)
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for index, word in enumerate(words):
+                content = word if index == 0 else ' ' + word
+                self._send_chunk(model, {'content': content} if index else {'role': 'assistant', 'content': content}, None)
+                time.sleep(self.server.chunk_delay)
+            self._send_chunk(model, {}, 'stop')
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+            return
+
+        time.sleep(self.server.chunk_delay * len(words))
+        payload = json.dumps({
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.server.reply},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(words), 'total_tokens': len(words)}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_chunk(self, model, delta, finish_reason):
+        chunk = {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+class FakeOpenAI(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, first_token_delay=0.4, chunk_delay=0.03, reply=CANNED_REPLY):
+        super().__init__(('127.0.0.1', port), FakeOpenAIHandler)
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.reply = reply
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def api_base(self):
+        return f'http://127.0.0.1:{self.port}/v1'
+
+    def record(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-delay', type=float, default=0.4)
+    parser.add_argument('--chunk-delay', type=float, default=0.03)
+    args = parser.parse_args()
+    server = FakeOpenAI(args.port, args.first_token_delay, args.chunk_delay)
+    print(f"Fake OpenAI API listening on {server.api_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"served {server.requests} completions")
+
+if __name__ == '__main__':
+    main()
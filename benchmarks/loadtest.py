@@ -0,0 +1,455 @@
+"""End-to-end load test: seeded database, fake OpenAI and SMTP sink, realistic traffic mix over HTTP.
+
+The app runs in a child process on a threaded WSGI server. Virtual users repeatedly pick a
+scenario by weight and run it from a fresh loopback address (127.x.y.z), so the per-IP rate
+limiter sees distinct visitors instead of one client hammering it.
+
+Scenarios:
+  landing  GET /
+  faq      greeting plus two questions answered by the (fake) model
+  booking  a full booking conversation through handle_booking_step, ending in an appointment
+  contact  POST /api/contact
+  admin    PIN login, appointment listing, submissions listing and search, appointment stats
+
+Results (p50/p95/p99 latency and throughput per endpoint) are written as JSON. With --baseline,
+p95 latencies are compared against an earlier run. Emails queued in the outbox but never delivered
+also count as a regression, and the exit status is 1 on any regression. The temporary directory is
+removed afterwards unless the run regressed, in which case its server log is kept for inspection.
+
+Usage: python benchmarks/loadtest.py [--users 16] [--duration 30] [--output results.json]
+       [--mix landing=40,faq=20,booking=10,contact=15,admin=15] [--baseline previous.json]
+"""
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+from http.cookies import SimpleCookie
+from urllib.parse import quote_plus
+
+from common import ROOT_DIR, percentile
+from fake_openai import FakeOpenAI
+from smtp_sink import SMTPSink
+
+ADMIN_PIN = '12345678901'
+DEFAULT_MIX = 'landing=40,faq=20,booking=10,contact=15,admin=15'
+SERVER_START_TIMEOUT = 30  # seconds
+OUTBOX_DRAIN_TIMEOUT = 20  # seconds to wait for queued emails after the traffic stops
+MIN_COMPARE_REQUESTS = 30  # fewer samples than this make a p95 too noisy to compare
+
+NAMES = ('Ana', 'Luis', 'Marta', 'Jorge', 'Lucía', 'Pablo', 'Elena', 'Sergio', 'Carmen', 'Diego')
+SURNAMES = ('García', 'Martínez', 'López', 'Sánchez', 'Pérez', 'Gómez', 'Ruiz', 'Hernández', 'Díaz', 'Moreno')
+FAQ_QUESTIONS = (
+    '¿Qué es el programa KIT CONSULTING?',
+    '¿Qué requisitos necesita mi empresa para pedir la ayuda?',
+    '¿Cómo se justifica la subvención?',
+    '¿Cuánto dinero puedo recibir para ciberseguridad?',
+    '¿Qué plazo hay para solicitar el bono de consultoría?'
+)
+SECTORS = ('hostelería', 'comercio', 'construcción', 'transporte', 'asesoría', 'industria', 'turismo', 'salud')
+SEARCH_QUERIES = ('contabilidad', 'analisis datos', 'chatbot ventas', 'ciberseg', 'Lucía Moreno')
+LIST_ITEM = re.compile(r'<li>')
+
+class VirtualUser:
+    """Runs scenarios against the server and keeps its own samples, so recording needs no lock"""
+    def __init__(self, port, addresses, think_time, timeout):
+        self.port = port
+        self.addresses = addresses
+        self.think_time = think_time
+        self.timeout = timeout
+        self.samples = []  # (endpoint, seconds, status)
+        self.outcomes = {}
+        self.source = '127.0.0.1'
+        self.cookies = {}
+
+    def request(self, endpoint, method, path, body=None):
+        """Send one request from the scenario's address; returns (status, parsed JSON or None)"""
+        headers = {'Accept-Encoding': 'gzip', 'User-Agent': 'kit-loadtest'}
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=self.timeout, source_address=(self.source, 0))
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+            status = response.status
+        except OSError:
+            status, data, response = 0, b'', None
+        finally:
+            connection.close()
+        self.samples.append((endpoint, time.perf_counter() - start, status))
+
+        if response is None:
+            return status, None
+        # The session cookie is marked Secure; a browser would only send it over HTTPS
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        if 'json' in (response.getheader('Content-Type') or ''):
+            return status, json.loads(data)
+        return status, None
+
+    def pause(self):
+        if self.think_time:
+            time.sleep(random.uniform(0, 2 * self.think_time))
+
+    def record(self, scenario, outcome):
+        key = f'{scenario}:{outcome}'
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def chat(self, endpoint, message, conversation_id):
+        status, data = self.request(endpoint, 'POST', '/api/chatbot', {'message': message, 'conversation_id': conversation_id})
+        if status != 200 or not data:
+            return None, ''
+        return data.get('conversation_id'), data.get('response', '')
+
+    def landing(self):
+        status, _ = self.request('GET /', 'GET', '/')
+        self.record('landing', 'ok' if status == 200 else 'failed')
+
+    def faq(self):
+        conversation_id, reply = self.chat('POST /api/chatbot greeting', 'hola', None)
+        for _ in range(2):
+            self.pause()
+            # Half the questions are unique so the response cache cannot answer every one
+            question = random.choice(FAQ_QUESTIONS)
+            if random.random() < 0.5:
+                question = f'{question[:-1]} en una empresa de {random.choice(SECTORS)} con {random.randint(2, 49)} empleados?'
+            conversation_id, reply = self.chat('POST /api/chatbot faq', question, conversation_id)
+        self.record('faq', 'ok' if reply else 'failed')
+
+    def booking(self):
+        name = f'{random.choice(NAMES)} {random.choice(SURNAMES)}'
+        steps = [
+            'Quiero reservar una cita',
+            name,
+            random_email(name),
+            f'6{random.randint(10000000, 99999999)}',
+            str(random.randint(1, 3))
+        ]
+        conversation_id, reply = None, ''
+        for message in steps:
+            conversation_id, reply = self.chat('POST /api/chatbot booking', message, conversation_id)
+            if not reply:
+                self.record('booking', 'failed')
+                return
+            self.pause()
+
+        # Dates, times and the confirmation; a slot taken meanwhile brings the lists back
+        for _ in range(8):
+            if 'BOOKING_COMPLETE' in reply:
+                self.record('booking', 'confirmed')
+                return
+            options = len(LIST_ITEM.findall(reply))
+            if options:
+                message = str(random.randint(1, options))
+            elif '¿Los datos son correctos?' in reply:
+                message = 'sí'
+            else:
+                self.record('booking', 'no_availability' if 'disponibles' in reply else 'failed')
+                return
+            conversation_id, reply = self.chat('POST /api/chatbot booking', message, conversation_id)
+            self.pause()
+        self.record('booking', 'failed')
+
+    def contact(self):
+        name = f'{random.choice(NAMES)} {random.choice(SURNAMES)}'
+        status, _ = self.request('POST /api/contact', 'POST', '/api/contact', {
+            'nombre': name,
+            'email': random_email(name),
+            'telefono': f'6{random.randint(10000000, 99999999)}',
+            'dudas': f'Me gustaría saber si una empresa de {random.choice(SECTORS)} puede pedir la ayuda de KIT CONSULTING.'
+        })
+        self.record('contact', 'ok' if status == 200 else 'failed')
+
+    def admin(self):
+        status, _ = self.request('POST /api/verify-pin', 'POST', '/api/verify-pin', {'pin': ADMIN_PIN})
+        if status != 200:
+            self.record('admin', 'failed')
+            return
+        for endpoint, path in (
+            ('GET /api/appointments', '/api/appointments?limit=20'),
+            ('GET /api/contact-submissions', '/api/contact-submissions'),
+            ('GET /api/contact-submissions/search', f'/api/contact-submissions/search?q={quote_plus(random.choice(SEARCH_QUERIES))}'),
+            ('GET /api/appointments/stats', '/api/appointments/stats'),
+        ):
+            self.pause()
+            status, _ = self.request(endpoint, 'GET', path)
+            if status != 200:
+                self.record('admin', 'failed')
+                return
+        self.record('admin', 'ok')
+
+    def run(self, mix, deadline):
+        scenarios, weights = zip(*mix.items())
+        while time.perf_counter() < deadline:
+            scenario = random.choices(scenarios, weights)[0]
+            # A new visitor: own address, no cookies
+            self.source = next(self.addresses)
+            self.cookies = {}
+            getattr(self, scenario)()
+            self.pause()
+
+def random_email(name):
+    # ASCII only: accented local parts are valid for the form but not for a plain SMTP envelope
+    local = unicodedata.normalize('NFKD', name.split()[0].lower()).encode('ascii', 'ignore').decode()
+    return f'{local}{random.randint(1, 10 ** 6)}@empresa-carga.es'
+
+def loopback_addresses():
+    """127.x.y.z addresses, distinct for the first 16 million visitors"""
+    n = 0
+    while True:
+        yield f'127.{1 + (n // 64000) % 254}.{(n // 250) % 256}.{1 + n % 250}'
+        n += 1
+
+class LockedIterator:
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.lock = threading.Lock()
+
+    def __next__(self):
+        with self.lock:
+            return next(self.iterator)
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if not hasattr(VirtualUser, name.strip()) or name.strip() in ('run', 'request'):
+            raise argparse.ArgumentTypeError(f'unknown scenario {name!r}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def seed_database(database_uri, appointments, submissions):
+    """Past appointments and contact submissions, plus the indexes the app creates on startup"""
+    from common import create_bench_app
+    from models import db, ensure_schema
+    from contact_search import ensure_search_index
+    from bench_export import seed as seed_appointments
+    from bench_contact_search import seed as seed_submissions
+
+    app = create_bench_app(database_uri)
+    with app.app_context():
+        db.create_all()
+        ensure_schema(db.engine)
+        ensure_search_index(db.engine)
+        seed_appointments(appointments)
+        seed_submissions(submissions)
+        db.engine.dispose()
+
+def start_server(port, env, log_path):
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+        cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode}, see {log_path}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/check-session')
+            connection.getresponse().read()
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'server did not answer within {SERVER_START_TIMEOUT}s, see {log_path}')
+
+def serve(port):
+    """Child process: the real app on a threaded WSGI server"""
+    sys.path.insert(0, ROOT_DIR)
+    from werkzeug.serving import make_server
+    import app as application
+    make_server('127.0.0.1', port, application.app, threaded=True).serve_forever()
+
+def outbox_counts(database_path):
+    """Outbox rows per status, read straight from the load test database"""
+    with sqlite3.connect(database_path) as connection:
+        return dict(connection.execute('SELECT status, count(*) FROM email_outbox GROUP BY status').fetchall())
+
+def free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def summarize(samples, elapsed):
+    latencies = [seconds * 1000 for _, seconds, _ in samples]
+    statuses = {}
+    for _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, status in samples if not 200 <= status < 400),
+        'statuses': dict(sorted(statuses.items())),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2) if latencies else 0.0
+    }
+
+def compare(results, baseline_path, tolerance):
+    """Endpoints whose p95 grew by more than tolerance (a fraction) over the baseline run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for endpoint, summary in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(endpoint)
+        if not previous or min(previous['requests'], summary['requests']) < MIN_COMPARE_REQUESTS:
+            continue
+        if summary['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append({'endpoint': endpoint, 'baseline_p95_ms': previous['p95_ms'], 'p95_ms': summary['p95_ms']})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of traffic')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help='scenario=weight,...')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between requests of a user')
+    parser.add_argument('--appointments', type=int, default=5000)
+    parser.add_argument('--submissions', type=int, default=5000)
+    parser.add_argument('--openai-first-token-delay', type=float, default=0.3)
+    parser.add_argument('--openai-chunk-delay', type=float, default=0.01)
+    parser.add_argument('--smtp-connect-delay', type=float, default=0.05)
+    parser.add_argument('--timeout', type=float, default=30, help='seconds per request')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='-', help='JSON results file, - for stdout')
+    parser.add_argument('--baseline', help='earlier JSON results to compare p95 latencies against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth over the baseline')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix='kit-loadtest-')
+    database_path = os.path.join(workdir, 'loadtest.db')
+    database_uri = f"sqlite:///{database_path}"
+    print(f'Seeding {args.appointments} appointments and {args.submissions} submissions in {workdir}', file=sys.stderr)
+    seed_database(database_uri, args.appointments, args.submissions)
+
+    openai_server = FakeOpenAI(first_token_delay=args.openai_first_token_delay, chunk_delay=args.openai_chunk_delay).start()
+    smtp_sink = SMTPSink(connect_delay=args.smtp_connect_delay).start()
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_uri,
+        FLASK_SECRET_KEY='loadtest',
+        CHATBOT_PIN=ADMIN_PIN,
+        OPENAI_API_KEY='sk-loadtest',
+        OPENAI_API_BASE=openai_server.api_base,
+        MODELO_FINETUNED='fake-model',
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=str(smtp_sink.port),
+        MAIL_USE_SSL='false',
+        MAIL_USE_TLS='false',
+        MAIL_USERNAME='citas@loadtest.local',
+        MAIL_PASSWORD='',
+        EMAIL_OUTBOX_POLL_INTERVAL='1',
+        SCHEDULER_LOCK_FILE=os.path.join(workdir, 'scheduler.lock'),
+        PYTHONUNBUFFERED='1'
+    )
+    log_path = os.path.join(workdir, 'server.log')
+    server = start_server(port, env, log_path)
+
+    try:
+        addresses = LockedIterator(loopback_addresses())
+        users = [VirtualUser(port, addresses, args.think_time, args.timeout) for _ in range(args.users)]
+        start = time.perf_counter()
+        deadline = start + args.duration
+        threads = [threading.Thread(target=user.run, args=(args.mix, deadline)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        # Let the outbox workers hand the queued emails to the sink
+        drain_deadline = time.time() + OUTBOX_DRAIN_TIMEOUT
+        while time.time() < drain_deadline:
+            counts = outbox_counts(database_path)
+            if not counts.get('pending') and not counts.get('sending'):
+                break
+            time.sleep(0.5)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    outbox = outbox_counts(database_path)
+    queued = sum(outbox.values())
+    samples = [sample for user in users for sample in user.samples]
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    outcomes = {}
+    for user in users:
+        for key, count in user.outcomes.items():
+            outcomes[key] = outcomes.get(key, 0) + count
+
+    results = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline', 'serve')},
+        'elapsed_s': round(elapsed, 2),
+        'total': summarize(samples, elapsed),
+        'endpoints': {endpoint: summarize(group, elapsed) for endpoint, group in sorted(by_endpoint.items())},
+        'scenarios': dict(sorted(outcomes.items())),
+        'fakes': {
+            'openai_requests': openai_server.requests,
+            'smtp_messages': smtp_sink.messages,
+            'smtp_bytes': smtp_sink.bytes,
+            'emails_queued': queued,
+            'emails_delivered': outbox.get('sent', 0),
+            'emails_failed': outbox.get('failed', 0),
+            'emails_pending': outbox.get('pending', 0) + outbox.get('sending', 0)
+        }
+    }
+    results['regressions'] = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    if outbox.get('sent', 0) < queued:
+        results['regressions'].append({'endpoint': 'email_outbox', 'queued': queued, 'delivered': outbox.get('sent', 0)})
+    if results['regressions']:
+        results['server_log'] = log_path
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'endpoint':<38} {'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}", file=sys.stderr)
+    for endpoint, summary in list(results['endpoints'].items()) + [('total', results['total'])]:
+        print(f"{endpoint:<38} {summary['requests']:>8} {summary['errors']:>6} {summary['throughput_rps']:>7.1f} "
+              f"{summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f}", file=sys.stderr)
+
+    body = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output == '-':
+        print(body)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(body + '\n')
+    if results['regressions']:
+        print(f"Regressions (p95 over {args.tolerance:.0%}, undelivered emails): {results['regressions']}, "
+              f"see {log_path}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,25 @@
 # Existing imports remain the same
 import os
 import openai
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 from models import db, Appointment
-from email_utils import send_appointment_confirmation, schedule_reminder_email
+from reminders import schedule_reminder_email
+from email_outbox import enqueue_email
+from availability import get_available_slots, get_available_times, availability_cache
+from appointment_stats import appointment_stats_cache
+from prompt_builder import build_prompt
+from response_cache import response_cache
+from intent_classifier import classify_intent
+from llm_client import llm_client, LLMUnavailable, LLM_FALLBACK_RESPONSE
+from metrics import chatbot_response_duration, openai_tokens, Timer
 from dotenv import load_dotenv
 import re
 import json
 import locale
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
 
 # Set locale for Spanish date formatting
 try:
@@ -92,6 +103,10 @@ class BookingSession:
         except:
             return None, None
 
+def strip_state_data(message):
+    """Remove the hidden state blob from a bot message"""
+    return message.split('__STATE__')[0].rstrip()
+
 def validate_input(input_type, value):
     """Validate user input based on type"""
     validations = {
@@ -105,14 +120,6 @@ def validate_input(input_type, value):
     }
     return validations.get(input_type, lambda x: True)(value)
 
-def format_date_spanish(date_str):
-    """Format date in Spanish"""
-    try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        return date_obj.strftime('%-d de %B de %Y').lower()
-    except:
-        return date_str
-
 def format_list_html(items, prefix=""):
     """Helper function to format lists as HTML"""
     if not items:
@@ -120,45 +127,37 @@ def format_list_html(items, prefix=""):
     list_items = "\n".join([f"<li>{prefix}{i+1}. {item}</li>" for i, item in enumerate(items)])
     return f"<ul>\n{list_items}\n</ul>"
 
-def get_available_slots():
-    """Get available appointment slots"""
-    slots = []
-    current_date = datetime.now()
-    
-    # Get next 7 available weekdays
-    for i in range(14):  # Look ahead 14 days to find 7 available slots
-        check_date = current_date + timedelta(days=i)
-        if check_date.weekday() < 5:  # Monday = 0, Friday = 4
-            # Get booked appointments
-            booked_times = set(
-                apt.time for apt in Appointment.query.filter_by(
-                    date=check_date.date()
-                ).all()
-            )
-            
-            # Available time slots
-            available_times = []
-            start_time = datetime.strptime("10:30", "%H:%M")
-            end_time = datetime.strptime("14:00", "%H:%M")
-            current_time = start_time
-            
-            while current_time <= end_time:
-                time_str = current_time.strftime("%H:%M")
-                if time_str not in booked_times:
-                    available_times.append(time_str)
-                current_time += timedelta(minutes=30)
-            
-            if available_times:
-                slots.append({
-                    'date': check_date.strftime("%Y-%m-%d"),
-                    'formatted_date': format_date_spanish(check_date.strftime("%Y-%m-%d")),
-                    'times': available_times
-                })
-                
-            if len(slots) >= 7:
-                break
-                
-    return slots
+def offer_alternative_slots(session):
+    """Move the session back to time or date selection after its slot was taken"""
+    taken_time = session.data.pop('time', None)
+    available_times = get_available_times(session.data['date'])
+    if available_times:
+        session.state = 'SELECTING_TIME'
+        return (
+            f"<strong>Lo siento, el horario de las {taken_time} del {session.data['formatted_date']} "
+            "acaba de ser reservado por otra persona.</strong>\n\n"
+            "<strong>Estos son los horarios que siguen disponibles ese día:</strong>\n" +
+            format_list_html(available_times) + "\n"
+            "<strong>Por favor, selecciona el número del horario que prefieres:</strong>"
+        )
+
+    session.state = 'SELECTING_DATE'
+    session.data.pop('date', None)
+    session.data.pop('formatted_date', None)
+    slots = get_available_slots()
+    if not slots:
+        return (
+            "<strong>Lo siento, el horario elegido acaba de ser reservado y no quedan fechas disponibles "
+            "en los próximos días.</strong>\n"
+            "Por favor, intenta más tarde."
+        )
+    return (
+        "<strong>Lo siento, el horario elegido acaba de ser reservado por otra persona "
+        "y ese día ya no quedan huecos libres.</strong>\n\n"
+        "<strong>Estas son las fechas disponibles:</strong>\n" +
+        format_list_html([slot['formatted_date'] for slot in slots]) + "\n"
+        "<strong>Por favor, selecciona el número de la fecha que prefieres:</strong>"
+    )
 
 def handle_booking_step(user_input, session):
     """Handle each step of the booking process with improved formatting"""
@@ -278,17 +277,13 @@ def handle_booking_step(user_input, session):
         if not validate_input('time_index', user_input):
             return create_response(error_messages['time_index'])
         
-        slots = get_available_slots()
-        selected_slot = next(
-            slot for slot in slots 
-            if slot['date'] == session.data['date']
-        )
+        available_times = get_available_times(session.data['date'])
         
         time_index = int(user_input) - 1
-        if time_index < 0 or time_index >= len(selected_slot['times']):
+        if time_index < 0 or time_index >= len(available_times):
             return create_response(error_messages['time_index'])
         
-        session.data['time'] = selected_slot['times'][time_index]
+        session.data['time'] = available_times[time_index]
         session.state = 'REVIEWING_JSON'
         
         # Generate JSON summary
@@ -315,12 +310,29 @@ def handle_booking_step(user_input, session):
                     service=session.data['service']
                 )
                 db.session.add(appointment)
-                db.session.commit()
+                try:
+                    # Flushed for its id: the confirmation email is committed together with the booking
+                    db.session.flush()
+                    enqueue_email('appointment_confirmation', {'appointment_id': appointment.id})
+                    db.session.commit()
+                except IntegrityError:
+                    # Someone else booked this slot since it was offered
+                    db.session.rollback()
+                    availability_cache.invalidate(appointment.date)
+                    logger.warning(f"Slot {session.data['date']} {session.data['time']} was already booked")
+                    return create_response(offer_alternative_slots(session))
+                availability_cache.invalidate(appointment.date)
+                appointment_stats_cache.invalidate()
                 
-                # Send confirmation emails
-                send_appointment_confirmation(appointment)
-                schedule_reminder_email(appointment)
+                try:
+                    schedule_reminder_email(appointment)
+                except Exception as e:
+                    # The booking is saved; the startup reconciliation schedules a missing reminder
+                    logger.error(f"Appointment {appointment.id} booked but its reminder was not scheduled: {str(e)}")
                 
+                # Booking finished, later messages start from scratch
+                session.state = 'INITIAL'
+                session.data = {}
                 return create_response(
                     "<strong>¡Tu cita ha sido confirmada!</strong>\n\n"
                     "Te hemos enviado un correo electrónico con los detalles.\n"
@@ -330,11 +342,14 @@ def handle_booking_step(user_input, session):
                 )
             except Exception as e:
                 logger.error(f"Error creating appointment: {str(e)}")
+                db.session.rollback()
                 return create_response(
                     "<strong>Lo siento, ha ocurrido un error al procesar tu cita.</strong>\n"
                     "Por favor, intenta de nuevo más tarde."
                 )
         else:
+            session.state = 'INITIAL'
+            session.data = {}
             return create_response(
                 "<strong>De acuerdo, he cancelado la reserva.</strong>\n\n"
                 "¿Hay algo más en lo que pueda ayudarte?" +
@@ -345,68 +360,239 @@ def handle_booking_step(user_input, session):
         "<strong>Lo siento, ha ocurrido un error. Por favor, intenta de nuevo.</strong>"
     )
 
-def generate_response(user_message, conversation_history=None):
-    """Generate chatbot response"""
+def generate_response(user_message, conversation_history=None, conversation=None, intent=None):
+    """Generate chatbot response
+
+    With a server-side conversation the booking state is read from and written back
+    to it and the reply carries no state blob. Otherwise the state is recovered from
+    the blobs embedded in the bot messages of conversation_history.
+    """
     try:
         if not user_message.strip():
             return "Por favor, escribe tu pregunta para poder ayudarte."
 
-        if conversation_history is None:
-            conversation_history = []
+        if conversation is not None:
+            current_state = conversation.state
+            booking_data = conversation.data
+            history = list(conversation.history)
+        else:
+            history = conversation_history or []
 
-        # Extract state data from last bot message
-        current_state = 'INITIAL'
-        booking_data = {}
-        
-        for msg in conversation_history:
-            if not msg.get('is_user', True):
-                state, data = BookingSession.extract_state_data(msg['text'])
-                if state:
-                    current_state = state
-                    booking_data = data or {}
-
-        # Check if we're in booking flow or user wants to book
-        if current_state != 'INITIAL' or 'cita' in user_message.lower():
-            session = BookingSession()
-            session.state = current_state
-            session.data = booking_data
-            return handle_booking_step(user_message, session)
-
-        # Regular chatbot response using OpenAI
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "Eres el asistente virtual de KIT CONSULTING, especializado en ayudas "
-                    "gubernamentales para la transformación digital de empresas. "
-                    "Tu objetivo es explicar el programa y guiar a los usuarios en el proceso. "
-                    "Si detectas interés, especialmente en servicios de IA, "
-                    "sugiere agendar una cita de consultoría."
-                )
+            # Extract state data from last bot message
+            current_state = 'INITIAL'
+            booking_data = {}
+
+            for msg in history:
+                if not msg.get('is_user', True):
+                    state, data = BookingSession.extract_state_data(msg['text'])
+                    if state:
+                        current_state = state
+                        booking_data = data or {}
+
+        # Booking flow, canned reply or model, decided locally without an LLM round-trip
+        intent = intent or route_message(user_message, current_state)
+        if intent == 'booking':
+            with Timer(chatbot_response_duration, 'booking'):
+                session = BookingSession()
+                session.state = current_state
+                session.data = booking_data
+                response = handle_booking_step(user_message, session)
+                if conversation is not None:
+                    conversation.state = session.state
+                    conversation.data = session.data
+                    response = strip_state_data(response)
+        elif intent in CANNED_RESPONSES:
+            with Timer(chatbot_response_duration, 'canned'):
+                response = CANNED_RESPONSES[intent]
+        else:
+            response = generate_openai_response(user_message, history, conversation)
+
+        if conversation is not None:
+            conversation.add_message(user_message, True)
+            conversation.add_message(response, False)
+        return response
+
+    except Exception as e:
+        logger.error(f"Error generating response: {str(e)}")
+        return "Lo siento, ha ocurrido un error. Por favor, intenta de nuevo más tarde."
+
+SYSTEM_PROMPT = (
+    "Eres el asistente virtual de KIT CONSULTING, especializado en ayudas "
+    "gubernamentales para la transformación digital de empresas. "
+    "Tu objetivo es explicar el programa y guiar a los usuarios en el proceso. "
+    "Si detectas interés, especialmente en servicios de IA, "
+    "sugiere agendar una cita de consultoría."
+)
+
+CANNED_RESPONSES = {
+    'greeting': (
+        "¡Hola! Soy el asistente virtual de KIT CONSULTING. Puedo resolver tus dudas sobre "
+        "las ayudas para la transformación digital o ayudarte a <strong>reservar una cita</strong> "
+        "de consultoría. ¿En qué puedo ayudarte?"
+    ),
+    'out_of_scope': (
+        "Lo siento, solo puedo ayudarte con consultas sobre el programa KIT CONSULTING y sus "
+        "ayudas para la transformación digital. Si quieres, puedo ayudarte a "
+        "<strong>reservar una cita</strong> con uno de nuestros consultores."
+    )
+}
+
+def route_message(user_message, current_state):
+    """Return the intent that handles a message; an ongoing booking keeps the booking flow"""
+    if current_state != 'INITIAL':
+        return 'booking'
+    return classify_intent(user_message).intent
+
+class StreamStats:
+    """Time-to-first-token and total duration of streamed OpenAI replies"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.errors = 0
+        self.ttft_total = 0.0
+        self.ttft_max = 0.0
+        self.ttft_last = 0.0
+        self.duration_total = 0.0
+
+    def record(self, ttft, duration):
+        with self._lock:
+            self.streams += 1
+            self.ttft_total += ttft
+            self.ttft_max = max(self.ttft_max, ttft)
+            self.ttft_last = ttft
+            self.duration_total += duration
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'streams': self.streams,
+                'errors': self.errors,
+                'ttft_avg_ms': round(self.ttft_total / self.streams * 1000, 1) if self.streams else 0,
+                'ttft_max_ms': round(self.ttft_max * 1000, 1),
+                'ttft_last_ms': round(self.ttft_last * 1000, 1),
+                'duration_avg_ms': round(self.duration_total / self.streams * 1000, 1) if self.streams else 0
             }
-        ]
 
-        # Add conversation history
-        for msg in conversation_history:
-            content = msg['text']
-            if not msg.get('is_user', True) and '__STATE__' in content:
-                content = content.split('__STATE__')[0]
-            messages.append({
-                "role": "user" if msg.get('is_user', True) else "assistant",
-                "content": content
-            })
+stream_stats = StreamStats()
+
+def generate_response_stream(user_message, conversation):
+    """Yield the reply for a server-side conversation piece by piece
+
+    Booking steps and canned replies come back as a single piece; model answers are relayed as the
+    completion deltas arrive. The full reply is stored in the conversation at the end.
+    """
+    if not user_message.strip():
+        yield generate_response(user_message, conversation=conversation)
+        return
+
+    intent = route_message(user_message, conversation.state)
+    if intent != 'faq':
+        yield generate_response(user_message, conversation=conversation, intent=intent)
+        return
 
-        messages.append({"role": "user", "content": user_message})
+    history = list(conversation.history)
+    parts = []
+    try:
+        cached = response_cache.get(user_message, history)
+        if cached is not None:
+            parts.append(cached)
+            yield cached
+            return
+        for delta in stream_openai_response(user_message, history, conversation):
+            parts.append(delta)
+            yield delta
+        response_cache.set(user_message, history, ''.join(parts))
+    except Exception as e:
+        logger.error(f"Error streaming response: {str(e)}")
+        stream_stats.record_error()
+        if not parts:
+            if isinstance(e, LLMUnavailable):
+                fallback = LLM_FALLBACK_RESPONSE
+            else:
+                fallback = "Lo siento, ha ocurrido un error. Por favor, intenta de nuevo más tarde."
+            parts.append(fallback)
+            yield fallback
+    finally:
+        # Also runs when the client disconnects mid-stream
+        if parts:
+            conversation.add_message(user_message, True)
+            conversation.add_message(''.join(parts), False)
+
+def build_openai_prompt(user_message, history, conversation=None):
+    """Prompt within PROMPT_TOKEN_BUDGET; a server-side conversation keeps a rolling summary"""
+    if conversation is None:
+        return build_prompt(SYSTEM_PROMPT, history, user_message)
+    return build_prompt(
+        SYSTEM_PROMPT, history, user_message,
+        summary_key=conversation.id, history_offset=conversation.history_offset
+    )
 
-        completion = openai.ChatCompletion.create(
+def generate_openai_response(user_message, history, conversation=None):
+    """Answer a general question with the fine-tuned OpenAI model"""
+    # Repeated FAQ questions in the same context are answered without an upstream call
+    started = time.perf_counter()
+    cached = response_cache.get(user_message, history)
+    if cached is not None:
+        chatbot_response_duration.observe(time.perf_counter() - started, 'cache')
+        return cached
+
+    # Recent turns verbatim, older ones summarized, all within PROMPT_TOKEN_BUDGET
+    messages, prompt_tokens = build_openai_prompt(user_message, history, conversation)
+
+    # Bounded pool with a deadline and circuit breaker; upstream trouble gets a canned reply
+    try:
+        completion = llm_client.complete(
             model=os.getenv("MODELO_FINETUNED"),
             messages=messages,
             temperature=0.7,
             max_tokens=500
         )
+    except LLMUnavailable as e:
+        logger.warning(f"OpenAI unavailable, sending fallback reply: {str(e)}")
+        chatbot_response_duration.observe(time.perf_counter() - started, 'openai_fallback')
+        return LLM_FALLBACK_RESPONSE
 
-        return completion.choices[0].message.content
+    chatbot_response_duration.observe(time.perf_counter() - started, 'openai')
+    usage = completion.get('usage') if hasattr(completion, 'get') else None
+    if usage:
+        openai_tokens.inc('prompt', amount=usage.get('prompt_tokens') or 0)
+        openai_tokens.inc('completion', amount=usage.get('completion_tokens') or 0)
+        logger.info(f"OpenAI usage: {usage.get('prompt_tokens')} prompt tokens (estimated {prompt_tokens}), {usage.get('completion_tokens')} completion tokens")
 
-    except Exception as e:
-        logger.error(f"Error generating response: {str(e)}")
-        return "Lo siento, ha ocurrido un error. Por favor, intenta de nuevo más tarde."
+    response = completion.choices[0].message.content
+    response_cache.set(user_message, history, response)
+    return response
+
+def stream_openai_response(user_message, history, conversation=None):
+    """Yield the model's answer as content deltas, recording time-to-first-token"""
+    messages, prompt_tokens = build_openai_prompt(user_message, history, conversation)
+
+    started = time.perf_counter()
+    chunks = llm_client.stream(
+        model=os.getenv("MODELO_FINETUNED"),
+        messages=messages,
+        temperature=0.7,
+        max_tokens=500
+    )
+
+    ttft = None
+    for chunk in chunks:
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].get('delta', {}).get('content')
+        if not content:
+            continue
+        if ttft is None:
+            ttft = time.perf_counter() - started
+        yield content
+
+    duration = time.perf_counter() - started
+    stream_stats.record(ttft if ttft is not None else duration, duration)
+    chatbot_response_duration.observe(duration, 'openai_stream')
+    # Streamed completions carry no usage block; count the prompt as sent
+    openai_tokens.inc('prompt_estimated', amount=prompt_tokens)
+    logger.info(f"Streamed OpenAI reply: first token after {(ttft or duration) * 1000:.0f}ms, done after {duration * 1000:.0f}ms")
@@ -0,0 +1,106 @@
+import gzip
+import logging
+import os
+import threading
+from flask import request
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # bytes; smaller bodies are sent as is
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))  # per-response, so well below 11
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/x-ndjson', 'image/svg+xml'
+}
+
+def choose_encoding():
+    """Best content-coding this request accepts that we can produce, or None"""
+    if brotli is not None and request.accept_encodings.quality('br') > 0:
+        return 'br'
+    if request.accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+class CompressionStats:
+    """Bytes before and after compression, per content-coding"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, encoding, size_in, size_out):
+        with self._lock:
+            self.responses[encoding] = self.responses.get(encoding, 0) + 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'enabled': COMPRESSION_ENABLED,
+                'brotli': brotli is not None,
+                'min_size': COMPRESSION_MIN_SIZE,
+                'responses': dict(self.responses),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None
+            }
+
+compression_stats = CompressionStats()
+
+def compress_response(response):
+    """after_request hook: compress buffered text responses above the size threshold"""
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    compressed = compress(data, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes are a different representation of the same resource
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    compression_stats.record(encoding, len(data), len(compressed))
+    return response
+
+def init_app(app):
+    """Compress responses of this app when enabled"""
+    if not COMPRESSION_ENABLED:
+        logger.info("Response compression disabled")
+        return
+    if brotli is None:
+        logger.info("brotli is not installed; compressing responses with gzip only")
+    app.after_request(compress_response)
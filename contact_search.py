@@ -0,0 +1,161 @@
+import logging
+import os
+import re
+import threading
+from sqlalchemy import or_
+from models import db, ContactSubmission, escape_like
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_MAX_TERMS = 8
+SEARCH_PG_CONFIG = os.getenv('SEARCH_PG_CONFIG', 'spanish')  # Postgres text search configuration
+
+FTS_TABLE = 'contact_submission_fts'
+PG_INDEX = 'ix_contact_submission_search'
+# bm25 weights for nombre, email, dudas: a match on the contact itself beats one in the message
+FTS_WEIGHTS = (2.0, 2.0, 1.0)
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "nombre, email, dudas, content='contact_submission', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # External content table: triggers keep the index in step with the base table
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON contact_submission BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, nombre, email, dudas) VALUES (new.id, new.nombre, new.email, new.dudas); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON contact_submission BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nombre, email, dudas) "
+    "VALUES ('delete', old.id, old.nombre, old.email, old.dudas); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF nombre, email, dudas ON contact_submission BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nombre, email, dudas) "
+    "VALUES ('delete', old.id, old.nombre, old.email, old.dudas); "
+    f"INSERT INTO {FTS_TABLE}(rowid, nombre, email, dudas) VALUES (new.id, new.nombre, new.email, new.dudas); END",
+)
+
+PG_DOCUMENT = (
+    f"to_tsvector('{SEARCH_PG_CONFIG}', coalesce(nombre, '') || ' ' || coalesce(email, '') || ' ' || coalesce(dudas, ''))"
+)
+
+_backends = {}  # engine url -> 'fts5' or 'postgres'; 'like' is re-checked so a later index is picked up
+_backends_lock = threading.Lock()
+_warned_like = set()
+
+def search_terms(query):
+    """Words of a free-text query; operators and punctuation are never passed to the engine"""
+    return TERM_PATTERN.findall(query.lower())[:SEARCH_MAX_TERMS]
+
+def ensure_search_index(engine):
+    """Create the full-text index for the engine's dialect and fill it from existing rows"""
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == 'sqlite':
+            exists = connection.execute(db.text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': FTS_TABLE}).first()
+            for statement in SQLITE_SCHEMA:
+                connection.execute(db.text(statement))
+            if not exists:
+                connection.execute(db.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                logger.info(f"Built full-text index {FTS_TABLE}")
+        elif dialect == 'postgresql':
+            connection.execute(db.text(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON contact_submission USING GIN ({PG_DOCUMENT})"
+            ))
+        else:
+            logger.warning(f"No full-text index for dialect {dialect}; search will scan the table")
+    with _backends_lock:
+        _backends.pop(str(engine.url), None)
+
+def search_backend(engine):
+    """Which search implementation the engine supports right now"""
+    key = str(engine.url)
+    backend = _backends.get(key)
+    if backend is None:
+        backend = 'like'
+        if engine.dialect.name == 'postgresql':
+            backend = 'postgres'
+        elif engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                if connection.execute(db.text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+                ), {'name': FTS_TABLE}).first():
+                    backend = 'fts5'
+        with _backends_lock:
+            if backend != 'like':
+                _backends[key] = backend
+            elif key not in _warned_like:
+                _warned_like.add(key)
+                logger.warning("Full-text index missing; contact search falls back to LIKE scans")
+    return backend
+
+def _fts5_search(terms, limit, offset):
+    # Every term must match, as a prefix so partial words find results while typing
+    match = ' '.join(f'"{term}"*' for term in terms)
+    live = f"FROM {FTS_TABLE} JOIN contact_submission ON contact_submission.id = {FTS_TABLE}.rowid " \
+           f"WHERE {FTS_TABLE} MATCH :match AND contact_submission.deleted_at IS NULL"
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    ids = db.session.execute(db.text(
+        f"SELECT contact_submission.id {live} "
+        f"ORDER BY bm25({FTS_TABLE}, {weights}), contact_submission.created_at DESC "
+        "LIMIT :limit OFFSET :offset"
+    ), {'match': match, 'limit': limit, 'offset': offset}).scalars().all()
+    total = db.session.execute(db.text(f"SELECT count(*) {live}"), {'match': match}).scalar()
+    return ids, total
+
+def _postgres_search(terms, limit, offset):
+    tsquery = ' & '.join(f"{term}:*" for term in terms)
+    live = f"FROM contact_submission WHERE {PG_DOCUMENT} @@ to_tsquery('{SEARCH_PG_CONFIG}', :query) " \
+           "AND deleted_at IS NULL"
+    ids = db.session.execute(db.text(
+        f"SELECT id {live} "
+        f"ORDER BY ts_rank({PG_DOCUMENT}, to_tsquery('{SEARCH_PG_CONFIG}', :query)) DESC, created_at DESC "
+        "LIMIT :limit OFFSET :offset"
+    ), {'query': tsquery, 'limit': limit, 'offset': offset}).scalars().all()
+    total = db.session.execute(db.text(f"SELECT count(*) {live}"), {'query': tsquery}).scalar()
+    return ids, total
+
+def _like_search(terms, limit, offset):
+    query = ContactSubmission.query.filter(ContactSubmission.deleted_at.is_(None))
+    for term in terms:
+        pattern = f'%{escape_like(term)}%'
+        query = query.filter(or_(
+            ContactSubmission.nombre.ilike(pattern, escape='\\'),
+            ContactSubmission.email.ilike(pattern, escape='\\'),
+            ContactSubmission.dudas.ilike(pattern, escape='\\')
+        ))
+    total = query.order_by(None).count()
+    ids = [row.id for row in query.with_entities(ContactSubmission.id).order_by(
+        ContactSubmission.created_at.desc()
+    ).limit(limit).offset(offset)]
+    return ids, total
+
+SEARCHES = {'fts5': _fts5_search, 'postgres': _postgres_search, 'like': _like_search}
+
+def search_contact_submissions(query, page=1, per_page=SEARCH_PAGE_SIZE):
+    """Best matches for query over nombre, email and dudas; returns (submissions, total)"""
+    terms = search_terms(query)
+    if not terms:
+        return [], 0
+    ids, total = SEARCHES[search_backend(db.engine)](terms, per_page, (page - 1) * per_page)
+    if not ids:
+        return [], total
+    rows = {row.id: row for row in ContactSubmission.query.filter(ContactSubmission.id.in_(ids))}
+    return [rows[row_id] for row_id in ids if row_id in rows], total
+
+def init_app(app):
+    """Build the full-text index when the app is set up, so WSGI workers never start on LIKE scans"""
+    with app.app_context():
+        if not db.inspect(db.engine).has_table(ContactSubmission.__tablename__):
+            logger.warning("contact_submission table missing; the search index is built with the tables")
+            return
+        try:
+            ensure_search_index(db.engine)
+        except Exception as e:
+            logger.error(f"Could not build the contact search index, search will scan the table: {str(e)}", exc_info=True)
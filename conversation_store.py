@@ -0,0 +1,221 @@
+from collections import OrderedDict, deque
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+CONVERSATION_TTL = int(os.getenv('CONVERSATION_TTL', 1800))  # seconds of inactivity
+CONVERSATION_MAX_ENTRIES = int(os.getenv('CONVERSATION_MAX_ENTRIES', 10000))
+CONVERSATION_MAX_TURNS = int(os.getenv('CONVERSATION_MAX_TURNS', 50))  # messages kept per conversation
+# memory: per process; sqlite: conversations shared by every worker process on the host through one file
+CONVERSATION_BACKEND = os.getenv('CONVERSATION_BACKEND', 'memory').lower()
+CONVERSATION_DB = os.getenv('CONVERSATION_DB', os.path.join(tempfile.gettempdir(), 'kit_consulting_conversations.db'))
+CONVERSATION_CLEANUP_EVERY = 100  # sqlite backend: new conversations between expiry and size sweeps
+
+class Conversation:
+    """Server-side chat state: booking step, booking data and recent messages"""
+    def __init__(self, conversation_id, max_turns=CONVERSATION_MAX_TURNS):
+        self.id = conversation_id
+        self.state = 'INITIAL'
+        self.data = {}
+        self.history = deque(maxlen=max_turns)  # {'text': ..., 'is_user': ...} without state blobs
+        self.messages_added = 0
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+
+    def add_message(self, text, is_user):
+        self.history.append({'text': text, 'is_user': is_user})
+        self.messages_added += 1
+
+    @property
+    def history_offset(self):
+        """Position of history[0] among every message of the conversation"""
+        return self.messages_added - len(self.history)
+
+class ConversationStore:
+    """In-process conversation store with idle TTL and LRU eviction at a fixed size
+
+    Conversations live in this process only, which suits a single process (threads are fine).
+    With several worker processes use SQLiteConversationStore (CONVERSATION_BACKEND=sqlite).
+    """
+    def __init__(self, ttl=CONVERSATION_TTL, max_entries=CONVERSATION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conversations = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        """Drop expired conversations from the cold end of the LRU order"""
+        while self._conversations:
+            conversation = next(iter(self._conversations.values()))
+            if now - conversation.last_seen <= self.ttl:
+                break
+            self._conversations.popitem(last=False)
+            self.expirations += 1
+
+    def get(self, conversation_id):
+        """Return a live conversation and mark it as recently used, or None"""
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return None
+            if now - conversation.last_seen > self.ttl:
+                del self._conversations[conversation_id]
+                self.expirations += 1
+                return None
+            conversation.last_seen = now
+            self._conversations.move_to_end(conversation_id)
+            return conversation
+
+    def create(self):
+        """Start a new conversation, evicting the least recently used ones when full"""
+        now = time.monotonic()
+        conversation = Conversation(uuid.uuid4().hex)
+        with self._lock:
+            self._expire(now)
+            while len(self._conversations) >= self.max_entries:
+                self._conversations.popitem(last=False)
+                self.evictions += 1
+            self._conversations[conversation.id] = conversation
+        return conversation
+
+    def save(self, conversation):
+        """Nothing to write: callers already work on the stored object"""
+
+    def get_or_create(self, conversation_id=None):
+        """A new conversation without an id; None for an id that expired, was evicted or was never issued"""
+        if not conversation_id:
+            return self.create()
+        conversation = self.get(conversation_id)
+        if conversation is None:
+            with self._lock:
+                self.misses += 1
+            logger.warning(f"Unknown conversation id {conversation_id}: expired, evicted or never issued")
+        return conversation
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': type(self).__name__,
+                'conversations': len(self._conversations),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'misses': self.misses
+            }
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversations in a shared SQLite file so any worker process can continue any conversation
+
+    A turn works on its own copy and writes it back with save(). The chat widget sends one message
+    at a time, so turns of one conversation do not overlap; if they did, the last one saved wins.
+    """
+    def __init__(self, path=CONVERSATION_DB, ttl=CONVERSATION_TTL, max_entries=CONVERSATION_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._local = threading.local()
+        self._created = 0
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS conversations ('
+            'id TEXT PRIMARY KEY, state TEXT, data TEXT, history TEXT, messages_added INTEGER, updated_at REAL)'
+        )
+        self._connection().execute('CREATE INDEX IF NOT EXISTS ix_conversations_updated_at ON conversations (updated_at)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, conversation_id):
+        """Return a copy of a live conversation, or None"""
+        row = self._connection().execute(
+            'SELECT state, data, history, messages_added, updated_at FROM conversations WHERE id = ?', (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        state, data, history, messages_added, updated_at = row
+        if time.time() - updated_at > self.ttl:
+            self._connection().execute('DELETE FROM conversations WHERE id = ?', (conversation_id,))
+            with self._lock:
+                self.expirations += 1
+            return None
+        conversation = Conversation(conversation_id)
+        conversation.state = state
+        conversation.data = json.loads(data)
+        conversation.history.extend(json.loads(history))
+        conversation.messages_added = messages_added
+        return conversation
+
+    def create(self):
+        """Start and store a new conversation; expired and surplus ones are swept now and then"""
+        conversation = Conversation(uuid.uuid4().hex)
+        self.save(conversation)
+        with self._lock:
+            self._created += 1
+            sweep = self._created % CONVERSATION_CLEANUP_EVERY == 0
+        if sweep:
+            self._evict(time.time())
+        return conversation
+
+    def save(self, conversation):
+        """Write the conversation back and restart its idle TTL"""
+        self._connection().execute(
+            'INSERT OR REPLACE INTO conversations (id, state, data, history, messages_added, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (conversation.id, conversation.state, json.dumps(conversation.data),
+             json.dumps(list(conversation.history)), conversation.messages_added, time.time())
+        )
+
+    def _evict(self, now):
+        connection = self._connection()
+        expired = connection.execute('DELETE FROM conversations WHERE updated_at < ?', (now - self.ttl,)).rowcount
+        evicted = connection.execute(
+            'DELETE FROM conversations WHERE id IN ('
+            'SELECT id FROM conversations ORDER BY updated_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        with self._lock:
+            self.expirations += expired
+            self.evictions += evicted
+
+    def stats(self):
+        stats = super().stats()
+        stats['conversations'] = self._connection().execute('SELECT COUNT(*) FROM conversations').fetchone()[0]
+        return stats
+
+def create_conversation_store(backend=CONVERSATION_BACKEND):
+    """Build the store for the configured backend"""
+    if backend == 'sqlite':
+        try:
+            return SQLiteConversationStore()
+        except Exception as e:
+            logger.error(f"Failed to open conversation database {CONVERSATION_DB}, using per-process conversations: {str(e)}")
+    elif backend != 'memory':
+        logger.warning(f"Unknown CONVERSATION_BACKEND '{backend}', using per-process conversations")
+    return ConversationStore()
+
+conversation_store = create_conversation_store()
@@ -0,0 +1,224 @@
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import threading
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, or_, and_
+from dotenv import load_dotenv
+from models import db, Appointment, EmailOutbox
+from email_utils import send_appointment_confirmation, send_contact_form_notification, send_appointment_reminder
+from metrics import email_retries, email_failures
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', 2))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_BACKOFF = int(os.getenv('EMAIL_OUTBOX_BACKOFF', 30))  # seconds, doubled on every retry
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', 5))  # seconds
+EMAIL_OUTBOX_LOCK_TIMEOUT = int(os.getenv('EMAIL_OUTBOX_LOCK_TIMEOUT', 300))  # seconds before a stuck message is reclaimed
+
+# Handlers run by the workers, keyed by message kind. The outbox does its own
+# retries, so the undecorated senders are used instead of retry_on_failure.
+def _send_appointment_confirmation(payload):
+    appointment = db.session.get(Appointment, payload['appointment_id'])
+    if not appointment or appointment.deleted_at:
+        logger.warning(f"Skipping confirmation email for missing appointment {payload['appointment_id']}")
+        return
+    send_appointment_confirmation.__wrapped__(appointment)
+
+def _send_appointment_reminder(payload):
+    appointment = db.session.get(Appointment, payload['appointment_id'])
+    if not appointment or appointment.deleted_at:
+        logger.warning(f"Skipping reminder email for missing appointment {payload['appointment_id']}")
+        return
+    send_appointment_reminder.__wrapped__(appointment)
+
+def _send_contact_form_notification(payload):
+    send_contact_form_notification.__wrapped__(payload)
+
+OUTBOX_HANDLERS = {
+    'appointment_confirmation': _send_appointment_confirmation,
+    'appointment_reminder': _send_appointment_reminder,
+    'contact_form': _send_contact_form_notification,
+}
+
+_wakeup = threading.Event()
+_counters_lock = threading.Lock()
+_counters = {'sent': 0, 'retried': 0, 'failed': 0}
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+def enqueue_email(kind, payload):
+    """Add an email job to the current session; it is queued when the caller commits
+
+    The outbox row commits or rolls back together with the row the email is about, and
+    the workers are woken once the commit has gone through.
+    """
+    if kind not in OUTBOX_HANDLERS:
+        raise ValueError(f"Unknown email kind: {kind}")
+    message = EmailOutbox(kind=kind, payload=json.dumps(payload, ensure_ascii=False))
+    db.session.add(message)
+    db.session.info['email_outbox_queued'] = True
+    logger.info(f"Queued {kind} email in the outbox")
+    return message
+
+def _wake_after_commit(session):
+    if not session.info.pop('email_outbox_queued', False):
+        return
+    pool = current_app.extensions.get('email_outbox') if has_app_context() else None
+    if pool:
+        pool.ensure_started()
+    _wakeup.set()
+
+def _forget_after_rollback(session):
+    session.info.pop('email_outbox_queued', None)
+
+def claim_next_message():
+    """Atomically claim the next due message; returns it or None"""
+    now = datetime.utcnow()
+    stale_lock = now - timedelta(seconds=EMAIL_OUTBOX_LOCK_TIMEOUT)
+    candidate = EmailOutbox.query.with_entities(EmailOutbox.id).filter(or_(
+        and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale_lock)
+    )).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).first()
+    if not candidate:
+        return None
+
+    # Conditional update so only one worker (in any process) wins the message
+    claimed = EmailOutbox.query.filter(
+        EmailOutbox.id == candidate.id,
+        or_(EmailOutbox.status == 'pending',
+            and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale_lock))
+    ).update({
+        EmailOutbox.status: 'sending',
+        EmailOutbox.locked_at: now,
+        EmailOutbox.attempts: EmailOutbox.attempts + 1
+    }, synchronize_session=False)
+    db.session.commit()
+    if not claimed:
+        return None
+    return db.session.get(EmailOutbox, candidate.id)
+
+def process_message(message):
+    """Run the handler for a claimed message and record the outcome"""
+    try:
+        OUTBOX_HANDLERS[message.kind](json.loads(message.payload))
+        message.status = 'sent'
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+        db.session.commit()
+        _count('sent')
+        logger.info(f"Outbox message {message.id} ({message.kind}) sent")
+    except Exception as e:
+        db.session.rollback()
+        message = db.session.get(EmailOutbox, message.id)
+        message.last_error = str(e)
+        if message.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+            _count('failed')
+            email_failures.inc(message.kind)
+            logger.error(f"Outbox message {message.id} ({message.kind}) failed after {message.attempts} attempts: {str(e)}")
+        else:
+            retry_delay = EMAIL_OUTBOX_BACKOFF * 2 ** (message.attempts - 1)
+            message.status = 'pending'
+            message.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_delay)
+            _count('retried')
+            email_retries.inc(message.kind)
+            logger.warning(f"Outbox message {message.id} ({message.kind}) attempt {message.attempts} failed, retrying in {retry_delay}s: {str(e)}")
+        db.session.commit()
+
+def process_outbox(max_messages=None):
+    """Send due messages until the outbox is drained; returns the number processed"""
+    processed = 0
+    while max_messages is None or processed < max_messages:
+        message = claim_next_message()
+        if not message:
+            break
+        process_message(message)
+        processed += 1
+    return processed
+
+def get_outbox_stats():
+    """Return queue depth, per-status counts and this process' send counters"""
+    counts = dict(
+        db.session.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all()
+    )
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        'queue_depth': counts.get('pending', 0) + counts.get('sending', 0),
+        'pending': counts.get('pending', 0),
+        'sending': counts.get('sending', 0),
+        'sent': counts.get('sent', 0),
+        'failed': counts.get('failed', 0),
+        'workers': EMAIL_OUTBOX_WORKERS,
+        'process_counters': counters
+    }
+
+class OutboxWorkerPool:
+    """Background threads that drain the email outbox"""
+    def __init__(self, app, workers=EMAIL_OUTBOX_WORKERS, poll_interval=EMAIL_OUTBOX_POLL_INTERVAL):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the threads on first use, so importing the app does not spawn them"""
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                self.start()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'email-outbox-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} email outbox workers")
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Cleared before claiming: a message queued after the claim attempt keeps the event set
+            _wakeup.clear()
+            try:
+                with self.app.app_context():
+                    process_outbox()
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+            _wakeup.wait(self.poll_interval)
+
+def init_app(app):
+    """Register the outbox worker pool (disabled when EMAIL_OUTBOX_WORKERS=0)
+
+    The threads start with the first request or queued email, not at import time.
+    """
+    event.listen(db.session, 'after_commit', _wake_after_commit)
+    event.listen(db.session, 'after_rollback', _forget_after_rollback)
+    if EMAIL_OUTBOX_WORKERS <= 0:
+        logger.info("Email outbox workers disabled")
+        return None
+    pool = OutboxWorkerPool(app)
+    app.extensions['email_outbox'] = pool
+    app.before_request(pool.ensure_started)
+    return pool
@@ -0,0 +1,99 @@
+from flask import current_app
+from flask_mail import Message
+from email import policy
+from email.encoders import encode_base64
+from email.mime.base import MIMEBase
+import logging
+import os
+import threading
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = 'static/disenyo/SVG/01-LOGO.svg'
+
+EMAIL_TEMPLATES = (
+    'email/appointment_confirmation.html',
+    'email/appointment_reminder.html',
+    'email/contact_form.html',
+    'email/contact_form_confirmation.html',
+)
+
+# The SMTP policy re-parses every header while serializing; compat32 writes them as built
+SERIALIZE_POLICY = policy.compat32.clone(linesep='\r\n')
+
+class RenderedMessage(Message):
+    """Message that attaches pre-encoded inline parts and serializes without re-parsing headers"""
+    def __init__(self, *args, inline_parts=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.inline_parts = inline_parts
+
+    def _message(self):
+        msg = super()._message()
+        # Shared, already base64-encoded parts: attached by reference, never copied
+        for part in self.inline_parts:
+            msg.attach(part)
+        return msg
+
+    def as_bytes(self):
+        return self._message().as_bytes(policy=SERIALIZE_POLICY)
+
+class EmailRenderer:
+    """Compiles the email templates and loads the inline logo once per app"""
+    def __init__(self, app):
+        self.app = app
+        self.templates = {name: app.jinja_env.get_template(name) for name in EMAIL_TEMPLATES}
+        self.logo = self._load_logo()
+
+    def _load_logo(self):
+        try:
+            with self.app.open_resource(LOGO_PATH) as logo:
+                data = logo.read()
+        except Exception as e:
+            logger.warning(f"Failed to load email logo: {str(e)}")
+            return None
+        # Build and base64-encode the inline MIME part once
+        part = MIMEBase('image', 'svg+xml')
+        part.set_payload(data)
+        encode_base64(part)
+        part.add_header('Content-Disposition', 'inline', filename='logo.svg')
+        part.add_header('Content-ID', '<logo>')
+        return part
+
+    def render(self, template_name, context):
+        """Render a pre-compiled template without the per-call template lookup"""
+        template = self.templates.get(template_name) or self.app.jinja_env.get_template(template_name)
+        return template.render(**context)
+
+    def build_message(self, subject, recipients, template_name, context):
+        """Build a Message with rendered HTML and the cached inline logo"""
+        return RenderedMessage(
+            f'{os.getenv("APP_NAME", "KIT CONSULTING")} - {subject}',
+            sender=self.app.config['MAIL_USERNAME'],
+            recipients=recipients,
+            html=self.render(template_name, context),
+            inline_parts=(self.logo,) if self.logo is not None else ()
+        )
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+def get_renderer(app=None):
+    """Return the email renderer for the given (or current) app"""
+    app = app or current_app._get_current_object()
+    renderer = _renderers.get(app)
+    if renderer is None:
+        with _renderers_lock:
+            renderer = _renderers.get(app)
+            if renderer is None:
+                renderer = EmailRenderer(app)
+                _renderers[app] = renderer
+    return renderer
+
+def build_email(subject, recipients, template_name, context):
+    """Build an email with the current app's renderer"""
+    return get_renderer().build_message(subject, recipients, template_name, context)
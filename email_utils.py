@@ -1,13 +1,13 @@
-from flask import render_template, current_app
-from flask_mail import Mail, Message
-from datetime import datetime, timedelta
-import os
+from flask import current_app
+from flask_mail import Mail
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
 from dotenv import load_dotenv
 import time
+from functools import wraps
 from smtplib import SMTPException
+from mail_transport import send_messages
+from email_rendering import build_email
 
 # Configure logging
 logging.basicConfig(
@@ -20,11 +20,12 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 mail = Mail()
+# Configured by reminders.init_scheduler and started by reminders.start_scheduler
 scheduler = BackgroundScheduler()
-scheduler.start()
 
 def retry_on_failure(func):
     """Decorator to retry failed email operations"""
+    @wraps(func)
     def wrapper(*args, **kwargs):
         max_retries = 3
         retry_delay = 1  # seconds
@@ -41,43 +42,31 @@ def retry_on_failure(func):
                 retry_delay *= 2
     return wrapper
 
+def appointment_email_context(appointment):
+    """Template context shared by the confirmation and reminder emails"""
+    return {
+        'name': appointment.name,
+        'service': appointment.service,
+        'date': appointment.date.strftime('%d de %B de %Y'),
+        'time': appointment.time,
+        'email': appointment.email,
+        'contact_email': current_app.config['MAIL_USERNAME'],
+        'cancel_url': f"{current_app.config['BASE_URL']}/cancel/{appointment.id}",
+        'reschedule_url': f"{current_app.config['BASE_URL']}/reschedule/{appointment.id}"
+    }
+
 @retry_on_failure
 def send_appointment_confirmation(appointment):
     """Send confirmation email for a new appointment with enhanced error handling"""
     try:
         logger.info(f"Preparing confirmation email for appointment {appointment.id}")
         
-        msg = Message(
-            f'{os.getenv("APP_NAME", "KIT CONSULTING")} - Confirmación de Cita',
-            sender=current_app.config['MAIL_USERNAME'],
-            recipients=[appointment.email]
-        )
-        
-        # Prepare template context
-        context = {
-            'name': appointment.name,
-            'service': appointment.service,
-            'date': appointment.date.strftime('%d de %B de %Y'),
-            'time': appointment.time,
-            'email': appointment.email,
-            'contact_email': current_app.config['MAIL_USERNAME'],
-            'cancel_url': f"{current_app.config['BASE_URL']}/cancel/{appointment.id}",
-            'reschedule_url': f"{current_app.config['BASE_URL']}/reschedule/{appointment.id}"
-        }
-        
-        # Create HTML content
-        msg.html = render_template('email/appointment_confirmation.html', **context)
-        
-        # Attach logo if it exists
-        try:
-            with current_app.open_resource('static/disenyo/SVG/01-LOGO.svg') as logo:
-                msg.attach('logo.svg', 'image/svg+xml', logo.read(), 'inline', 
-                          headers=[('Content-ID', '<logo>')])
-        except Exception as e:
-            logger.warning(f"Failed to attach logo to email: {str(e)}")
+        # Render from the pre-compiled template with the cached logo attached
+        msg = build_email('Confirmación de Cita', [appointment.email],
+                          'email/appointment_confirmation.html', appointment_email_context(appointment))
         
         # Send email
-        mail.send(msg)
+        send_messages(msg)
         logger.info(f"Confirmation email sent successfully for appointment {appointment.id}")
         
     except SMTPException as e:
@@ -93,20 +82,6 @@ def send_contact_form_notification(form_data):
     try:
         logger.info("Preparing contact form notification email")
         
-        # Create message for admin
-        admin_msg = Message(
-            f'{os.getenv("APP_NAME", "KIT CONSULTING")} - Nueva Consulta',
-            sender=current_app.config['MAIL_USERNAME'],
-            recipients=[current_app.config['MAIL_USERNAME']]  # Send to admin
-        )
-        
-        # Create message for user
-        user_msg = Message(
-            f'{os.getenv("APP_NAME", "KIT CONSULTING")} - Hemos recibido tu consulta',
-            sender=current_app.config['MAIL_USERNAME'],
-            recipients=[form_data['email']]
-        )
-        
         # Prepare template context
         context = {
             'nombre': form_data['nombre'],
@@ -115,23 +90,14 @@ def send_contact_form_notification(form_data):
             'dudas': form_data['dudas']
         }
         
-        # Create HTML content
-        admin_msg.html = render_template('email/contact_form.html', **context)
-        user_msg.html = render_template('email/contact_form_confirmation.html', **context)
+        # Message for admin and confirmation for user, sharing the cached logo
+        admin_msg = build_email('Nueva Consulta', [current_app.config['MAIL_USERNAME']],
+                                'email/contact_form.html', context)
+        user_msg = build_email('Hemos recibido tu consulta', [form_data['email']],
+                               'email/contact_form_confirmation.html', context)
         
-        # Attach logo to both emails
-        try:
-            with current_app.open_resource('static/disenyo/SVG/01-LOGO.svg') as logo:
-                logo_data = logo.read()
-                for msg in [admin_msg, user_msg]:
-                    msg.attach('logo.svg', 'image/svg+xml', logo_data, 'inline',
-                             headers=[('Content-ID', '<logo>')])
-        except Exception as e:
-            logger.warning(f"Failed to attach logo to email: {str(e)}")
-        
-        # Send emails
-        mail.send(admin_msg)
-        mail.send(user_msg)
+        # Send both emails over one pooled SMTP session
+        send_messages(admin_msg, user_msg)
         logger.info("Contact form notification emails sent successfully")
         
     except SMTPException as e:
@@ -147,37 +113,12 @@ def send_appointment_reminder(appointment):
     try:
         logger.info(f"Preparing reminder email for appointment {appointment.id}")
         
-        msg = Message(
-            f'{os.getenv("APP_NAME", "KIT CONSULTING")} - Recordatorio de Cita',
-            sender=current_app.config['MAIL_USERNAME'],
-            recipients=[appointment.email]
-        )
-        
-        # Prepare template context
-        context = {
-            'name': appointment.name,
-            'service': appointment.service,
-            'date': appointment.date.strftime('%d de %B de %Y'),
-            'time': appointment.time,
-            'email': appointment.email,
-            'contact_email': current_app.config['MAIL_USERNAME'],
-            'cancel_url': f"{current_app.config['BASE_URL']}/cancel/{appointment.id}",
-            'reschedule_url': f"{current_app.config['BASE_URL']}/reschedule/{appointment.id}"
-        }
-        
-        # Create HTML content
-        msg.html = render_template('email/appointment_reminder.html', **context)
-        
-        # Attach logo if it exists
-        try:
-            with current_app.open_resource('static/disenyo/SVG/01-LOGO.svg') as logo:
-                msg.attach('logo.svg', 'image/svg+xml', logo.read(), 'inline', 
-                          headers=[('Content-ID', '<logo>')])
-        except Exception as e:
-            logger.warning(f"Failed to attach logo to email: {str(e)}")
+        # Render from the pre-compiled template with the cached logo attached
+        msg = build_email('Recordatorio de Cita', [appointment.email],
+                          'email/appointment_reminder.html', appointment_email_context(appointment))
         
         # Send email
-        mail.send(msg)
+        send_messages(msg)
         logger.info(f"Reminder email sent successfully for appointment {appointment.id}")
         
     except SMTPException as e:
@@ -186,25 +127,3 @@ def send_appointment_reminder(appointment):
     except Exception as e:
         logger.error(f"Unexpected error sending reminder email for appointment {appointment.id}: {str(e)}")
         raise
-
-def schedule_reminder_email(appointment):
-    """Schedule a reminder email for 24 hours before the appointment with improved logging"""
-    try:
-        reminder_time = datetime.combine(appointment.date, 
-                                       datetime.strptime(appointment.time, '%H:%M').time()) - timedelta(days=1)
-        
-        if reminder_time > datetime.now():
-            scheduler.add_job(
-                send_appointment_reminder,
-                trigger=DateTrigger(run_date=reminder_time),
-                args=[appointment],
-                id=f'reminder_{appointment.id}',
-                replace_existing=True
-            )
-            logger.info(f"Scheduled reminder email for appointment {appointment.id} at {reminder_time}")
-        else:
-            logger.warning(f"Skipped scheduling reminder for past appointment {appointment.id}")
-            
-    except Exception as e:
-        logger.error(f"Error scheduling reminder email for appointment {appointment.id}: {str(e)}")
-        raise
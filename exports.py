@@ -0,0 +1,114 @@
+from datetime import date, datetime
+import csv
+import io
+import json
+import logging
+import os
+import re
+from flask import Response, stream_with_context
+from models import Appointment, ContactSubmission
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))  # rows fetched per round trip and sent per chunk
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+
+APPOINTMENT_EXPORT_COLUMNS = (
+    ('id', Appointment.id),
+    ('name', Appointment.name),
+    ('email', Appointment.email),
+    ('phone', Appointment.phone),
+    ('date', Appointment.date),
+    ('time', Appointment.time),
+    ('service', Appointment.service),
+    ('status', Appointment.status),
+    ('created_at', Appointment.created_at)
+)
+
+CONTACT_SUBMISSION_EXPORT_COLUMNS = (
+    ('id', ContactSubmission.id),
+    ('nombre', ContactSubmission.nombre),
+    ('email', ContactSubmission.email),
+    ('telefono', ContactSubmission.telefono),
+    ('dudas', ContactSubmission.dudas),
+    ('created_at', ContactSubmission.created_at)
+)
+
+# Spreadsheets evaluate cells starting with these; public form input must not become a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+PHONE_PATTERN = re.compile(r'[+\d\s()-]+')
+
+def format_value(value):
+    """Dates as the admin API shows them; everything else unchanged"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+def csv_safe(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not PHONE_PATTERN.fullmatch(value):
+        return "'" + value
+    return value
+
+def iter_csv(names, rows):
+    """CSV text in chunks of EXPORT_BATCH_SIZE rows, with a BOM so Excel reads UTF-8"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(names)
+    count = 0
+    for row in rows:
+        writer.writerow([csv_safe(format_value(value)) for value in row])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_ndjson(names, rows):
+    """One JSON object per line, in chunks of EXPORT_BATCH_SIZE rows"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, map(format_value, row))), ensure_ascii=False))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def stream_export(query, columns, export_format, filename):
+    """Stream the query's rows as a download without holding the result set in memory
+
+    query must already carry its filters and ordering.
+    """
+    names = [name for name, _ in columns]
+    # Plain tuples fetched in batches: server-side cursor on Postgres, no ORM identity map
+    rows = query.with_entities(*[column for _, column in columns]).yield_per(EXPORT_BATCH_SIZE)
+    chunks = iter_csv(names, rows) if export_format == 'csv' else iter_ndjson(names, rows)
+
+    def generate():
+        exported = 0
+        try:
+            for chunk in chunks:
+                exported += 1
+                yield chunk
+        except Exception as e:
+            # Headers are gone already; a truncated body is the only signal left
+            logger.error(f"Export {filename} failed after {exported} chunks: {str(e)}", exc_info=True)
+            raise
+        logger.info(f"Exported {filename} in {exported} chunks")
+
+    response = Response(stream_with_context(generate()), content_type=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
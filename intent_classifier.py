@@ -0,0 +1,249 @@
+from collections import namedtuple
+import logging
+import os
+import re
+import threading
+import time
+from dotenv import load_dotenv
+from response_cache import normalize_message
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# keyword: built-in n-gram rules; transformer: fine-tuned sequence classifier, falls back to keyword
+INTENT_BACKEND = os.getenv('INTENT_BACKEND', 'keyword').lower()
+INTENT_MODEL = os.getenv('INTENT_MODEL', 'distilbert-base-uncased')
+INTENT_MODEL_CACHE = os.getenv('INTENT_MODEL_CACHE', 'models')
+INTENT_BATCH_SIZE = int(os.getenv('INTENT_BATCH_SIZE', 16))
+INTENT_BATCH_WAIT = int(os.getenv('INTENT_BATCH_WAIT', 5)) / 1000.0  # milliseconds to wait for a fuller batch
+INTENT_MIN_CONFIDENCE = float(os.getenv('INTENT_MIN_CONFIDENCE', 0.6))
+
+# faq is the fallback: anything not confidently routed goes to the model
+INTENTS = ('booking', 'greeting', 'out_of_scope', 'faq')
+
+IntentResult = namedtuple('IntentResult', ['intent', 'confidence'])
+
+# Patterns run on normalized text (lowercase, no accents, no punctuation). A booking noun or
+# verb alone is not enough ("¿la reunión tiene coste?" is a question for the model): it takes
+# a booking verb near a booking noun, a first-person request, or a message opening with one.
+BOOKING_VERB = r'(reserv\w*|agend\w*|concert\w*|pedir|pido|pedimos|solicitar|solicito|programar|organizar|fijar|dar|dame|deme)'
+BOOKING_NOUN = r'(citas?|reunion|hora|llamada|videollamada|consulta|consultoria|sesion|asesoria)'
+WANT = r'(quiero|quisiera|queria|necesito|me gustaria|me interesa|deseo|puedo|podria|podemos|me podeis|me puedes)'
+
+BOOKING_PATTERNS = [re.compile(pattern) for pattern in (
+    # "quiero pedir una cita", "agendar reunion", "¿como pido hora?"
+    rf'\b{BOOKING_VERB}( \w+){{0,2}} {BOOKING_NOUN}\b',
+    # "necesito una cita", "quisiera una reunion"
+    rf'\b{WANT} (tener )?(una |un )?(cita|reunion|llamada|videollamada)\b',
+    # "quiero reservar", "¿puedo agendar?"
+    rf'\b{WANT} (\w+ )?(reservar|agendar|concertar)\b',
+    # "reserva para el jueves", "cita el lunes"
+    r'^(reserv\w*|agend\w*|(una )?cita)\b',
+    r'\bhablar con (un |una |el |la )?(asesor|consultor|experto|especialista)',
+    r'\b(cuando|que dia) (podemos|puedo) (vernos|quedar)\b',
+)]
+
+GREETING_WORDS = {
+    'hola', 'buenas', 'buenos', 'buen', 'dia', 'dias', 'tardes', 'noches', 'hey', 'saludos',
+    'hello', 'hi', 'ey', 'que', 'tal', 'como', 'estas', 'esta', 'va', 'muy', 'holi'
+}
+GREETING_ANCHORS = {'hola', 'buenas', 'buenos', 'buen', 'hey', 'saludos', 'hello', 'hi', 'holi'}
+GREETING_MAX_WORDS = 6
+
+OUT_OF_SCOPE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'\b(clima|lluvia|llover|temperatura)\b',
+    r'\bque tiempo hace\b',
+    r'\b(futbol|baloncesto|partido|liga|champions|deporte)',
+    r'\b(receta|cocinar|comida|restaurante)',
+    r'\b(chiste|broma|adivinanza)',
+    r'\b(pelicula|serie|netflix|cancion|musica|videojuego)',
+    r'\b(horoscopo|loteria|apuesta)',
+    r'\b(bitcoin|cripto)',
+    r'\b(politica|elecciones|presidente)\b',
+)]
+
+DOMAIN_PATTERNS = [re.compile(pattern) for pattern in (
+    r'\bkit\b', r'\bconsult', r'\bayuda', r'\bsubvenc', r'\bdigital', r'\bempresa', r'\bpyme',
+    r'\bnegocio', r'\binteligencia artificial\b', r'\bia\b', r'\bventa', r'\bprograma\b', r'\bbono',
+    r'\brequisito', r'\bservicio', r'\bprecio', r'\bcoste', r'\bautonomo', r'\bciberseguridad',
+    r'\bmarketing', r'\bfactura', r'\bsolicitud', r'\bplazo',
+)]
+
+class KeywordIntentClassifier:
+    """Rule-based intent classifier over normalized n-grams; microseconds per message"""
+    name = 'keyword'
+
+    def classify(self, text):
+        normalized = normalize_message(text)
+        if not normalized:
+            return IntentResult('faq', 0.0)
+
+        if any(pattern.search(normalized) for pattern in BOOKING_PATTERNS):
+            return IntentResult('booking', 0.9)
+
+        words = normalized.split()
+        # Only a bare greeting; "hola, ¿qué es el kit?" is a question for the model
+        if (len(words) <= GREETING_MAX_WORDS
+                and GREETING_ANCHORS.intersection(words)
+                and all(word in GREETING_WORDS for word in words)):
+            return IntentResult('greeting', 0.9)
+
+        if (any(pattern.search(normalized) for pattern in OUT_OF_SCOPE_PATTERNS)
+                and not any(pattern.search(normalized) for pattern in DOMAIN_PATTERNS)):
+            return IntentResult('out_of_scope', 0.7)
+
+        return IntentResult('faq', 0.5)
+
+    def classify_batch(self, texts):
+        return [self.classify(text) for text in texts]
+
+class _PendingIntent:
+    __slots__ = ('text', 'result', 'done')
+
+    def __init__(self, text):
+        self.text = text
+        self.result = None
+        self.done = threading.Event()
+
+class TransformerIntentClassifier:
+    """Fine-tuned sequence classifier run on CPU
+
+    The model's labels must be intent names. Concurrent requests are grouped into
+    batches of up to INTENT_BATCH_SIZE, waiting at most INTENT_BATCH_WAIT for company.
+    """
+    name = 'transformer'
+
+    def __init__(self, model_name=INTENT_MODEL, cache_dir=INTENT_MODEL_CACHE,
+                 batch_size=INTENT_BATCH_SIZE, max_wait=INTENT_BATCH_WAIT,
+                 min_confidence=INTENT_MIN_CONFIDENCE):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name, cache_dir=cache_dir)
+        self.model.eval()
+        self.labels = {int(index): label.lower() for index, label in self.model.config.id2label.items()}
+        unknown = set(self.labels.values()) - set(INTENTS)
+        if unknown:
+            raise ValueError(f"Model '{model_name}' has labels {sorted(unknown)} that are not intents {INTENTS}")
+
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.min_confidence = min_confidence
+        self._queue = []
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='intent-batcher', daemon=True)
+        self._thread.start()
+
+    def classify_batch(self, texts):
+        """Run one padded forward pass over the texts"""
+        inputs = self.tokenizer(
+            [normalize_message(text) for text in texts],
+            padding=True, truncation=True, max_length=64, return_tensors='pt'
+        )
+        with self.torch.no_grad():
+            probabilities = self.model(**inputs).logits.softmax(dim=-1)
+        confidences, indexes = probabilities.max(dim=-1)
+
+        results = []
+        for confidence, index in zip(confidences.tolist(), indexes.tolist()):
+            intent = self.labels[index]
+            if confidence < self.min_confidence:
+                intent = 'faq'
+            results.append(IntentResult(intent, round(confidence, 3)))
+        return results
+
+    def classify(self, text):
+        pending = _PendingIntent(text)
+        with self._cond:
+            self._queue.append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        return pending.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.max_wait
+                while len(self._queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.batch_size]
+                del self._queue[:self.batch_size]
+
+            try:
+                results = self.classify_batch([pending.text for pending in batch])
+            except Exception as e:
+                logger.error(f"Intent batch of {len(batch)} failed: {str(e)}")
+                results = [IntentResult('faq', 0.0)] * len(batch)
+            for pending, result in zip(batch, results):
+                pending.result = result
+                pending.done.set()
+
+def create_classifier(backend=INTENT_BACKEND):
+    """Build the configured classifier, falling back to keywords if the model can't be loaded"""
+    if backend == 'transformer':
+        try:
+            return TransformerIntentClassifier()
+        except ImportError:
+            logger.warning("transformers/torch not installed, using the keyword intent classifier")
+        except Exception as e:
+            logger.error(f"Failed to load intent model '{INTENT_MODEL}', using the keyword intent classifier: {str(e)}")
+    elif backend != 'keyword':
+        logger.warning(f"Unknown INTENT_BACKEND '{backend}', using the keyword intent classifier")
+    return KeywordIntentClassifier()
+
+class IntentStats:
+    """Per-intent counts and classification latency"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {intent: 0 for intent in INTENTS}
+        self.total_seconds = 0.0
+
+    def record(self, intent, seconds):
+        with self._lock:
+            self.counts[intent] = self.counts.get(intent, 0) + 1
+            self.total_seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            classified = sum(self.counts.values())
+            return {
+                'backend': _classifier.name if _classifier else None,
+                'counts': dict(self.counts),
+                'avg_ms': round(self.total_seconds / classified * 1000, 3) if classified else 0
+            }
+
+intent_stats = IntentStats()
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_intent_classifier():
+    """Return the process-wide classifier, loading it on first use"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = create_classifier()
+                logger.info(f"Intent classifier backend: {_classifier.name}")
+    return _classifier
+
+def classify_intent(text):
+    """Classify one message and record it in intent_stats"""
+    start = time.perf_counter()
+    result = get_intent_classifier().classify(text)
+    intent_stats.record(result.intent, time.perf_counter() - start)
+    return result
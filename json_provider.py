@@ -0,0 +1,67 @@
+import logging
+import os
+from flask.json.provider import DefaultJSONProvider, _default
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# orjson: fast native encoder when installed; default: the standard library json module
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'orjson').lower()
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify() through orjson, producing the same values as the default provider"""
+    def _options(self, indent=False):
+        # Dates and dataclasses go through Flask's own conversion so output does not change
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for json.dumps specific arguments get the standard encoder
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # Hand the encoded bytes straight to the response instead of round-tripping through str
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self._options(indent)),
+            mimetype=self.mimetype
+        )
+
+def create_json_provider(app, backend=JSON_BACKEND):
+    """JSON provider for the configured backend"""
+    if backend == 'orjson':
+        if orjson is not None:
+            return OrjsonProvider(app)
+        logger.warning("orjson is not installed, using the standard JSON encoder")
+    elif backend != 'default':
+        logger.warning(f"Unknown JSON_BACKEND '{backend}', using the standard JSON encoder")
+    return DefaultJSONProvider(app)
+
+def init_app(app, backend=JSON_BACKEND):
+    """Serialize this app's JSON with the configured backend"""
+    app.json = create_json_provider(app, backend)
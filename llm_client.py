@@ -0,0 +1,221 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import logging
+import os
+import queue
+import threading
+import time
+import openai
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))  # upstream calls in flight
+LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', 8))  # calls waiting for a slot before new ones are refused
+LLM_TIMEOUT = int(os.getenv('LLM_TIMEOUT', 20))  # seconds per call, queue wait included
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', 5))  # consecutive failures that open the circuit
+LLM_BREAKER_COOLDOWN = int(os.getenv('LLM_BREAKER_COOLDOWN', 30))  # seconds before a trial call is let through
+
+LLM_FALLBACK_RESPONSE = (
+    "En este momento no puedo responder a tu consulta. Por favor, inténtalo de nuevo en unos minutos. "
+    "Si lo prefieres, escribe <strong>cita</strong> y te ayudo a reservar una consultoría con nuestro equipo."
+)
+
+class LLMUnavailable(Exception):
+    """The model could not answer in time: circuit open, queue full, timeout or upstream error"""
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after a cooldown one trial call decides whether to close"""
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logger.info("OpenAI circuit closed")
+            self.state = 'closed'
+            self.failures = 0
+
+    def release_trial(self):
+        """A trial call ended without an answer either way: let the next call try again"""
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'open'
+                self.opened_at = time.monotonic() - self.cooldown
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                logger.warning(f"OpenAI circuit opened after {self.failures} failures, retrying in {self.cooldown}s")
+
+class LLMClient:
+    """Runs OpenAI calls on a dedicated bounded pool so slow upstreams can't hold every request thread"""
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_queue=LLM_MAX_QUEUE, timeout=LLM_TIMEOUT,
+                 breaker=None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._started = 0
+        self._counters = {
+            'calls': 0, 'succeeded': 0, 'errors': 0, 'timeouts': 0, 'rejected': 0, 'short_circuited': 0,
+            'cancelled': 0
+        }
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._wait_total = 0.0
+
+    def _submit(self, fn):
+        """Queue a call, refusing it when the queue is full or the circuit is open"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._counters['rejected'] += 1
+                raise LLMUnavailable(f"{self._queued} OpenAI calls already waiting")
+            self._queued += 1  # reserve the queue slot before asking the breaker
+        if not self.breaker.allow():
+            with self._lock:
+                self._queued -= 1
+                self._counters['short_circuited'] += 1
+            raise LLMUnavailable("OpenAI circuit is open")
+
+        submitted = time.perf_counter()
+
+        def run():
+            with self._lock:
+                self._queued -= 1
+                self._in_flight += 1
+                self._started += 1
+                self._wait_total += time.perf_counter() - submitted
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        with self._lock:
+            self._counters['calls'] += 1
+        return self._executor.submit(run), submitted
+
+    def _abandon(self, future):
+        # A call still waiting for a worker never runs, so it leaves the queue here
+        if future.cancel():
+            with self._lock:
+                self._queued -= 1
+
+    def _record(self, outcome, submitted):
+        elapsed = time.perf_counter() - submitted
+        with self._lock:
+            self._counters[outcome] += 1
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+        if outcome == 'succeeded':
+            self.breaker.record_success()
+        elif outcome == 'cancelled':
+            # The client went away; that says nothing about the upstream
+            self.breaker.release_trial()
+        else:
+            self.breaker.record_failure()
+
+    def complete(self, **kwargs):
+        """ChatCompletion.create with a deadline; raises LLMUnavailable instead of blocking"""
+        future, submitted = self._submit(
+            lambda: openai.ChatCompletion.create(request_timeout=self.timeout, **kwargs)
+        )
+        try:
+            result = future.result(timeout=self.timeout)
+        except FuturesTimeout:
+            self._abandon(future)
+            self._record('timeouts', submitted)
+            raise LLMUnavailable(f"OpenAI call exceeded {self.timeout}s")
+        except Exception as e:
+            self._record('errors', submitted)
+            raise LLMUnavailable(str(e)) from e
+        self._record('succeeded', submitted)
+        return result
+
+    def stream(self, **kwargs):
+        """Yield streamed completion chunks; the whole stream must finish within the deadline"""
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+
+        def consume():
+            try:
+                for chunk in openai.ChatCompletion.create(stream=True, request_timeout=self.timeout, **kwargs):
+                    if cancelled.is_set():
+                        return
+                    chunks.put(('chunk', chunk))
+                chunks.put(('done', None))
+            except Exception as e:
+                chunks.put(('error', e))
+
+        future, submitted = self._submit(consume)
+        deadline = submitted + self.timeout
+        outcome = None
+        try:
+            while True:
+                try:
+                    kind, item = chunks.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    outcome = 'timeouts'
+                    raise LLMUnavailable(f"OpenAI stream exceeded {self.timeout}s")
+                if kind == 'done':
+                    outcome = 'succeeded'
+                    return
+                if kind == 'error':
+                    outcome = 'errors'
+                    raise LLMUnavailable(str(item)) from item
+                yield item
+        finally:
+            # Also reached when the client goes away mid-stream (GeneratorExit): no outcome yet
+            cancelled.set()
+            self._abandon(future)
+            self._record(outcome or 'cancelled', submitted)
+
+    def stats(self):
+        with self._lock:
+            finished = sum(self._counters[key] for key in ('succeeded', 'errors', 'timeouts', 'cancelled'))
+            return {
+                **self._counters,
+                'queue_depth': self._queued,
+                'in_flight': self._in_flight,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'timeout': self.timeout,
+                'latency_avg_ms': round(self._latency_total / finished * 1000, 1) if finished else 0,
+                'latency_max_ms': round(self._latency_max * 1000, 1),
+                'queue_wait_avg_ms': round(self._wait_total / self._started * 1000, 1) if self._started else 0,
+                'circuit': self.breaker.state,
+                'circuit_opened': self.breaker.times_opened
+            }
+
+llm_client = LLMClient()
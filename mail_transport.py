@@ -0,0 +1,199 @@
+from flask import current_app
+from flask_mail import sanitize_address, sanitize_addresses, email_dispatched, BadHeaderError
+import logging
+import os
+import smtplib
+import threading
+import time
+from dotenv import load_dotenv
+from metrics import email_send_duration
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+MAIL_POOL_SIZE = int(os.getenv('MAIL_POOL_SIZE', 2))
+MAIL_POOL_MAX_IDLE = int(os.getenv('MAIL_POOL_MAX_IDLE', 240))  # seconds before an idle session is closed
+MAIL_POOL_KEEPALIVE = int(os.getenv('MAIL_POOL_KEEPALIVE', 30))  # seconds idle before a NOOP health check
+MAIL_POOL_MAX_MESSAGES = int(os.getenv('MAIL_POOL_MAX_MESSAGES', 100))  # messages per session before reconnecting
+MAIL_TIMEOUT = int(os.getenv('MAIL_TIMEOUT', 30))  # seconds
+
+# Errors after which the session is dropped and the message retried on a fresh one. Every
+# SMTPException is an OSError, so OSError itself must not be listed: a rejected recipient or
+# DATA command would be resent over a new session.
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError)
+# The server answered and rejected the message; the session is still good and stays in the pool
+REJECTION_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+class PooledSMTPConnection:
+    """An authenticated SMTP session plus bookkeeping for the pool"""
+    def __init__(self, host):
+        self.host = host
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+    def close(self):
+        try:
+            self.host.quit()
+        except Exception:
+            try:
+                self.host.close()
+            except Exception:
+                pass
+
+class SMTPConnectionPool:
+    """Keeps a small number of authenticated SMTP sessions warm and reuses them across sends"""
+    def __init__(self, mail_state, size=MAIL_POOL_SIZE, max_idle=MAIL_POOL_MAX_IDLE,
+                 keepalive=MAIL_POOL_KEEPALIVE, max_messages=MAIL_POOL_MAX_MESSAGES, timeout=MAIL_TIMEOUT):
+        self.mail_state = mail_state
+        self.size = size
+        self.max_idle = max_idle
+        self.keepalive = keepalive
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self._idle = []  # LIFO so the most recently used session is reused first
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connects = 0
+        self.reconnects = 0
+
+    def _connect(self):
+        """Open and authenticate a new SMTP session"""
+        state = self.mail_state
+        if state.use_ssl:
+            host = smtplib.SMTP_SSL(state.server, state.port, timeout=self.timeout)
+        else:
+            host = smtplib.SMTP(state.server, state.port, timeout=self.timeout)
+        host.set_debuglevel(int(state.debug))
+        if state.use_tls:
+            host.starttls()
+        if state.username and state.password:
+            host.login(state.username, state.password)
+        with self._lock:
+            self.connects += 1
+        logger.info(f"Opened SMTP session to {state.server}:{state.port}")
+        return PooledSMTPConnection(host)
+
+    def _is_usable(self, connection):
+        """Drop sessions that idled too long and probe ones that idled a while"""
+        idle_for = time.monotonic() - connection.last_used
+        if idle_for > self.max_idle or connection.sent >= self.max_messages:
+            connection.close()
+            return False
+        if idle_for > self.keepalive:
+            try:
+                return connection.host.noop()[0] == 250
+            except Exception:
+                connection.close()
+                return False
+        return True
+
+    def acquire(self):
+        """Check out a live session, opening one if none is idle"""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return self._connect()
+                if self._is_usable(connection):
+                    return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, broken=False):
+        """Return a session to the pool, or close it if it failed"""
+        try:
+            if broken:
+                connection.close()
+            else:
+                connection.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    def send_messages(self, messages):
+        """Send several Flask-Mail messages over one session, reconnecting once on a dropped session"""
+        connection = self.acquire()
+        try:
+            for message in messages:
+                try:
+                    self._sendmail(connection, message)
+                except RECONNECT_ERRORS as e:
+                    logger.warning(f"SMTP session lost, reconnecting: {str(e)}")
+                    connection.close()
+                    with self._lock:
+                        self.reconnects += 1
+                    connection = self._connect()
+                    self._sendmail(connection, message)
+        except Exception as e:
+            # Other failures go to the caller (the outbox retries) without a resend here
+            self.release(connection, broken=not isinstance(e, REJECTION_ERRORS))
+            raise
+        self.release(connection)
+
+    def _sendmail(self, connection, message):
+        connection.host.sendmail(
+            sanitize_address(message.sender),
+            list(sanitize_addresses(message.send_to)),
+            message.as_bytes(),
+            message.mail_options,
+            message.rcpt_options,
+        )
+        connection.sent += 1
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {'size': self.size, 'idle': idle, 'connects': self.connects, 'reconnects': self.reconnects}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(app=None):
+    """Return the connection pool for the given (or current) app"""
+    app = app or current_app._get_current_object()
+    with _pools_lock:
+        pool = _pools.get(app)
+        if pool is None:
+            pool = SMTPConnectionPool(app.extensions['mail'])
+            _pools[app] = pool
+        return pool
+
+def send_messages(*messages):
+    """Send one or more Flask-Mail messages through the pooled transport"""
+    for message in messages:
+        assert message.send_to, "No recipients have been added"
+        assert message.sender, "The message does not specify a sender"
+        if message.has_bad_headers():
+            raise BadHeaderError
+        if message.date is None:
+            message.date = time.time()
+
+    app = current_app._get_current_object()
+    if not app.extensions['mail'].suppress:
+        started = time.perf_counter()
+        try:
+            get_pool(app).send_messages(messages)
+        except Exception:
+            email_send_duration.observe(time.perf_counter() - started, 'error')
+            raise
+        email_send_duration.observe(time.perf_counter() - started, 'sent')
+
+    for message in messages:
+        email_dispatched.send(app, message=message)
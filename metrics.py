@@ -0,0 +1,291 @@
+from bisect import bisect_left
+import hmac
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from flask import request, g, Response, abort
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Scrapers send "Authorization: Bearer <token>". Behind a reverse proxy every request comes from the proxy's
+# address, so scraping without a token needs METRICS_ALLOW_UNAUTHENTICATED and is then limited to these addresses
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_ALLOW_UNAUTHENTICATED = os.getenv('METRICS_ALLOW_UNAUTHENTICATED', 'False').lower() == 'true'
+METRICS_ALLOWED_IPS = {ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()}
+METRICS_MAX_SHARDS = 64  # live per-thread shards per metric before dead threads are folded in eagerly
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # seconds
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_metrics = []
+_collectors = []
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class ShardedMetric:
+    """Each thread updates its own dict, so recording never takes a lock
+
+    Scrapes add the shards up. Shards of finished threads are folded into one retired
+    shard so a server that spawns a thread per request does not grow without bound.
+    """
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # (thread weakref, shard)
+        self._retired = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+                if len(self._shards) > METRICS_MAX_SHARDS:
+                    self._fold_dead()
+        return shard
+
+    def _fold_dead(self):
+        live = []
+        for thread_ref, shard in self._shards:
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                for key, value in shard.items():
+                    self._merge(self._retired, key, value)
+            else:
+                live.append((thread_ref, shard))
+        self._shards = live
+
+    def totals(self):
+        """Values summed over every thread, keyed by label values"""
+        with self._lock:
+            self._fold_dead()
+            shards = [shard for _, shard in self._shards]
+            totals = {}
+            for key, value in self._retired.items():
+                self._merge(totals, key, value)
+        for shard in shards:
+            # dict() copies under the GIL, so a concurrent insert cannot break the iteration
+            for key, value in dict(shard).items():
+                self._merge(totals, key, value)
+        return totals
+
+class Counter(ShardedMetric):
+    metric_type = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    @staticmethod
+    def _merge(target, key, value):
+        target[key] = target.get(key, 0) + value
+
+    def render(self):
+        return [f'{self.name}{format_labels(self.labelnames, key)} {format_value(value)}'
+                for key, value in sorted(self.totals().items())]
+
+class Histogram(ShardedMetric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, *labelvalues):
+        shard = self._shard()
+        counts = shard.get(labelvalues)
+        if counts is None:
+            # One slot per bucket plus the running sum
+            counts = shard[labelvalues] = [0] * len(self.buckets) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @staticmethod
+    def _merge(target, key, value):
+        existing = target.get(key)
+        target[key] = list(value) if existing is None else [a + b for a, b in zip(existing, value)]
+
+    def render(self):
+        lines = []
+        for key, counts in sorted(self.totals().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{format_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labelnames, key)} {format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+class Timer:
+    """Context manager observing the elapsed seconds into a histogram"""
+    def __init__(self, histogram, *labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+
+def register_collector(collector):
+    """collector() returns [(name, type, help, [(labels dict, value)])], read at scrape time"""
+    _collectors.append(collector)
+    return collector
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Time to build the response, or to send the whole body when streamed, per Flask route', ('method', 'route', 'status')
+)
+chatbot_response_duration = Histogram(
+    'chatbot_response_duration_seconds', 'Chatbot reply time by path (booking, canned, cache, openai, openai_fallback, openai_stream)', ('path',)
+)
+openai_tokens = Counter('openai_tokens_total', 'OpenAI tokens reported by the API (prompt_estimated for streams)', ('kind',))
+email_send_duration = Histogram('email_send_duration_seconds', 'SMTP delivery time per batch of messages', ('outcome',))
+email_retries = Counter('email_send_retries_total', 'Outbox email attempts that failed and were rescheduled', ('kind',))
+email_failures = Counter('email_send_failures_total', 'Outbox emails given up after EMAIL_OUTBOX_MAX_ATTEMPTS attempts', ('kind',))
+rate_limit_rejections = Counter('rate_limit_rejections_total', 'Requests rejected by the rate limiter', ('scope',))
+scheduler_job_runs = Counter('scheduler_job_runs_total', 'Scheduled job runs by job and outcome', ('job', 'outcome'))
+
+def stats_collector(subsystem, stats):
+    """Expose every numeric value of a stats() dict as a gauge named <subsystem>_<key>"""
+    def collect():
+        families = []
+        for key, value in flatten(stats()).items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                families.append((f'{subsystem}_{key}', 'gauge', f'{subsystem} {key}', [({}, value)]))
+        return families
+    return register_collector(collect)
+
+def flatten(stats, prefix=''):
+    flat = {}
+    for key, value in stats.items():
+        name = f'{prefix}{key}'.replace('.', '_').replace('-', '_')
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}_'))
+        else:
+            flat[name] = value
+    return flat
+
+def render_metrics():
+    """Every metric and collector in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.metric_type}')
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            logger.error(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {str(e)}")
+            continue
+        for name, metric_type, documentation, samples in families:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                lines.append(f'{name}{format_labels(labels.keys(), labels.values())} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+def _observe_request(status, streamed=None):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    labels = (request.method, request.url_rule.rule if request.url_rule else 'unmatched', str(status))
+    if streamed is None:
+        http_request_duration.observe(time.perf_counter() - started, *labels)
+    else:
+        # The body is generated after the view returns; the WSGI server closes it once sent or abandoned
+        streamed.call_on_close(lambda: http_request_duration.observe(time.perf_counter() - started, *labels))
+
+def _record_response(response):
+    _observe_request(response.status_code, response if response.is_streamed else None)
+    return response
+
+def _record_exception(exception):
+    # Only reached with the timer still set when the view raised before a response existed
+    if exception is not None:
+        _observe_request(500)
+
+def metrics_endpoint():
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {METRICS_TOKEN}'):
+            abort(401)
+    elif not METRICS_ALLOW_UNAUTHENTICATED or request.remote_addr not in METRICS_ALLOWED_IPS:
+        abort(403)
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+def init_app(app):
+    """Time every request, expose subsystem stats and serve /metrics"""
+    from availability import availability_cache
+    from appointment_stats import appointment_stats_cache
+    from chatbot import stream_stats
+    from compression import compression_stats
+    from conversation_store import conversation_store
+    from intent_classifier import intent_stats
+    from llm_client import llm_client
+    from prompt_builder import prompt_stats
+    from response_cache import response_cache
+
+    app.before_request(_start_timer)
+    app.after_request(_record_response)
+    app.teardown_request(_record_exception)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+
+    for subsystem, stats in (
+        ('availability_cache', availability_cache.stats),
+        ('appointment_stats_cache', appointment_stats_cache.stats),
+        ('chatbot_stream', stream_stats.snapshot),
+        ('compression', compression_stats.snapshot),
+        ('conversations', conversation_store.stats),
+        ('intents', intent_stats.snapshot),
+        ('llm', llm_client.stats),
+        ('prompts', prompt_stats.snapshot),
+        ('response_cache', response_cache.stats),
+    ):
+        stats_collector(subsystem, stats)
+    if METRICS_TOKEN:
+        return
+    if METRICS_ALLOW_UNAUTHENTICATED:
+        logger.warning(f"METRICS_TOKEN not set; /metrics answers {', '.join(sorted(METRICS_ALLOWED_IPS))} without authentication")
+    else:
+        logger.warning("METRICS_TOKEN not set; /metrics is disabled (set METRICS_ALLOW_UNAUTHENTICATED=true to allow local scrapes)")
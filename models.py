@@ -1,12 +1,40 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect
 import os
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
-class Appointment(db.Model):
+# Appointments in any status other than this one occupy their (date, time) slot
+CANCELLED_STATUS = 'Cancelada'
+ACTIVE_SLOT_CONDITION = db.text(f"(status IS NULL OR status != '{CANCELLED_STATUS}') AND deleted_at IS NULL")
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input matches literally; use with escape='\\'"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+class ChangeTracked:
+    """updated_at on every write and soft-delete tombstones, for conditional GETs and delta sync"""
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+    def mark_deleted(self):
+        """Keep the row as a tombstone so clients syncing changes learn about the delete"""
+        now = datetime.utcnow()
+        self.deleted_at = now
+        self.updated_at = now
+
+class Appointment(ChangeTracked, db.Model):
     __tablename__ = 'appointment'
+    __table_args__ = (
+        db.Index('ix_appointment_date_time', 'date', 'time'),
+        db.Index('ix_appointment_status_date', 'status', 'date'),
+        # Only one active appointment per slot; cancelled and deleted ones free the slot again
+        db.Index('uq_appointment_active_slot', 'date', 'time', unique=True,
+                 sqlite_where=ACTIVE_SLOT_CONDITION,
+                 postgresql_where=ACTIVE_SLOT_CONDITION),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -16,9 +44,9 @@ class Appointment(db.Model):
     time = db.Column(db.String(10), nullable=False)
     service = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(20), default='Pendiente')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
-class ContactSubmission(db.Model):
+class ContactSubmission(ChangeTracked, db.Model):
     __tablename__ = 'contact_submission'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -27,3 +55,36 @@ class ContactSubmission(db.Model):
     telefono = db.Column(db.String(20), nullable=False)
     dudas = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON encoded handler arguments
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def ensure_schema(engine):
+    """Bring tables created by older versions up to date: change-tracking columns and indexes"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in (Appointment.__table__, ContactSubmission.__table__):
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for name in ('updated_at', 'deleted_at'):
+                if name not in existing:
+                    column_type = table.c[name].type.compile(dialect=engine.dialect)
+                    connection.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {name} {column_type}'))
+            connection.execute(db.text(f'UPDATE {table.name} SET updated_at = created_at WHERE updated_at IS NULL'))
+
+    for table in (Appointment.__table__, ContactSubmission.__table__, EmailOutbox.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,243 @@
+from collections import deque
+from datetime import datetime
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'False').lower() == 'true'
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', 0.01))  # fraction of requests run under cProfile
+PROFILER_SLOW_THRESHOLD = float(os.getenv('PROFILER_SLOW_THRESHOLD', 1.0))  # seconds; slower requests are always kept
+PROFILER_MAX_PROFILES = int(os.getenv('PROFILER_MAX_PROFILES', 20))
+# Comma separated path prefixes to consider; empty means every request
+PROFILER_PATHS = tuple(path.strip() for path in os.getenv('PROFILER_PATHS', '').split(',') if path.strip())
+PROFILER_SKIP_PATHS = ('/static/', '/assets/', '/metrics', '/api/profiles')
+PROFILER_TOP_FUNCTIONS = 30
+PROFILER_TOP_QUERIES = 10
+MAX_STATEMENT_LENGTH = 500
+
+# Where cProfile time is attributed, by fragment of the source path or, for C builtins, the function name; first match wins
+CATEGORIES = (
+    ('sql', ('sqlalchemy', 'sqlite3', 'psycopg')),
+    ('templates', ('jinja2',)),
+    ('json', ('orjson', '/json/', 'json_provider')),
+    ('upstream', ('openai', 'requests', 'urllib3', 'http/client', 'ssl.py', 'socket.py', 'smtplib')),
+    ('waiting', ('threading.py', 'concurrent/futures', 'queue.py')),
+    ('flask', ('flask', 'werkzeug')),
+)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_state = threading.local()
+# Only one cProfile at a time: newer interpreters allow a single active profiler per process
+_profiler_slot = threading.Lock()
+_ids = itertools.count(1)
+
+class ProfileStore:
+    """Ring buffer of the most recent captured requests, listed slowest first"""
+    def __init__(self, max_profiles=PROFILER_MAX_PROFILES):
+        self._entries = deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+        self.captured = 0
+        self.sampled = 0
+        self.skipped_busy = 0
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            self.captured += 1
+
+    def list(self):
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda entry: entry['duration_ms'], reverse=True)
+
+    def get(self, profile_id):
+        with self._lock:
+            for entry in self._entries:
+                if entry['id'] == profile_id:
+                    return entry
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': PROFILER_ENABLED,
+                'sample_rate': PROFILER_SAMPLE_RATE,
+                'slow_threshold': PROFILER_SLOW_THRESHOLD,
+                'stored': len(self._entries),
+                'max_profiles': self._entries.maxlen,
+                'captured': self.captured,
+                'sampled': self.sampled,
+                'skipped_busy': self.skipped_busy
+            }
+
+profile_store = ProfileStore()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_state, 'queries', None) is not None:
+        conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = getattr(_state, 'queries', None)
+    started = conn.info.get('profiler_started')
+    if queries is not None and started:
+        queries.append((statement, time.perf_counter() - started.pop()))
+
+def should_track(path):
+    if path.startswith(PROFILER_SKIP_PATHS):
+        return False
+    return not PROFILER_PATHS or path.startswith(PROFILER_PATHS)
+
+def _start_request():
+    if not should_track(request.path):
+        return
+    _state.queries = []
+    _state.started = time.perf_counter()
+    _state.profile = None
+    if random.random() < PROFILER_SAMPLE_RATE:
+        if _profiler_slot.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                _state.profile = profile
+                profile_store.sampled += 1
+            except ValueError:
+                # Another profiling tool is active in this process
+                _profiler_slot.release()
+        else:
+            profile_store.skipped_busy += 1
+
+def _finish_request(status, streamed=False):
+    started = getattr(_state, 'started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    queries, profile = _state.queries, _state.profile
+    _state.started = _state.queries = _state.profile = None
+    if profile is not None:
+        profile.disable()
+        _profiler_slot.release()
+
+    if profile is None and duration < PROFILER_SLOW_THRESHOLD:
+        return
+    try:
+        profile_store.add(build_entry(duration, status, streamed, queries, profile))
+    except Exception as e:
+        logger.error(f"Could not store request profile: {str(e)}")
+
+def _after_request(response):
+    _finish_request(response.status_code, response.is_streamed)
+    return response
+
+def _teardown_request(exception):
+    if exception is not None:
+        _finish_request(500)
+
+def summarize_queries(queries):
+    """Totals and the slowest statements; identical statements are grouped"""
+    grouped = {}
+    for statement, seconds in queries:
+        count, total = grouped.get(statement, (0, 0.0))
+        grouped[statement] = (count + 1, total + seconds)
+    slowest = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:PROFILER_TOP_QUERIES]
+    return {
+        'count': len(queries),
+        'total_ms': round(sum(seconds for _, seconds in queries) * 1000, 2),
+        'slowest': [{
+            'statement': statement[:MAX_STATEMENT_LENGTH],
+            'count': count,
+            'total_ms': round(total * 1000, 2)
+        } for statement, (count, total) in slowest]
+    }
+
+def categorize(filename, function):
+    location = function if filename == '~' else filename
+    for category, fragments in CATEGORIES:
+        if any(fragment in location for fragment in fragments):
+            return category
+    if filename.startswith(APP_DIR) and 'site-packages' not in filename:
+        return 'app'
+    return 'other'
+
+def time_by_category(stats):
+    """Own time (tottime) of every profiled function summed per category, in ms"""
+    totals = {}
+    for (filename, _, function), (_, _, tottime, _, _) in stats.stats.items():
+        category = categorize(filename, function)
+        totals[category] = totals.get(category, 0.0) + tottime
+    return {category: round(seconds * 1000, 2) for category, seconds in sorted(totals.items(), key=lambda item: -item[1])}
+
+def build_entry(duration, status, streamed, queries, profile):
+    entry = {
+        'id': next(_ids),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'route': request.url_rule.rule if request.url_rule else None,
+        'status': status,
+        'duration_ms': round(duration * 1000, 2),
+        'captured_at': datetime.utcnow().isoformat(),
+        # Streamed bodies are produced after the response leaves the view and are not covered
+        'streamed': streamed,
+        'trigger': 'sample' if profile is not None else 'slow',
+        'sql': summarize_queries(queries)
+    }
+    if profile is not None:
+        stats = pstats.Stats(profile)
+        entry['time_by_category_ms'] = time_by_category(stats)
+        entry['_stats'] = stats
+    return entry
+
+def public_entry(entry, detail=False):
+    """Entry without the raw stats; detail adds the top functions by cumulative time"""
+    result = {key: value for key, value in entry.items() if not key.startswith('_')}
+    result['has_profile'] = '_stats' in entry
+    if not detail:
+        result.pop('sql', None)
+        result['sql_ms'] = entry['sql']['total_ms']
+        result['sql_queries'] = entry['sql']['count']
+    elif '_stats' in entry:
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.add(entry['_stats'])
+        stats.sort_stats('cumulative').print_stats(PROFILER_TOP_FUNCTIONS)
+        result['top_functions'] = stream.getvalue()
+    return result
+
+def profile_file(entry):
+    """Profile in the format written by pstats.Stats.dump_stats, for snakeviz or pstats"""
+    return marshal.dumps(entry['_stats'].stats)
+
+def init_app(app):
+    """Install the sampling hooks when PROFILER_ENABLED is set"""
+    if not PROFILER_ENABLED:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    logger.info(f"Request profiler enabled: sampling {PROFILER_SAMPLE_RATE:.1%}, keeping requests over {PROFILER_SLOW_THRESHOLD}s")
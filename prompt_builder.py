@@ -0,0 +1,209 @@
+from collections import OrderedDict
+import logging
+import os
+import re
+import threading
+from dotenv import load_dotenv
+
+try:
+    import tiktoken
+except ImportError:  # Optional, falls back to a character-based estimate
+    tiktoken = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 3000))
+PROMPT_SUMMARY_TOKENS = int(os.getenv('PROMPT_SUMMARY_TOKENS', 300))
+PROMPT_SUMMARY_CACHE_SIZE = int(os.getenv('PROMPT_SUMMARY_CACHE_SIZE', 1000))
+PROMPT_TOKENIZER = os.getenv('PROMPT_TOKENIZER', 'cl100k_base')
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators added by the chat format
+SUMMARY_LINE_CHARS = 160
+
+_encoding = None
+if tiktoken is not None:
+    try:
+        _encoding = tiktoken.get_encoding(PROMPT_TOKENIZER)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding '{PROMPT_TOKENIZER}' unavailable, estimating tokens: {str(e)}")
+
+def count_tokens(text):
+    """Count tokens with tiktoken when installed, otherwise estimate ~4 characters per token"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def message_tokens(message):
+    return count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+def _clean(text):
+    """Strip the hidden booking state and HTML from a stored chat message"""
+    text = text.split('__STATE__')[0]
+    text = re.sub(r'<[^>]+>', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+SUMMARY_HEADER = "Resumen de la conversación anterior:"
+
+def summary_lines(turns):
+    """One (line, tokens) pair per turn: the opening of each message"""
+    lines = []
+    for turn in turns:
+        text = _clean(turn['text'])
+        if not text:
+            continue
+        speaker = 'Usuario' if turn.get('is_user', True) else 'Asistente'
+        line = f"{speaker}: {text[:SUMMARY_LINE_CHARS]}"
+        lines.append((line, count_tokens(line) + 1))
+    return lines
+
+def trim_summary(lines, max_tokens=PROMPT_SUMMARY_TOKENS):
+    """Drop the oldest lines until the summary fits max_tokens"""
+    used = count_tokens(SUMMARY_HEADER) + sum(tokens for _, tokens in lines)
+    start = 0
+    while start < len(lines) and used > max_tokens:
+        used -= lines[start][1]
+        start += 1
+    return lines[start:]
+
+def render_summary(lines):
+    return "\n".join([SUMMARY_HEADER] + [line for line, _ in lines])
+
+def summarize_turns(turns, max_tokens=PROMPT_SUMMARY_TOKENS):
+    """Extractive summary of older turns: the opening of each message, newest kept first when trimming"""
+    return render_summary(trim_summary(summary_lines(turns), max_tokens))
+
+class PromptStats:
+    """Prompt size counters for the OpenAI path"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.last_tokens = 0
+        self.summarized_requests = 0
+        self.summary_cache_hits = 0
+        self.summary_rebuilds = 0
+
+    def record(self, tokens, summarized):
+        with self._lock:
+            self.requests += 1
+            self.total_tokens += tokens
+            self.max_tokens = max(self.max_tokens, tokens)
+            self.last_tokens = tokens
+            if summarized:
+                self.summarized_requests += 1
+
+    def record_summary(self, extended):
+        with self._lock:
+            if extended:
+                self.summary_cache_hits += 1
+            else:
+                self.summary_rebuilds += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'prompt_tokens_total': self.total_tokens,
+                'prompt_tokens_avg': round(self.total_tokens / self.requests, 1) if self.requests else 0,
+                'prompt_tokens_max': self.max_tokens,
+                'prompt_tokens_last': self.last_tokens,
+                'summarized_requests': self.summarized_requests,
+                'summary_cache_hits': self.summary_cache_hits,
+                'summary_rebuilds': self.summary_rebuilds,
+                'budget': PROMPT_TOKEN_BUDGET
+            }
+
+prompt_stats = PromptStats()
+
+# Rolling summaries per conversation: summary_key -> (absolute index of the first unsummarized turn, lines)
+_summary_cache = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+def rolling_summary(summary_key, history, dropped, history_offset=0):
+    """Summary of history[:dropped], extending the conversation's previous summary
+
+    history_offset is the absolute position of history[0] in the conversation, so the
+    cache entry stays valid when old messages fall out of a bounded history. Only the
+    turns dropped since the previous request are summarized; if fewer turns are dropped
+    than last time, the summary is rebuilt.
+    """
+    end = history_offset + dropped
+    with _summary_cache_lock:
+        entry = _summary_cache.get(summary_key)
+        if entry is not None:
+            _summary_cache.move_to_end(summary_key)
+
+    if entry is not None and entry[0] <= end:
+        summarized_until, lines = entry
+        new_turns = history[max(summarized_until - history_offset, 0):dropped]
+        lines = trim_summary(lines + summary_lines(new_turns))
+        prompt_stats.record_summary(extended=True)
+    else:
+        lines = trim_summary(summary_lines(history[:dropped]))
+        prompt_stats.record_summary(extended=False)
+
+    with _summary_cache_lock:
+        _summary_cache[summary_key] = (end, lines)
+        _summary_cache.move_to_end(summary_key)
+        while len(_summary_cache) > PROMPT_SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+    return render_summary(lines)
+
+def build_prompt(system_prompt, history, user_message, budget=PROMPT_TOKEN_BUDGET, summary_key=None, history_offset=0):
+    """Build chat messages within a token budget
+
+    Keeps the system prompt, the new user message and as many of the most recent
+    turns as fit; older turns are compacted into a summary message. With a
+    summary_key (the conversation id) the summary is extended turn by turn across
+    requests instead of being rebuilt. Returns (messages, prompt_tokens).
+    """
+    system = {"role": "system", "content": system_prompt}
+    current = {"role": "user", "content": user_message}
+    used = message_tokens(system) + message_tokens(current)
+
+    turns = []
+    for msg in history:
+        content = msg['text']
+        if not msg.get('is_user', True) and '__STATE__' in content:
+            content = content.split('__STATE__')[0]
+        turns.append({"role": "user" if msg.get('is_user', True) else "assistant", "content": content})
+
+    # Walk back from the newest turn, reserving room for a summary if anything is dropped
+    available = budget - used
+    kept = []
+    for index in range(len(turns) - 1, -1, -1):
+        turn_tokens = message_tokens(turns[index])
+        reserve = PROMPT_SUMMARY_TOKENS + MESSAGE_OVERHEAD_TOKENS if index > 0 else 0
+        if turn_tokens + reserve > available:
+            break
+        kept.append(turns[index])
+        available -= turn_tokens
+    kept.reverse()
+
+    messages = [system]
+    dropped = len(turns) - len(kept)
+    if dropped:
+        if summary_key is not None:
+            content = rolling_summary(summary_key, history, dropped, history_offset)
+        else:
+            content = summarize_turns(history[:dropped])
+        summary = {"role": "system", "content": content}
+        messages.append(summary)
+        used += message_tokens(summary)
+    messages.extend(kept)
+    messages.append(current)
+
+    used += sum(message_tokens(turn) for turn in kept)
+    prompt_stats.record(used, bool(dropped))
+    if dropped:
+        logger.info(f"Prompt compacted: {dropped} older turns summarized, {len(kept)} kept, ~{used} tokens")
+    return messages, used
@@ -0,0 +1,193 @@
+from collections import OrderedDict
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# memory: per process; sqlite: counts shared by every process on the host through one file
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB', os.path.join(tempfile.gettempdir(), 'kit_consulting_ratelimit.db'))
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 10000))  # clients tracked at once
+RATE_LIMIT_CLEANUP_EVERY = 1000  # sqlite backend: hits between idle-key sweeps
+
+def sliding_window(now, window, entry):
+    """Roll a (window_index, current, previous) counter forward to now"""
+    index = int(now // window)
+    if entry is None or entry[0] < index - 1:
+        return index, 0, 0
+    if entry[0] == index - 1:
+        return index, 0, entry[1]
+    return entry
+
+def evaluate(now, limit, window, index, current, previous):
+    """Decide one hit with the sliding-window estimate; returns (allowed, retry_after)"""
+    elapsed = now - index * window
+    estimate = previous * (1 - elapsed / window) + current
+    if estimate + 1 <= limit:
+        return True, 0
+    # Wait until the previous window's weight has decayed enough for one more request
+    if previous and current + 1 <= limit:
+        wait = window * (1 - (limit - current - 1) / previous) - elapsed
+    else:
+        wait = window - elapsed
+    return False, max(1, math.ceil(wait))
+
+class MemoryBackend:
+    """Per-process counters in an LRU of at most max_keys clients; idle clients age out"""
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> (window_index, current, previous, window), oldest first
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def hit(self, key, limit, window, now):
+        with self._lock:
+            stored = self._entries.get(key)
+            index, current, previous = sliding_window(now, window, stored[:3] if stored else None)
+            allowed, retry_after = evaluate(now, limit, window, index, current, previous)
+            if allowed:
+                current += 1
+            self._entries[key] = (index, current, previous, window)
+            self._entries.move_to_end(key)
+            self._evict(now)
+            return allowed, retry_after
+
+    def _evict(self, now):
+        # Keys idle for two windows carry no weight any more
+        while self._entries:
+            index, _, _, window = next(iter(self._entries.values()))
+            if len(self._entries) <= self.max_keys and int(now // window) - index < 2:
+                break
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+class SQLiteBackend:
+    """Counters in a shared SQLite file so every worker process sees the same counts"""
+    def __init__(self, path=RATE_LIMIT_DB, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._hits = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits ('
+            'key TEXT PRIMARY KEY, window_index INTEGER, current INTEGER, previous INTEGER, '
+            'window REAL, updated_at REAL)'
+        )
+        self._connection().execute('CREATE INDEX IF NOT EXISTS ix_rate_limits_updated_at ON rate_limits (updated_at)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def hit(self, key, limit, window, now):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT window_index, current, previous FROM rate_limits WHERE key = ?', (key,)
+            ).fetchone()
+            index, current, previous = sliding_window(now, window, row)
+            allowed, retry_after = evaluate(now, limit, window, index, current, previous)
+            if allowed:
+                current += 1
+            connection.execute(
+                'INSERT OR REPLACE INTO rate_limits (key, window_index, current, previous, window, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, index, current, previous, window, now)
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+        with self._lock:
+            self._hits += 1
+            sweep = self._hits % RATE_LIMIT_CLEANUP_EVERY == 0
+        if sweep:
+            self._evict(now)
+        return allowed, retry_after
+
+    def _evict(self, now):
+        connection = self._connection()
+        removed = connection.execute(
+            'DELETE FROM rate_limits WHERE updated_at < ? - 2 * window', (now,)
+        ).rowcount
+        removed += connection.execute(
+            'DELETE FROM rate_limits WHERE key IN ('
+            'SELECT key FROM rate_limits ORDER BY updated_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_keys,)
+        ).rowcount
+        self.evictions += removed
+
+    def size(self):
+        return self._connection().execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0]
+
+class RateLimiter:
+    """Sliding-window-counter limiter: O(1) time and two integers per client"""
+    def __init__(self, backend):
+        self.backend = backend
+        self.allowed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """Count one request for key; returns (allowed, retry_after_seconds)"""
+        try:
+            allowed, retry_after = self.backend.hit(key, limit, window, time.time())
+        except Exception as e:
+            # A broken shared store must not take the public endpoints down
+            logger.error(f"Rate limiter backend error, allowing request: {str(e)}")
+            return True, 0
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+        return allowed, retry_after
+
+    def stats(self):
+        with self._lock:
+            counts = {'allowed': self.allowed, 'rejected': self.rejected}
+        return {
+            'backend': type(self.backend).__name__,
+            'keys': self.backend.size(),
+            'max_keys': self.backend.max_keys,
+            'evictions': self.backend.evictions,
+            **counts
+        }
+
+def create_rate_limiter(backend=RATE_LIMIT_BACKEND):
+    """Build the limiter for the configured backend"""
+    if backend == 'sqlite':
+        try:
+            return RateLimiter(SQLiteBackend())
+        except Exception as e:
+            logger.error(f"Failed to open rate limit database {RATE_LIMIT_DB}, using per-process limits: {str(e)}")
+    elif backend != 'memory':
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND '{backend}', using per-process limits")
+    return RateLimiter(MemoryBackend())
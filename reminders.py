@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta
+import logging
+import os
+import re
+import threading
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.date import DateTrigger
+from dotenv import load_dotenv
+from models import db, Appointment, CANCELLED_STATUS
+from email_utils import scheduler
+from email_outbox import enqueue_email
+from scheduler_leader import create_leader_lock, LeaderElector
+from metrics import scheduler_job_runs
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+REMINDER_LEAD_TIME = timedelta(days=1)
+# Reminders missed while the app was down are still sent if it comes back within this window
+REMINDER_MISFIRE_GRACE = int(os.getenv('REMINDER_MISFIRE_GRACE', 6 * 3600))  # seconds
+
+# Wakes the leader so it picks up jobs other processes wrote to the shared job store
+SCHEDULER_HEARTBEAT = int(os.getenv('SCHEDULER_HEARTBEAT', 60))  # seconds
+# A failed startup reconciliation (e.g. tables not created yet) is retried after this delay
+RECONCILE_RETRY_INTERVAL = int(os.getenv('RECONCILE_RETRY_INTERVAL', 60))  # seconds
+
+# App used by reminder jobs, which run outside any request
+_app = None
+_elector = None
+_start_lock = threading.Lock()
+
+def reminder_job_id(appointment_id):
+    return f'reminder_{appointment_id}'
+
+def get_reminder_time(appointment_date, appointment_time):
+    """Return when the reminder for an appointment slot is due"""
+    return datetime.combine(appointment_date, datetime.strptime(appointment_time, '%H:%M').time()) - REMINDER_LEAD_TIME
+
+def schedule_reminder_email(appointment):
+    """Schedule a reminder email for 24 hours before the appointment with improved logging"""
+    try:
+        reminder_time = get_reminder_time(appointment.date, appointment.time)
+
+        if appointment.status == CANCELLED_STATUS:
+            cancel_reminder_email(appointment.id)
+        elif reminder_time > datetime.now():
+            # Only the id goes into the persistent job store, never the ORM object
+            scheduler.add_job(
+                send_reminder,
+                trigger=DateTrigger(run_date=reminder_time),
+                args=[appointment.id],
+                id=reminder_job_id(appointment.id),
+                replace_existing=True,
+                misfire_grace_time=REMINDER_MISFIRE_GRACE
+            )
+            logger.info(f"Scheduled reminder email for appointment {appointment.id} at {reminder_time}")
+        else:
+            logger.warning(f"Skipped scheduling reminder for past appointment {appointment.id}")
+
+    except Exception as e:
+        logger.error(f"Error scheduling reminder email for appointment {appointment.id}: {str(e)}")
+        raise
+
+def cancel_reminder_email(appointment_id):
+    """Remove a pending reminder job, if any"""
+    try:
+        scheduler.remove_job(reminder_job_id(appointment_id))
+        logger.info(f"Cancelled reminder email for appointment {appointment_id}")
+    except JobLookupError:
+        pass
+
+def send_reminder(appointment_id):
+    """Reminder job: re-check the appointment and queue the reminder email"""
+    with _app.app_context():
+        appointment = db.session.get(Appointment, appointment_id)
+        if not appointment or appointment.deleted_at or appointment.status == CANCELLED_STATUS:
+            logger.info(f"Skipping reminder for removed or cancelled appointment {appointment_id}")
+            return
+        if get_reminder_time(appointment.date, appointment.time) + REMINDER_LEAD_TIME < datetime.now():
+            logger.info(f"Skipping reminder for past appointment {appointment_id}")
+            return
+        enqueue_email('appointment_reminder', {'appointment_id': appointment_id})
+        db.session.commit()
+
+def reconcile_reminders():
+    """Make the job store match upcoming appointments using one indexed range query"""
+    now = datetime.now()
+    upcoming = Appointment.query.with_entities(Appointment.id, Appointment.date, Appointment.time).filter(
+        Appointment.date >= now.date(),
+        (Appointment.status == None) | (Appointment.status != CANCELLED_STATUS),
+        Appointment.deleted_at.is_(None)
+    ).all()
+
+    existing_ids = {job.id for job in scheduler.get_jobs() if job.id.startswith('reminder_')}
+    expected_ids = set()
+    added = 0
+    for appointment_id, appointment_date, appointment_time in upcoming:
+        job_id = reminder_job_id(appointment_id)
+        expected_ids.add(job_id)
+        if job_id in existing_ids:
+            continue
+        try:
+            reminder_time = get_reminder_time(appointment_date, appointment_time)
+        except ValueError:
+            logger.warning(f"Appointment {appointment_id} has an invalid time '{appointment_time}'")
+            continue
+        if reminder_time > now:
+            scheduler.add_job(
+                send_reminder,
+                trigger=DateTrigger(run_date=reminder_time),
+                args=[appointment_id],
+                id=job_id,
+                replace_existing=True,
+                misfire_grace_time=REMINDER_MISFIRE_GRACE
+            )
+            added += 1
+
+    removed = 0
+    for job_id in existing_ids - expected_ids:
+        try:
+            scheduler.remove_job(job_id)
+            removed += 1
+        except JobLookupError:
+            pass
+
+    logger.info(f"Reconciled reminders: {len(upcoming)} upcoming appointments, {added} jobs added, {removed} stale jobs removed")
+    return added, removed
+
+def scheduler_heartbeat():
+    """No-op interval job that bounds how long the leader sleeps between job store scans"""
+
+def _record_job_event(event):
+    """Count job runs per job kind; reminder ids carry the appointment id, which is dropped"""
+    job = re.sub(r'_\d+$', '', event.job_id)
+    if event.code == EVENT_JOB_MISSED:
+        outcome = 'missed'
+    elif event.exception is not None:
+        outcome = 'error'
+    else:
+        outcome = 'executed'
+    scheduler_job_runs.inc(job, outcome)
+
+def scheduler_stats():
+    """Leadership and job counts; persistent jobs are counted in SQL rather than unpickled"""
+    reminders = db.session.execute(db.text(
+        "SELECT COUNT(*) FROM apscheduler_jobs WHERE id LIKE 'reminder%'"
+    )).scalar()
+    return {
+        'leader': is_scheduler_leader(),
+        'running': scheduler.running,
+        'reminder_jobs': reminders,
+        'local_jobs': len(scheduler.get_jobs(jobstore='local')) if scheduler.running else 0
+    }
+
+def _reconcile_or_retry():
+    """Reconcile reminders; on failure try again later instead of leaving the job store stale"""
+    with _app.app_context():
+        try:
+            reconcile_reminders()
+            return
+        except Exception as e:
+            logger.error(f"Error reconciling reminders, retrying in {RECONCILE_RETRY_INTERVAL}s: {str(e)}")
+    scheduler.add_job(
+        _reconcile_or_retry,
+        trigger=DateTrigger(run_date=datetime.now() + timedelta(seconds=RECONCILE_RETRY_INTERVAL)),
+        id='reconcile_reminders',
+        jobstore='local',
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+
+def _on_elected():
+    scheduler.resume()
+    _reconcile_or_retry()
+
+def _on_demoted():
+    scheduler.pause()
+
+def init_scheduler(app):
+    """Attach the shared job store; the scheduler itself starts with the first request
+
+    Importing the app starts no threads, so tools and pre-fork masters stay lightweight.
+    Every serving process starts the scheduler paused, so bookings handled anywhere still
+    write their reminder jobs to the database job store. Only the process holding
+    the leader lock resumes it and executes jobs.
+    """
+    global _app
+    _app = app
+    with app.app_context():
+        scheduler.configure(jobstores={
+            'default': SQLAlchemyJobStore(engine=db.engine, tablename='apscheduler_jobs'),
+            'local': MemoryJobStore()
+        })
+    scheduler.add_listener(_record_job_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+    app.before_request(start_scheduler)
+    return scheduler
+
+def start_scheduler():
+    """Start the paused scheduler and the leader election once per process; call after the schema exists"""
+    global _elector
+    if _elector is not None:
+        return
+    with _start_lock:
+        if _elector is not None:
+            return
+        try:
+            if not scheduler.running:
+                scheduler.start(paused=True)
+            scheduler.add_job(
+                scheduler_heartbeat,
+                trigger='interval',
+                seconds=SCHEDULER_HEARTBEAT,
+                id='scheduler_heartbeat',
+                jobstore='local',
+                replace_existing=True
+            )
+            with _app.app_context():
+                elector = LeaderElector(create_leader_lock(db.engine), _on_elected, _on_demoted)
+            elector.start()
+            _elector = elector
+        except Exception as e:
+            # Requests must not fail for it; the next one tries again
+            logger.error(f"Error starting the scheduler: {str(e)}")
+
+def is_scheduler_leader():
+    """Whether this process currently runs scheduled jobs"""
+    return bool(_elector and _elector.is_leader)
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 500))  # 0 disables the cache
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 3600))  # seconds
+RESPONSE_CACHE_HISTORY_TURNS = int(os.getenv('RESPONSE_CACHE_HISTORY_TURNS', 2))  # recent messages in the key
+
+def normalize_message(text):
+    """Lowercase, drop accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def history_fingerprint(history, turns=RESPONSE_CACHE_HISTORY_TURNS):
+    """Short hash of the last few messages, so follow-up questions only hit in the same context"""
+    if not turns or not history:
+        return ''
+    recent = list(history)[-turns:]
+    joined = '\x1e'.join(
+        f"{int(msg.get('is_user', True))}{normalize_message(msg['text'].split('__STATE__')[0])}"
+        for msg in recent
+    )
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()[:16]
+
+class ResponseCache:
+    """LRU cache of model replies with a per-entry expiry"""
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, response), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def make_key(self, user_message, history):
+        return f"{normalize_message(user_message)}|{history_fingerprint(history)}"
+
+    def get(self, user_message, history):
+        """Return the cached reply for this message and context, or None"""
+        if not self.enabled:
+            return None
+        key = self.make_key(user_message, history)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, response = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def set(self, user_message, history, response):
+        if not self.enabled or not response:
+            return
+        key = self.make_key(user_message, history)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+response_cache = ResponseCache()
@@ -0,0 +1,178 @@
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# auto: advisory lock on PostgreSQL, lock file otherwise; none: every process leads
+SCHEDULER_LEADER_MODE = os.getenv('SCHEDULER_LEADER_MODE', 'auto').lower()
+SCHEDULER_LOCK_FILE = os.getenv(
+    'SCHEDULER_LOCK_FILE',
+    os.path.join(tempfile.gettempdir(), 'kit_consulting_scheduler.lock')
+)
+SCHEDULER_LEADER_RETRY = int(os.getenv('SCHEDULER_LEADER_RETRY', 30))  # seconds between election attempts
+ADVISORY_LOCK_KEY = zlib.crc32(b'kit-consulting-scheduler')
+
+class FileLeaderLock:
+    """Leadership held through an exclusive flock on a shared lock file (single host)"""
+    def __init__(self, path=SCHEDULER_LOCK_FILE):
+        self.path = path
+        self._file = None
+
+    def try_acquire(self):
+        if self._file:
+            return True
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def is_held(self):
+        return self._file is not None
+
+    def release(self):
+        if self._file:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+class AdvisoryLeaderLock:
+    """Leadership held through a PostgreSQL session advisory lock (works across hosts)"""
+    def __init__(self, engine, key=ADVISORY_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._connection = None
+
+    def try_acquire(self):
+        if self.is_held():
+            return True
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': self.key}).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        # The lock lives as long as this dedicated connection stays open
+        self._connection = connection
+        return True
+
+    def is_held(self):
+        if self._connection is None:
+            return False
+        try:
+            self._connection.execute(text('SELECT 1'))
+            self._connection.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Lost scheduler advisory lock connection: {str(e)}")
+            self._drop()
+            return False
+
+    def _drop(self):
+        try:
+            self._connection.invalidate()
+        except Exception:
+            pass
+        self._connection = None
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': self.key})
+                self._connection.commit()
+                self._connection.close()
+            except Exception:
+                self._drop()
+            self._connection = None
+
+class AlwaysLeaderLock:
+    """Every process is leader; for single-process deployments"""
+    def try_acquire(self):
+        return True
+
+    def is_held(self):
+        return True
+
+    def release(self):
+        pass
+
+def create_leader_lock(engine, mode=SCHEDULER_LEADER_MODE):
+    """Pick the leader lock implementation for the configured mode and database"""
+    if mode == 'auto':
+        mode = 'advisory' if engine.dialect.name == 'postgresql' else 'file'
+    if mode == 'advisory':
+        return AdvisoryLeaderLock(engine)
+    if mode == 'file' and fcntl is not None:
+        return FileLeaderLock()
+    if mode == 'file':
+        logger.warning("File locks are not supported on this platform, every process will run scheduled jobs")
+    return AlwaysLeaderLock()
+
+class LeaderElector:
+    """Background thread that keeps trying to become leader and reports changes"""
+    def __init__(self, lock, on_elected, on_demoted, retry_interval=SCHEDULER_LEADER_RETRY):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._check()
+        self._thread = threading.Thread(target=self._run, name='scheduler-leader-election', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self.is_leader:
+            self.lock.release()
+            self.is_leader = False
+
+    def _check(self):
+        try:
+            if self.is_leader:
+                if not self.lock.is_held():
+                    self.is_leader = False
+                    logger.warning(f"Process {os.getpid()} lost scheduler leadership")
+                    self.on_demoted()
+            elif self.lock.try_acquire():
+                self.is_leader = True
+                logger.info(f"Process {os.getpid()} elected scheduler leader")
+                self.on_elected()
+        except Exception as e:
+            logger.error(f"Scheduler leader election error: {str(e)}")
+
+    def _run(self):
+        while not self._stopping.wait(self.retry_interval):
+            self._check()
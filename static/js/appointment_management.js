@@ -6,11 +6,22 @@ document.addEventListener('DOMContentLoaded', () => {
     const verifyPinBtn = document.getElementById('verifyPin');
     const logoutBtn = document.getElementById('logoutBtn');
 
-    // Pagination settings
+    // Pagination settings (keyset cursors returned by /api/appointments)
     let currentPage = 1;
     const itemsPerPage = 10;
+    let pageCursors = [null];
+    let hasMorePages = false;
+    let totalAppointmentRecords = 0;
     let filteredAppointments = [];
     let currentFilter = 'all';
+    let searchTimeout = null;
+    let submissionSearchTimeout = null;
+    let submissionSearchPage = 1;
+
+    // Delta sync: cursor from the last listing, polled for changed rows only
+    let appointmentsSince = null;
+    let syncTimer = null;
+    const SYNC_INTERVAL = 30000;
 
     // Check for existing session
     checkSession();
@@ -37,6 +48,8 @@ document.addEventListener('DOMContentLoaded', () => {
         loadAppointments();
         loadContactSubmissions();
         initializeCharts();
+        loadDashboardStats();
+        startSync();
         feather.replace();
     }
 
@@ -112,6 +125,7 @@ document.addEventListener('DOMContentLoaded', () => {
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
+                    stopSync();
                     dashboardContent.style.display = 'none';
                     pinModal.show();
                 }
@@ -122,8 +136,13 @@ document.addEventListener('DOMContentLoaded', () => {
             });
     });
 
-    // Load contact submissions
+    // Load contact submissions (search results while the search box has text)
     function loadContactSubmissions() {
+        if (document.getElementById('submissionSearch').value.trim()) {
+            searchContactSubmissions(1);
+            return;
+        }
+        document.getElementById('submissionSearchFooter').classList.add('d-none');
         fetch('/api/contact-submissions')
             .then(response => {
                 if (response.status === 401) {
@@ -143,10 +162,37 @@ document.addEventListener('DOMContentLoaded', () => {
             });
     }
 
+    // Ranked server-side search over contact submissions
+    function searchContactSubmissions(page) {
+        const query = document.getElementById('submissionSearch').value.trim();
+        const params = new URLSearchParams({ q: query, page: page });
+        fetch(`/api/contact-submissions/search?${params}`)
+            .then(response => {
+                if (response.status === 401) {
+                    pinModal.show();
+                    throw new Error('PIN verification required');
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (!data.submissions) return;
+                submissionSearchPage = data.page;
+                displayContactSubmissions(data.submissions, page > 1);
+                document.getElementById('submissionSearchInfo').textContent =
+                    `${data.total} resultado${data.total === 1 ? '' : 's'} para "${data.query}"`;
+                document.getElementById('loadMoreSubmissions').classList.toggle('d-none', !data.has_more);
+                document.getElementById('submissionSearchFooter').classList.remove('d-none');
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('Error searching contact submissions. Please try again.');
+            });
+    }
+
     // Display contact submissions
-    function displayContactSubmissions(submissions) {
+    function displayContactSubmissions(submissions, append = false) {
         const tbody = document.getElementById('submissionsTableBody');
-        tbody.innerHTML = submissions.map(submission => `
+        const rows = submissions.map(submission => `
             <tr>
                 <td>${formatDate(submission.created_at)}</td>
                 <td>${submission.nombre}</td>
@@ -155,6 +201,11 @@ document.addEventListener('DOMContentLoaded', () => {
                 <td>${submission.dudas}</td>
             </tr>
         `).join('');
+        if (append) {
+            tbody.insertAdjacentHTML('beforeend', rows);
+        } else {
+            tbody.innerHTML = rows;
+        }
     }
 
     // Initialize Charts
@@ -211,8 +262,8 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    // Update Charts
-    function updateCharts(appointments) {
+    // Update Charts from the server-side aggregates
+    function updateCharts(stats) {
         // Update Services Distribution
         const serviceCounts = {
             'Inteligencia Artificial': 0,
@@ -220,9 +271,10 @@ document.addEventListener('DOMContentLoaded', () => {
             'Estrategia y Rendimiento': 0
         };
 
-        appointments.forEach(apt => {
-            if (serviceCounts.hasOwnProperty(apt.service)) {
-                serviceCounts[apt.service]++;
+        Object.entries(stats.by_service).forEach(([service, count]) => {
+            const label = Object.keys(serviceCounts).find(name => service && service.startsWith(name));
+            if (label) {
+                serviceCounts[label] += count;
             }
         });
 
@@ -231,40 +283,71 @@ document.addEventListener('DOMContentLoaded', () => {
         servicesChart.update();
 
         // Update Timeline
-        const dateGroups = {};
-        appointments.forEach(apt => {
-            if (!dateGroups[apt.date]) {
-                dateGroups[apt.date] = 0;
-            }
-            dateGroups[apt.date]++;
-        });
-
-        const sortedDates = Object.keys(dateGroups).sort();
         const timelineChart = Chart.getChart('appointmentsTimeline');
-        timelineChart.data.labels = sortedDates;
-        timelineChart.data.datasets[0].data = sortedDates.map(date => dateGroups[date]);
+        timelineChart.data.labels = stats.by_date.map(day => day.date);
+        timelineChart.data.datasets[0].data = stats.by_date.map(day => day.count);
         timelineChart.update();
     }
 
-    // Filter appointments
-    function filterAppointments(appointments, filter) {
-        const today = new Date().toISOString().split('T')[0];
-        
-        switch(filter) {
+    // Load summary counts and chart data without downloading the appointments
+    function loadDashboardStats() {
+        fetch('/api/appointments/stats')
+            .then(response => {
+                if (response.status === 401) {
+                    pinModal.show();
+                    throw new Error('PIN verification required');
+                }
+                return response.json();
+            })
+            .then(stats => {
+                if (stats.error) {
+                    throw new Error(stats.error);
+                }
+                updateSummaryCards(stats);
+                updateCharts(stats);
+            })
+            .catch(error => {
+                console.error('Error loading dashboard stats:', error);
+            });
+    }
+
+    // Format a Date as YYYY-MM-DD
+    function toISODate(date) {
+        return date.toISOString().split('T')[0];
+    }
+
+    // Build the server-side filter parameters for the appointments listing
+    function buildAppointmentParams() {
+        const params = new URLSearchParams();
+        const today = new Date();
+
+        switch(currentFilter) {
             case 'today':
-                return appointments.filter(apt => apt.date === today);
+                params.set('date_from', toISODate(today));
+                params.set('date_to', toISODate(today));
+                break;
             case 'upcoming':
-                return appointments.filter(apt => apt.date > today);
+                params.set('date_from', toISODate(new Date(today.getTime() + 86400000)));
+                break;
             case 'past':
-                return appointments.filter(apt => apt.date < today);
-            default:
-                return appointments;
+                params.set('date_to', toISODate(new Date(today.getTime() - 86400000)));
+                break;
         }
+
+        const status = document.getElementById('statusFilter').value;
+        if (status) params.set('status', status);
+
+        const service = document.getElementById('serviceFilter').value;
+        if (service) params.set('service', service);
+
+        const search = document.getElementById('appointmentSearch').value.trim();
+        if (search) params.set('q', search);
+
+        return params;
     }
 
     // Pagination
     function updatePagination() {
-        const totalPages = Math.ceil(filteredAppointments.length / itemsPerPage);
         const pagination = document.getElementById('pagination');
         pagination.innerHTML = '';
 
@@ -274,17 +357,15 @@ document.addEventListener('DOMContentLoaded', () => {
         prevLi.innerHTML = `<a class="page-link" href="#" data-page="${currentPage - 1}">Anterior</a>`;
         pagination.appendChild(prevLi);
 
-        // Page numbers
-        for (let i = 1; i <= totalPages; i++) {
-            const li = document.createElement('li');
-            li.className = `page-item ${currentPage === i ? 'active' : ''}`;
-            li.innerHTML = `<a class="page-link" href="#" data-page="${i}">${i}</a>`;
-            pagination.appendChild(li);
-        }
+        // Current page
+        const li = document.createElement('li');
+        li.className = 'page-item active';
+        li.innerHTML = `<a class="page-link" href="#" data-page="${currentPage}">${currentPage}</a>`;
+        pagination.appendChild(li);
 
         // Next button
         const nextLi = document.createElement('li');
-        nextLi.className = `page-item ${currentPage === totalPages ? 'disabled' : ''}`;
+        nextLi.className = `page-item ${hasMorePages ? '' : 'disabled'}`;
         nextLi.innerHTML = `<a class="page-link" href="#" data-page="${currentPage + 1}">Siguiente</a>`;
         pagination.appendChild(nextLi);
 
@@ -293,10 +374,10 @@ document.addEventListener('DOMContentLoaded', () => {
             link.addEventListener('click', (e) => {
                 e.preventDefault();
                 const newPage = parseInt(e.target.dataset.page);
-                if (!isNaN(newPage) && newPage !== currentPage && newPage > 0 && newPage <= totalPages) {
-                    currentPage = newPage;
-                    displayAppointments();
-                }
+                if (isNaN(newPage) || newPage === currentPage || newPage < 1) return;
+                if (newPage > currentPage && !hasMorePages) return;
+                currentPage = newPage;
+                loadAppointments();
             });
         });
     }
@@ -304,11 +385,8 @@ document.addEventListener('DOMContentLoaded', () => {
     // Display appointments with pagination
     function displayAppointments() {
         const tbody = document.getElementById('appointmentsTableBody');
-        const start = (currentPage - 1) * itemsPerPage;
-        const end = start + itemsPerPage;
-        const paginatedAppointments = filteredAppointments.slice(start, end);
 
-        tbody.innerHTML = paginatedAppointments.map(appointment => `
+        tbody.innerHTML = filteredAppointments.map(appointment => `
             <tr>
                 <td>${appointment.date}</td>
                 <td>${appointment.time}</td>
@@ -339,7 +417,7 @@ document.addEventListener('DOMContentLoaded', () => {
         updatePagination();
         
         // Update total records count
-        document.getElementById('totalRecords').textContent = filteredAppointments.length;
+        document.getElementById('totalRecords').textContent = totalAppointmentRecords;
 
         // Add event listeners for edit and delete buttons
         document.querySelectorAll('.edit-appointment').forEach(button => {
@@ -361,9 +439,15 @@ document.addEventListener('DOMContentLoaded', () => {
         return statusClasses[status] || 'secondary';
     }
 
-    // Load appointments
+    // Load the current page of appointments
     function loadAppointments() {
-        fetch('/api/appointments')
+        const params = buildAppointmentParams();
+        params.set('limit', itemsPerPage);
+        const cursor = pageCursors[currentPage - 1];
+        if (cursor) params.set('cursor', cursor);
+        if (currentPage === 1) params.set('include_total', 'true');
+
+        fetch(`/api/appointments?${params.toString()}`)
             .then(response => {
                 if (response.status === 401) {
                     pinModal.show();
@@ -373,10 +457,14 @@ document.addEventListener('DOMContentLoaded', () => {
             })
             .then(data => {
                 if (data.appointments) {
-                    filteredAppointments = filterAppointments(data.appointments, currentFilter);
+                    if (data.total !== undefined) {
+                        totalAppointmentRecords = data.total;
+                    }
+                    hasMorePages = data.has_more;
+                    pageCursors[currentPage] = data.next_cursor;
+                    appointmentsSince = data.since || appointmentsSince;
+                    filteredAppointments = data.appointments;
                     displayAppointments();
-                    updateCharts(data.appointments);
-                    updateSummaryCards(data.appointments);
                 }
             })
             .catch(error => {
@@ -385,15 +473,85 @@ document.addEventListener('DOMContentLoaded', () => {
             });
     }
 
+    // Apply only the rows changed since the last listing or sync
+    function syncAppointments() {
+        if (!appointmentsSince) {
+            loadAppointments();
+            return;
+        }
+
+        fetch(`/api/appointments?since=${encodeURIComponent(appointmentsSince)}`)
+            .then(response => {
+                if (response.status === 401) {
+                    stopSync();
+                    pinModal.show();
+                    throw new Error('PIN verification required');
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (!data.appointments) {
+                    throw new Error(data.error || 'Sync failed');
+                }
+                appointmentsSince = data.since;
+
+                const changed = data.appointments.length + data.deleted.length;
+                if (!changed) return;
+
+                const deletedIds = new Set(data.deleted);
+                let needsReload = data.has_more;
+                data.appointments.forEach(updated => {
+                    const existing = filteredAppointments.find(apt => apt.id === updated.id);
+                    if (existing) {
+                        Object.assign(existing, updated);
+                    } else {
+                        // New rows may belong on this page
+                        needsReload = true;
+                    }
+                });
+
+                const remaining = filteredAppointments.filter(apt => !deletedIds.has(apt.id));
+                totalAppointmentRecords -= filteredAppointments.length - remaining.length;
+                filteredAppointments = remaining;
+
+                if (needsReload) {
+                    loadAppointments();
+                } else {
+                    displayAppointments();
+                }
+                loadDashboardStats();
+            })
+            .catch(error => {
+                console.error('Error syncing appointments:', error);
+            });
+    }
+
+    function startSync() {
+        stopSync();
+        syncTimer = setInterval(() => {
+            if (!document.hidden) syncAppointments();
+        }, SYNC_INTERVAL);
+    }
+
+    function stopSync() {
+        if (syncTimer) {
+            clearInterval(syncTimer);
+            syncTimer = null;
+        }
+    }
+
+    // Reload appointments from the first page (filters changed)
+    function resetAppointments() {
+        currentPage = 1;
+        pageCursors = [null];
+        loadAppointments();
+    }
+
     // Update summary cards
-    function updateSummaryCards(appointments) {
-        const today = new Date().toISOString().split('T')[0];
-        
-        document.getElementById('totalAppointments').textContent = appointments.length;
-        document.getElementById('todayAppointments').textContent = 
-            appointments.filter(apt => apt.date === today).length;
-        document.getElementById('upcomingAppointments').textContent = 
-            appointments.filter(apt => apt.date > today).length;
+    function updateSummaryCards(stats) {
+        document.getElementById('totalAppointments').textContent = stats.total;
+        document.getElementById('todayAppointments').textContent = stats.today;
+        document.getElementById('upcomingAppointments').textContent = stats.upcoming;
     }
 
     // Edit appointment
@@ -437,7 +595,7 @@ document.addEventListener('DOMContentLoaded', () => {
         .then(data => {
             if (data.message) {
                 editModal.hide();
-                loadAppointments();
+                syncAppointments();
             } else {
                 alert(data.error || 'Error updating appointment');
             }
@@ -457,7 +615,7 @@ document.addEventListener('DOMContentLoaded', () => {
             .then(response => response.json())
             .then(data => {
                 if (data.message) {
-                    loadAppointments();
+                    syncAppointments();
                 } else {
                     alert(data.error || 'Error deleting appointment');
                 }
@@ -474,14 +632,43 @@ document.addEventListener('DOMContentLoaded', () => {
         filterLink.addEventListener('click', (e) => {
             e.preventDefault();
             currentFilter = e.target.dataset.filter;
-            currentPage = 1;
-            loadAppointments();
+            resetAppointments();
         });
     });
 
+    // Server-side status/service filters and free-text search
+    document.getElementById('statusFilter').addEventListener('change', resetAppointments);
+    document.getElementById('serviceFilter').addEventListener('change', resetAppointments);
+    // Export the appointments matching the current filters
+    document.querySelectorAll('[data-export]').forEach(item => {
+        item.addEventListener('click', (e) => {
+            e.preventDefault();
+            const params = buildAppointmentParams();
+            params.set('format', e.target.dataset.export);
+            window.location.href = `/api/appointments/export?${params}`;
+        });
+    });
+
+    document.getElementById('appointmentSearch').addEventListener('input', () => {
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(resetAppointments, 300);
+    });
+
     // Add refresh handler for contact submissions
     document.getElementById('refreshSubmissions').addEventListener('click', loadContactSubmissions);
 
+    document.getElementById('submissionSearch').addEventListener('input', () => {
+        clearTimeout(submissionSearchTimeout);
+        submissionSearchTimeout = setTimeout(loadContactSubmissions, 300);
+    });
+
+    document.getElementById('loadMoreSubmissions').addEventListener('click', () => {
+        searchContactSubmissions(submissionSearchPage + 1);
+    });
+
     // Refresh appointments
-    document.getElementById('refreshAppointments').addEventListener('click', loadAppointments);
+    document.getElementById('refreshAppointments').addEventListener('click', () => {
+        resetAppointments();
+        loadDashboardStats();
+    });
 });
\ No newline at end of file
@@ -20,6 +20,7 @@ document.addEventListener('DOMContentLoaded', () => {
             });
 
             let conversationHistory = [];
+            let conversationId = null;
             let isProcessing = false;
             let retryCount = 0;
             const MAX_RETRIES = 3;
@@ -43,7 +44,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 try {
                     return await fn();
                 } catch (error) {
-                    if (retryCount < MAX_RETRIES) {
+                    if (retryCount < MAX_RETRIES && !error.noRetry) {
                         const delay = RETRY_DELAY * Math.pow(2, retryCount);
                         console.log(`Retrying in ${delay}ms... (Attempt ${retryCount + 1}/${MAX_RETRIES})`);
                         await new Promise(resolve => setTimeout(resolve, delay));
@@ -53,6 +54,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
             };
 
+            // The server no longer holds the conversation (expired, or kept by another worker).
+            // Resending without an id would silently restart a booking, so tell the user instead.
+            const conversationExpired = () => {
+                conversationId = null;
+                const error = new Error('Conversation expired');
+                error.noRetry = true;
+                return error;
+            };
+
             const stripStateData = (message) => {
                 if (typeof message !== 'string') return message;
                 const stateStart = message.indexOf('__STATE__');
@@ -79,6 +89,101 @@ document.addEventListener('DOMContentLoaded', () => {
                 };
             };
 
+            const supportsStreaming = typeof ReadableStream !== 'undefined' && typeof TextDecoder !== 'undefined';
+
+            const parseSseEvent = (frame) => {
+                let event = 'message';
+                const dataLines = [];
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        event = line.substring('event:'.length).trim();
+                    } else if (line.startsWith('data:')) {
+                        dataLines.push(line.substring('data:'.length).trim());
+                    }
+                });
+                return {
+                    event,
+                    data: dataLines.length ? JSON.parse(dataLines.join('\n')) : {}
+                };
+            };
+
+            // Show the reply as it is generated instead of waiting for the whole completion
+            const streamReply = async (message) => {
+                const res = await retry(async () => {
+                    console.log('Making streaming API request...');
+                    const res = await fetch('/api/chatbot/stream', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                            'Accept': 'text/event-stream'
+                        },
+                        body: JSON.stringify({
+                            message,
+                            conversation_id: conversationId
+                        })
+                    });
+
+                    if (!res.ok) {
+                        const errorData = await res.json();
+                        if (res.status === 429) {
+                            throw new Error('Rate limit exceeded');
+                        }
+                        if (res.status === 409 && errorData.code === 'CONVERSATION_UNKNOWN') {
+                            throw conversationExpired();
+                        }
+                        throw new Error(errorData.error || 'Server error');
+                    }
+
+                    return res;
+                }, 0);
+
+                const messageDiv = document.createElement('div');
+                messageDiv.className = 'chat-message bot-message';
+                messageDiv.innerHTML = '<div class="message-content"></div>';
+                const contentDiv = messageDiv.querySelector('.message-content');
+                elements.chatMessages.appendChild(messageDiv);
+
+                const reader = res.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                let reply = '';
+
+                try {
+                    while (true) {
+                        const { value, done } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
+
+                        let boundary;
+                        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                            const { event, data } = parseSseEvent(buffer.substring(0, boundary));
+                            buffer = buffer.substring(boundary + 2);
+
+                            if (event === 'meta') {
+                                // The server keeps the conversation state under this id
+                                conversationId = data.conversation_id || conversationId;
+                            } else if (event === 'delta') {
+                                reply += data.text;
+                                contentDiv.innerHTML = reply;
+                                elements.chatMessages.scrollTop = elements.chatMessages.scrollHeight;
+                            } else if (event === 'error') {
+                                throw new Error(data.error || 'Server error');
+                            }
+                        }
+                    }
+                } catch (error) {
+                    if (!reply) {
+                        messageDiv.remove();
+                    }
+                    throw error;
+                }
+
+                conversationHistory.push({
+                    text: reply,
+                    is_user: false
+                });
+            };
+
             const sendMessage = async (message, isUser = true) => {
                 console.log(`Sending message (${isUser ? 'user' : 'bot'}):`, message);
                 try {
@@ -101,32 +206,41 @@ document.addEventListener('DOMContentLoaded', () => {
                         elements.sendButton.disabled = true;
 
                         try {
-                            const response = await retry(async () => {
-                                console.log('Making API request...');
-                                const res = await fetch('/api/chatbot', {
-                                    method: 'POST',
-                                    headers: {
-                                        'Content-Type': 'application/json'
-                                    },
-                                    body: JSON.stringify({
-                                        message,
-                                        conversation_history: conversationHistory.slice(0, -1)
-                                    })
-                                });
-
-                                if (!res.ok) {
-                                    const errorData = await res.json();
-                                    if (res.status === 429) {
-                                        throw new Error('Rate limit exceeded');
+                            if (supportsStreaming) {
+                                await streamReply(message);
+                            } else {
+                                const response = await retry(async () => {
+                                    console.log('Making API request...');
+                                    const res = await fetch('/api/chatbot', {
+                                        method: 'POST',
+                                        headers: {
+                                            'Content-Type': 'application/json'
+                                        },
+                                        body: JSON.stringify({
+                                            message,
+                                            conversation_id: conversationId
+                                        })
+                                    });
+
+                                    if (!res.ok) {
+                                        const errorData = await res.json();
+                                        if (res.status === 429) {
+                                            throw new Error('Rate limit exceeded');
+                                        }
+                                        if (res.status === 409 && errorData.code === 'CONVERSATION_UNKNOWN') {
+                                            throw conversationExpired();
+                                        }
+                                        throw new Error(errorData.error || 'Server error');
                                     }
-                                    throw new Error(errorData.error || 'Server error');
-                                }
 
-                                return res.json();
-                            }, 0);
+                                    return res.json();
+                                }, 0);
 
-                            console.log('API response received:', response);
-                            await sendMessage(response.response, false);
+                                console.log('API response received:', response);
+                                // The server keeps the conversation state under this id
+                                conversationId = response.conversation_id || conversationId;
+                                await sendMessage(response.response, false);
+                            }
                             retryCount = 0;
 
                         } catch (error) {
@@ -135,6 +249,8 @@ document.addEventListener('DOMContentLoaded', () => {
                             
                             if (error.message === 'Rate limit exceeded') {
                                 errorMessage = 'Has enviado demasiados mensajes. Por favor, espera un momento.';
+                            } else if (error.message === 'Conversation expired') {
+                                errorMessage = 'La conversación ha caducado. Por favor, empieza de nuevo; si estabas reservando una cita, escribe "reservar cita".';
                             } else if (!navigator.onLine) {
                                 errorMessage = 'Parece que no hay conexión a internet. Por favor, verifica tu conexión.';
                             }
@@ -0,0 +1,299 @@
+import argparse
+import gzip
+import hashlib
+from io import BytesIO
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import threading
+from flask import request, send_file, url_for, abort
+from werkzeug.security import safe_join
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# `python static_assets.py build` copies static/ into static/dist under content-hashed names,
+# with gzip/brotli variants of text files and resized copies of images for srcset
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+STATIC_DIST_DIR = os.getenv('STATIC_DIST_DIR', os.path.join(STATIC_DIR, 'dist'))
+STATIC_ASSETS_URL = '/assets'
+STATIC_ASSETS_MAX_AGE = 31536000  # seconds; safe because every file name changes with its content
+IMAGE_WIDTHS = [int(width) for width in os.getenv('STATIC_IMAGE_WIDTHS', '480,960,1440').split(',') if width.strip()]
+IMAGE_QUALITY = int(os.getenv('STATIC_IMAGE_QUALITY', 80))
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.webmanifest', '.txt', '.html', '.ico'}
+RESIZABLE_EXTENSIONS = {'.webp', '.jpg', '.jpeg', '.png'}
+# Preferred first; 'gzip' variants are stored with a .gz suffix
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+mimetypes.add_type('image/webp', '.webp')
+
+def fingerprint(data):
+    """Short content hash used in built file names"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+def hashed_name(path, digest, suffix=''):
+    """css/style.css -> css/style.<digest>.css (suffix goes before the extension)"""
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{digest}{suffix}{ext}"
+
+def compress_variants(data):
+    """Encoded copies of data that are actually smaller, keyed by content-coding"""
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+    return {encoding: encoded for encoding, encoded in variants.items() if len(encoded) < len(data)}
+
+def resize_variants(source):
+    """Image width and (width, bytes) pairs for configured widths narrower than the image"""
+    if Image is None:
+        return None, []
+    with Image.open(source) as image:
+        image_format = image.format
+        width, height = image.size
+        variants = []
+        for target in sorted(IMAGE_WIDTHS):
+            if target >= width:
+                continue
+            resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                resized = resized.convert('RGB')
+            buffer = BytesIO()
+            resized.save(buffer, format=image_format, quality=IMAGE_QUALITY, optimize=True)
+            if buffer.tell() < os.path.getsize(source):
+                variants.append((target, buffer.getvalue()))
+    return width, variants
+
+def rewrite_css_urls(css, css_path, assets):
+    """Point url() references at already built assets"""
+    def replace(match):
+        quote, reference = match.groups()
+        if reference.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        target = reference.split('?')[0]
+        if target.startswith('/static/'):
+            logical = target[len('/static/'):]
+        elif target.startswith('/'):
+            return match.group(0)
+        else:
+            logical = posixpath.normpath(posixpath.join(posixpath.dirname(css_path), target))
+        entry = assets.get(logical)
+        if entry is None:
+            return match.group(0)
+        return f"url({quote}{STATIC_ASSETS_URL}/{entry['file']}{quote})"
+    return CSS_URL_PATTERN.sub(replace, css)
+
+def collect_static_files(static_dir, dist_dir):
+    """Logical (URL style) paths of every source asset, stylesheets last"""
+    paths = []
+    # Never feed a previous build back in, wherever this one is written
+    skipped = {os.path.abspath(dist_dir), os.path.abspath(STATIC_DIST_DIR)}
+    for root, dirs, files in os.walk(os.path.abspath(static_dir)):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) not in skipped and not d.startswith('.')]
+        for name in files:
+            if name.startswith('.'):
+                continue
+            relative = os.path.relpath(os.path.join(root, name), os.path.abspath(static_dir))
+            paths.append(relative.replace(os.sep, '/'))
+    # Stylesheets reference images, so they are hashed after what they point to
+    return sorted(paths, key=lambda path: (path.endswith('.css'), path))
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=STATIC_DIST_DIR, clean=True):
+    """Build the fingerprinted tree and manifest; returns the manifest"""
+    if clean and os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir, exist_ok=True)
+    if brotli is None:
+        logger.warning("brotli is not installed; only gzip variants will be built")
+    if Image is None:
+        logger.warning("Pillow is not installed; responsive image variants will not be built")
+
+    assets = {}
+    for logical in collect_static_files(static_dir, dist_dir):
+        source = os.path.join(static_dir, *logical.split('/'))
+        with open(source, 'rb') as f:
+            data = f.read()
+        ext = posixpath.splitext(logical)[1].lower()
+        if ext == '.css':
+            data = rewrite_css_urls(data.decode('utf-8'), logical, assets).encode('utf-8')
+
+        digest = fingerprint(data)
+        entry = {'file': hashed_name(logical, digest), 'size': len(data), 'encodings': {}}
+        write_output(dist_dir, entry['file'], data)
+
+        if ext in COMPRESSIBLE_EXTENSIONS:
+            for encoding, encoded in compress_variants(data).items():
+                write_output(dist_dir, entry['file'] + dict(ENCODINGS)[encoding], encoded)
+                entry['encodings'][encoding] = len(encoded)
+
+        if ext in RESIZABLE_EXTENSIONS:
+            try:
+                width, variants = resize_variants(source)
+            except Exception as e:
+                logger.warning(f"Could not resize {logical}: {str(e)}")
+                width, variants = None, []
+            if width:
+                entry['width'] = width
+                entry['variants'] = []
+                for target, encoded in variants:
+                    name = hashed_name(logical, digest, f'.{target}w')
+                    write_output(dist_dir, name, encoded)
+                    entry['variants'].append({'width': target, 'file': name, 'size': len(encoded)})
+
+        assets[logical] = entry
+
+    manifest = {'version': 1, 'assets': assets}
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True, ensure_ascii=False)
+    logger.info(f"Built {len(assets)} static assets into {dist_dir}")
+    return manifest
+
+def write_output(dist_dir, name, data):
+    path = os.path.join(dist_dir, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+class AssetManifest:
+    """Lookup of built assets; reloaded when the manifest file changes"""
+    def __init__(self, dist_dir=STATIC_DIST_DIR):
+        self.dist_dir = dist_dir
+        self.path = os.path.join(dist_dir, MANIFEST_NAME)
+        self._assets = {}
+        self._by_file = {}  # built file name -> manifest entry
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def assets(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load(mtime)
+        return self._assets
+
+    def _load(self, mtime):
+        if mtime is None:
+            if self._mtime is not None:
+                logger.warning(f"Static manifest {self.path} disappeared; serving unversioned assets")
+            self._assets, self._by_file, self._mtime = {}, {}, None
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._assets = json.load(f).get('assets', {})
+            self._by_file = {entry['file']: entry for entry in self._assets.values()}
+            self._mtime = mtime
+            logger.info(f"Loaded static manifest with {len(self._assets)} assets")
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read static manifest {self.path}: {str(e)}")
+
+    def get(self, filename):
+        return self.assets().get(filename)
+
+    def encodings_for(self, built_name):
+        """Content-codings stored next to a built file, in preference order"""
+        self.assets()
+        entry = self._by_file.get(built_name)
+        if entry is None:
+            return []
+        return [encoding for encoding, _ in ENCODINGS if encoding in entry['encodings']]
+
+asset_manifest = AssetManifest()
+
+def static_url(filename, width=None):
+    """URL of a static file: fingerprinted when built, plain /static otherwise
+
+    With width, the smallest resized variant at least that wide is used.
+    """
+    entry = asset_manifest.get(filename)
+    if entry is None:
+        return url_for('static', filename=filename)
+    built = entry['file']
+    if width:
+        for variant in entry.get('variants', []):
+            if variant['width'] >= width:
+                built = variant['file']
+                break
+    return f"{STATIC_ASSETS_URL}/{built}"
+
+def static_srcset(filename):
+    """srcset candidates for an image with resized variants, or '' when there are none"""
+    entry = asset_manifest.get(filename)
+    if not entry or not entry.get('variants'):
+        return ''
+    candidates = [f"{STATIC_ASSETS_URL}/{variant['file']} {variant['width']}w" for variant in entry['variants']]
+    candidates.append(f"{STATIC_ASSETS_URL}/{entry['file']} {entry['width']}w")
+    return ', '.join(candidates)
+
+def serve_asset(filename):
+    """Serve a built file, precompressed when the client accepts it, cached for a year"""
+    path = safe_join(asset_manifest.dist_dir, filename)
+    if path is None or filename == MANIFEST_NAME or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encodings = asset_manifest.encodings_for(filename)
+    chosen = None
+    for encoding, suffix in ENCODINGS:
+        if encoding in encodings and request.accept_encodings.quality(encoding) > 0 and os.path.isfile(path + suffix):
+            chosen, path = encoding, path + suffix
+            break
+
+    response = send_file(path, mimetype=mimetype, max_age=STATIC_ASSETS_MAX_AGE, conditional=True)
+    if chosen:
+        response.headers['Content-Encoding'] = chosen
+    if encodings:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={STATIC_ASSETS_MAX_AGE}, immutable'
+    return response
+
+def init_app(app):
+    """Register the /assets route and the template helpers"""
+    app.add_url_rule(f'{STATIC_ASSETS_URL}/<path:filename>', 'static_assets', serve_asset)
+    app.add_template_global(static_url)
+    app.add_template_global(static_srcset)
+    if not asset_manifest.assets():
+        logger.info("No static manifest found; run 'python static_assets.py build' to serve fingerprinted assets")
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted static assets')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    parser.add_argument('--dist-dir', default=STATIC_DIST_DIR)
+    parser.add_argument('--keep', action='store_true', help='keep files from previous builds')
+    args = parser.parse_args()
+    build_assets(args.static_dir, os.path.abspath(args.dist_dir), clean=not args.keep)
+
+if __name__ == '__main__':
+    main()